@@ -0,0 +1,172 @@
+"""Offline analytics over Pandora snapshots and journals.
+
+Each input file is one shard. Shards are scanned in a process pool, and every
+file is streamed in fixed-size chunks. Each chunk becomes a DataFrame, is
+aggregated with a group-by, and only the small per-file partials are merged.
+
+    python -m backend.analytics_cli stage-counts data/*.json --freq h -o stages.csv
+    python -m backend.analytics_cli tag-distribution data/*.ndjson --freq D -o tags.json
+    python -m backend.analytics_cli breath-gaps data/*.json --min-gap 10
+
+Inputs are legacy JSON snapshots, NDJSON snapshots, or journals (NDJSON with
+one serialized memory line per row, e.g. a dump of /api/pandora/changes).
+Overlapping snapshots of the same braid are counted once per file, so pass
+non-overlapping inputs.
+"""
+import json
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Any, Iterator, Optional
+
+import numpy as np
+import pandas as pd
+import typer
+
+from .snapshot_stream import iter_memory_lines
+
+app = typer.Typer(help="Offline analytics over Pandora snapshots and journals")
+
+CHUNK_SIZE = 50000
+
+
+def iter_file_lines(path: str) -> Iterator[Dict[str, Any]]:
+    """Stream serialized memory lines from a snapshot or journal file"""
+    with open(path, "rb") as f:
+        head = f.read(256).lstrip()
+    is_journal = path.endswith((".ndjson", ".jsonl")) and not head.startswith(b'{"type":"header"')
+    if not is_journal:
+        yield from iter_memory_lines(path, use_mmap=True)
+        return
+    with open(path, "rb") as f:
+        for raw in f:
+            if raw.strip():
+                record = json.loads(raw)
+                # Tolerate NDJSON snapshot records mixed into journals
+                if record.get("type") == "line":
+                    yield record["data"]
+                elif "stage" in record:
+                    yield record
+
+
+def _chunk_frame(lines: List[Dict[str, Any]]) -> pd.DataFrame:
+    """Columnar frame with one row per logical line; compacted breath runs give back each line's timestamp"""
+    plain = [line for line in lines if line.get("record_type") != "breath_run"]
+    frames = [pd.DataFrame({
+        "ts": pd.to_datetime([line.get("timestamp") for line in plain], utc=True, format="ISO8601"),
+        "stage": [line.get("stage", "") for line in plain],
+        "tags": [line.get("semantic_tags") or [] for line in plain],
+    })]
+    for run in lines:
+        if run.get("record_type") != "breath_run":
+            continue
+        first = pd.Timestamp(run["timestamp"]).tz_convert("UTC")
+        last = pd.Timestamp(run["last_timestamp"]).tz_convert("UTC")
+        count = int(run.get("run_length", 1))
+        offsets = run.get("line_offsets") or []
+        if len(offsets) == count:
+            stamps = first + pd.to_timedelta(offsets, unit="us")
+        else:
+            stamps = pd.date_range(first, last, periods=count) if count > 1 else pd.DatetimeIndex([first])
+        frames.append(pd.DataFrame({
+            "ts": stamps,
+            "stage": run.get("stage", "breath"),
+            "tags": [run.get("semantic_tags") or []] * count,
+        }))
+    return pd.concat(frames, ignore_index=True)
+
+
+def _aggregate_chunk(frame: pd.DataFrame, task: str, freq: str):
+    if task == "stages":
+        return frame.groupby([frame["ts"].dt.floor(freq), "stage"]).size()
+    if task == "tags":
+        exploded = frame.explode("tags").dropna(subset=["tags"])
+        return exploded.groupby([exploded["ts"].dt.floor(freq), "tags"]).size()
+    # gaps: breath timestamps as int64 nanoseconds
+    return frame.loc[frame["stage"] == "breath", "ts"].dt.as_unit("ns").astype("int64").to_numpy()
+
+
+def _scan_file(path: str, task: str, freq: str, chunk_size: int = CHUNK_SIZE):
+    """Worker: stream one shard and return its partial aggregate"""
+    partials = []
+    chunk: List[Dict[str, Any]] = []
+    for line in iter_file_lines(path):
+        chunk.append(line)
+        if len(chunk) >= chunk_size:
+            partials.append(_aggregate_chunk(_chunk_frame(chunk), task, freq))
+            chunk = []
+    if chunk:
+        partials.append(_aggregate_chunk(_chunk_frame(chunk), task, freq))
+    if task == "gaps":
+        return np.concatenate(partials) if partials else np.empty(0, dtype="int64")
+    if not partials:
+        return pd.Series(dtype="int64")
+    return pd.concat(partials).groupby(level=[0, 1]).sum()
+
+
+def _scan(files: List[Path], task: str, freq: str, workers: Optional[int]):
+    paths = [str(path) for path in files]
+    if workers == 1 or len(paths) == 1:
+        return [_scan_file(path, task, freq) for path in paths]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(_scan_file, paths, [task] * len(paths), [freq] * len(paths)))
+
+
+def _merge_counts(partials: List[pd.Series], names: List[str]) -> pd.DataFrame:
+    partials = [partial for partial in partials if len(partial)]
+    if not partials:
+        return pd.DataFrame(columns=names + ["count"])
+    merged = pd.concat(partials).groupby(level=[0, 1]).sum()
+    merged.index.names = names
+    return merged.rename("count").reset_index().sort_values(names)
+
+
+def _write(frame: pd.DataFrame, output: Optional[Path]):
+    if output is None:
+        typer.echo(frame.to_csv(index=False), nl=False)
+    elif output.suffix == ".json":
+        output.write_text(frame.to_json(orient="records", date_format="iso", indent=2))
+    else:
+        frame.to_csv(output, index=False)
+    if output is not None:
+        typer.echo(f"Wrote {len(frame)} rows to {output}", err=True)
+
+
+FilesArg = typer.Argument(..., exists=True, dir_okay=False, help="Snapshot or journal files (one shard each)")
+WorkersOpt = typer.Option(None, "--workers", "-w", help="Process pool size (default: CPU count)")
+OutputOpt = typer.Option(None, "--output", "-o", help="Write CSV, or JSON when the name ends in .json (default: CSV to stdout)")
+
+
+@app.command("stage-counts")
+def stage_counts(files: List[Path] = FilesArg,
+                 freq: str = typer.Option("h", help="Bucket size as a pandas frequency (min, h, D)"),
+                 workers: Optional[int] = WorkersOpt, output: Optional[Path] = OutputOpt):
+    """Memory lines per stage per time bucket"""
+    _write(_merge_counts(_scan(files, "stages", freq, workers), ["bucket", "stage"]), output)
+
+
+@app.command("tag-distribution")
+def tag_distribution(files: List[Path] = FilesArg,
+                     freq: str = typer.Option("D", help="Bucket size as a pandas frequency (min, h, D)"),
+                     workers: Optional[int] = WorkersOpt, output: Optional[Path] = OutputOpt):
+    """Semantic tag counts per time bucket"""
+    _write(_merge_counts(_scan(files, "tags", freq, workers), ["bucket", "tag"]), output)
+
+
+@app.command("breath-gaps")
+def breath_gaps(files: List[Path] = FilesArg,
+                min_gap: float = typer.Option(10.0, help="Report gaps between breaths longer than this many seconds"),
+                workers: Optional[int] = WorkersOpt, output: Optional[Path] = OutputOpt):
+    """Intervals between consecutive breath lines longer than --min-gap"""
+    stamps = np.unique(np.concatenate(_scan(files, "gaps", "h", workers) or [np.empty(0, dtype="int64")]))
+    gaps = np.diff(stamps) / 1e9
+    mask = gaps > min_gap
+    frame = pd.DataFrame({
+        "gap_start": pd.to_datetime(stamps[:-1][mask], utc=True),
+        "gap_end": pd.to_datetime(stamps[1:][mask], utc=True),
+        "gap_seconds": gaps[mask].round(3),
+    })
+    _write(frame, output)
+
+
+if __name__ == "__main__":
+    app()
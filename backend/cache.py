@@ -0,0 +1,103 @@
+import json
+import logging
+from typing import Callable, Dict, List, Any, Optional
+
+logger = logging.getLogger("pandora.cache")
+
+
+class RedisHotCache:
+    """Shared hot tier holding the most recent memory lines and the latest runtime status.
+
+    Data keys are scoped by a version number stored under ``<namespace>:version``.
+    Invalidation bumps the version so every reader switches to empty keys at once,
+    while the stale keys age out through their TTL.
+    """
+
+    def __init__(self, client, namespace: str = "pandora", max_lines: int = 500,
+                 line_ttl: int = 3600, status_ttl: int = 30):
+        self.client = client
+        self.namespace = namespace
+        self.max_lines = max_lines
+        self.line_ttl = line_ttl
+        self.status_ttl = status_ttl
+        self.version_key = f"{namespace}:version"
+
+    @classmethod
+    def from_url(cls, url: str, **kwargs) -> "RedisHotCache":
+        import redis.asyncio as redis
+
+        return cls(redis.from_url(url, decode_responses=True), **kwargs)
+
+    async def _version(self) -> int:
+        version = await self.client.get(self.version_key)
+        return int(version) if version is not None else 0
+
+    def _keys(self, version: int) -> Dict[str, str]:
+        prefix = f"{self.namespace}:v{version}"
+        return {"lines": f"{prefix}:lines", "total": f"{prefix}:total", "status": f"{prefix}:status"}
+
+    async def _write_current(self, queue: Callable[[Any, Dict[str, str]], None]):
+        """Queue writes against the current version's keys in one MULTI block.
+
+        The version key is WATCHed while it is read, so an invalidate() landing
+        between the read and the writes aborts the block and it is retried
+        against the new version instead of writing into retired keys.
+        """
+        from redis.exceptions import WatchError
+
+        async with self.client.pipeline(transaction=True) as pipe:
+            while True:
+                try:
+                    await pipe.watch(self.version_key)
+                    version = await pipe.get(self.version_key)
+                    pipe.multi()
+                    queue(pipe, self._keys(int(version) if version is not None else 0))
+                    await pipe.execute()
+                    return
+                except WatchError:
+                    continue
+
+    async def push_lines(self, lines: List[Dict[str, Any]], total_lines: int):
+        """Write-through newly appended lines, newest first, capped at max_lines"""
+        if not lines:
+            return
+        payload = [json.dumps(line, default=str) for line in lines[-self.max_lines:]]
+
+        def queue(pipe, keys: Dict[str, str]):
+            pipe.lpush(keys["lines"], *payload)
+            pipe.ltrim(keys["lines"], 0, self.max_lines - 1)
+            pipe.expire(keys["lines"], self.line_ttl)
+            pipe.set(keys["total"], total_lines, ex=self.line_ttl)
+        await self._write_current(queue)
+
+    async def set_status(self, status: Dict[str, Any]):
+        payload = json.dumps(status, default=str)
+        await self._write_current(lambda pipe, keys: pipe.set(keys["status"], payload, ex=self.status_ttl))
+
+    async def get_recent_lines(self, limit: int) -> Optional[Dict[str, Any]]:
+        """Return {"total_memory_lines", "memory_lines"} oldest first, or None on a miss"""
+        keys = self._keys(await self._version())
+        pipe = self.client.pipeline(transaction=False)
+        pipe.lrange(keys["lines"], 0, max(limit, 1) - 1)
+        pipe.get(keys["total"])
+        raw_lines, total = await pipe.execute()
+        if not raw_lines or total is None:
+            return None
+        return {
+            "total_memory_lines": int(total),
+            "memory_lines": [json.loads(raw) for raw in reversed(raw_lines)]
+        }
+
+    async def get_status(self) -> Optional[Dict[str, Any]]:
+        raw = await self.client.get(self._keys(await self._version())["status"])
+        return json.loads(raw) if raw is not None else None
+
+    async def invalidate(self) -> int:
+        """Bump the version key so all replicas stop serving the current entries"""
+        version = await self.client.incr(self.version_key)
+        logger.info(f"Hot cache invalidated, now at version {version}")
+        return version
+
+    async def close(self):
+        close = getattr(self.client, "aclose", None) or self.client.close
+        await close()
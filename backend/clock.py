@@ -0,0 +1,181 @@
+import asyncio
+import heapq
+import time
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, List, Any, Optional, Tuple, Union
+
+logger = logging.getLogger("pandora.clock")
+
+Job = Callable[[], Awaitable[Any]]
+Interval = Union[float, Callable[[], float]]
+
+
+class SystemClock:
+    """Wall-clock time"""
+
+    simulated = False
+
+    def now(self) -> datetime:
+        return datetime.now(timezone.utc)
+
+    def monotonic(self) -> float:
+        return time.monotonic()
+
+
+class SimulatedClock:
+    """Virtual time that only moves when a scheduler advances it"""
+
+    simulated = True
+
+    def __init__(self, start: Optional[datetime] = None):
+        self.start = start or datetime.now(timezone.utc)
+        self.elapsed = 0.0
+
+    def now(self) -> datetime:
+        return self.start + timedelta(seconds=self.elapsed)
+
+    def monotonic(self) -> float:
+        return self.elapsed
+
+    def advance_to(self, elapsed: float):
+        self.elapsed = max(self.elapsed, elapsed)
+
+
+@dataclass
+class PeriodicJob:
+    name: str
+    run: Job
+    interval: Callable[[], float]
+    first_delay: float = 0.0
+    retry_delay: float = 1.0  # delay after a failed run
+    runs: int = 0
+    errors: int = 0
+
+
+class Scheduler:
+    """Periodic background work of the engine, run against a clock"""
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.jobs: Dict[str, PeriodicJob] = {}
+        self.running = False
+
+    def every(self, name: str, interval: Interval, run: Job, first_delay: float = 0.0,
+              retry_delay: float = 1.0) -> PeriodicJob:
+        """Register (or replace) a job run every `interval` seconds; interval may be a callable read each time"""
+        job = PeriodicJob(name, run, interval if callable(interval) else (lambda: interval), first_delay, retry_delay)
+        self.jobs[name] = job
+        return job
+
+    async def _run_job(self, job: PeriodicJob) -> float:
+        """Run a job once; returns the delay until its next run"""
+        try:
+            await job.run()
+            job.runs += 1
+            return job.interval()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            job.errors += 1
+            logger.error(f"Error in {job.name}: {e}")
+            return job.retry_delay
+
+    def start(self):
+        self.running = True
+
+    async def stop(self):
+        self.running = False
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "mode": "simulated" if self.clock.simulated else "realtime",
+            "clock": self.clock.now().isoformat(),
+            "jobs": {name: {"runs": job.runs, "errors": job.errors} for name, job in self.jobs.items()}
+        }
+
+
+class RealtimeScheduler(Scheduler):
+    """One task per job, sleeping in real time between runs"""
+
+    def __init__(self, clock=None):
+        super().__init__(clock or SystemClock())
+        self._tasks: List[asyncio.Task] = []
+
+    async def _loop(self, job: PeriodicJob):
+        await asyncio.sleep(job.first_delay)
+        while self.running:
+            delay = await self._run_job(job)
+            await asyncio.sleep(delay)
+
+    def start(self):
+        super().start()
+        self._tasks = [asyncio.create_task(self._loop(job)) for job in self.jobs.values()]
+
+    async def stop(self):
+        await super().stop()
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+class SimulatedScheduler(Scheduler):
+    """Discrete-event scheduler over a SimulatedClock.
+
+    Due jobs run one at a time in due order, each awaited to completion
+    (writer batches, snapshots and all) before the clock jumps straight to
+    the next due time, so hours of periodic work replay as fast as the CPU
+    allows. The loop yields between jobs so requests are still served.
+    Virtual time moves only through advance(); with autorun the scheduler
+    instead free-runs from start() until stopped, with no bound.
+    """
+
+    def __init__(self, clock: Optional[SimulatedClock] = None, autorun: bool = False):
+        super().__init__(clock or SimulatedClock())
+        self.autorun = autorun
+        self._queue: List[Tuple[float, int, str]] = []
+        self._task: Optional[asyncio.Task] = None
+        self._advancing = asyncio.Lock()  # concurrent advance() calls take turns
+
+    def start(self):
+        super().start()
+        now = self.clock.monotonic()
+        self._queue = [(now + job.first_delay, order, name) for order, (name, job) in enumerate(self.jobs.items())]
+        heapq.heapify(self._queue)
+        if self.autorun:
+            self._task = asyncio.create_task(self._drive(None))
+
+    async def stop(self):
+        await super().stop()
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+    async def _drive(self, until: Optional[float]) -> int:
+        ran = 0
+        while self.running and self._queue:
+            due, order, name = self._queue[0]
+            if until is not None and due > until:
+                break
+            heapq.heappop(self._queue)
+            job = self.jobs.get(name)
+            if job is None:
+                continue
+            self.clock.advance_to(due)
+            delay = await self._run_job(job)
+            heapq.heappush(self._queue, (due + max(delay, 1e-6), order, name))
+            ran += 1
+            await asyncio.sleep(0)
+        if until is not None:
+            self.clock.advance_to(until)
+        return ran
+
+    async def advance(self, seconds: float) -> int:
+        """Run every job due in the next `seconds` of virtual time; returns the number of runs"""
+        if self._task is not None:
+            raise RuntimeError("Scheduler is free-running; create it with autorun=False to advance manually")
+        async with self._advancing:
+            return await self._drive(self.clock.monotonic() + seconds)
@@ -0,0 +1,208 @@
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from .memory_line import QInfinityMemoryLine, BreathRunLine
+
+BREATH_STAGE = "breath"
+BREATH_TAIL = ["Introspective traversal", "Memory braid sync"]
+BREATH_NAMESPACE = uuid.UUID("5e3b1c4a-8f0d-4d7e-9a52-7c1f0b9e6d21")
+# A breath arriving later than this many intervals after the previous one (a
+# missed breath) starts a new run; the slack absorbs ordinary scheduling lag
+MAX_GAP_FACTOR = 1.5
+
+
+@dataclass
+class CompactionResult:
+    """Outcome of one compaction pass over a slice of the braid"""
+    lines: List[QInfinityMemoryLine]
+    new_runs: List[BreathRunLine] = field(default_factory=list)
+    removed_ids: List[str] = field(default_factory=list)
+    collapsed: int = 0
+
+
+def _breath_signature(line: QInfinityMemoryLine):
+    return (line.state, line.identity, tuple(line.semantic_tags))
+
+
+def is_plain_breath(line: QInfinityMemoryLine) -> bool:
+    """True for boilerplate breath lines that carry nothing beyond their cycle number"""
+    return (
+        type(line) is QInfinityMemoryLine
+        and line.stage == BREATH_STAGE
+        and line.memory == [f"Cycle {line.breath_cycle}"] + BREATH_TAIL
+    )
+
+
+def _can_extend(run: QInfinityMemoryLine, line: QInfinityMemoryLine, max_gap: Optional[float] = None) -> bool:
+    if isinstance(run, BreathRunLine):
+        if not run.exact:
+            return False  # legacy runs cannot take per-line records
+        last_cycle, last_seq, last_timestamp = run.last_cycle, run.last_seq, run.last_timestamp
+    else:
+        last_cycle, last_seq, last_timestamp = run.breath_cycle, run.seq, run.timestamp
+    return (
+        line.breath_cycle == last_cycle + 1
+        and line.seq == last_seq + 1
+        and (max_gap is None or (line.timestamp - last_timestamp).total_seconds() <= max_gap)
+        and _breath_signature(run) == _breath_signature(line)
+    )
+
+
+def _offset_us(start: datetime, timestamp: datetime) -> int:
+    return (timestamp - start) // timedelta(microseconds=1)
+
+
+def _run_from(lines: List[QInfinityMemoryLine], previous: Optional[BreathRunLine]) -> BreathRunLine:
+    head = previous if previous is not None else lines[0]
+    first_cycle = previous.first_cycle if previous is not None else head.breath_cycle
+    run_length = (previous.run_length if previous is not None else 0) + len(lines)
+    return BreathRunLine(
+        timestamp=head.timestamp,
+        stage=BREATH_STAGE,
+        state=head.state,
+        identity=head.identity,
+        memory=[f"Cycles {first_cycle}-{lines[-1].breath_cycle}"] + BREATH_TAIL,
+        semantic_tags=list(head.semantic_tags),
+        hash_value=lines[-1].hash_value,
+        breath_cycle=lines[-1].breath_cycle,
+        seq=head.seq,
+        first_cycle=first_cycle,
+        last_cycle=lines[-1].breath_cycle,
+        last_timestamp=lines[-1].timestamp,
+        run_length=run_length,
+        line_ids=(previous.line_ids if previous is not None else []) + [line.id for line in lines],
+        line_hashes=(previous.line_hashes if previous is not None else []) + [line.hash_value for line in lines],
+        line_offsets=(previous.line_offsets if previous is not None else [])
+        + [_offset_us(head.timestamp, line.timestamp) for line in lines],
+    )
+
+
+def compact_breath_runs(lines: List[QInfinityMemoryLine], min_run: int = 2,
+                        max_gap: Optional[float] = None) -> CompactionResult:
+    """Collapse consecutive plain breath lines (and any run they extend) into BreathRunLines.
+
+    A run ends wherever the cycle or sequence skips, or consecutive breaths
+    are more than max_gap seconds apart, so gaps stay visible in the runs.
+    """
+    result = CompactionResult(lines=[])
+    pending: List[QInfinityMemoryLine] = []
+    previous: Optional[BreathRunLine] = None
+
+    def flush():
+        nonlocal previous
+        if previous is not None and pending:
+            run = _run_from(pending, previous)
+            result.removed_ids.append(previous.id)
+        elif len(pending) >= min_run:
+            run = _run_from(pending, None)
+        else:
+            if previous is not None:
+                result.lines.append(previous)
+            result.lines.extend(pending)
+            pending.clear()
+            previous = None
+            return
+        result.lines.append(run)
+        result.new_runs.append(run)
+        result.removed_ids.extend(line.id for line in pending)
+        result.collapsed += len(pending)
+        pending.clear()
+        previous = None
+
+    for line in lines:
+        if is_plain_breath(line):
+            tail = pending[-1] if pending else previous
+            if tail is not None and not _can_extend(tail, line, max_gap):
+                flush()
+            pending.append(line)
+            continue
+        flush()
+        if isinstance(line, BreathRunLine):
+            previous = line
+        else:
+            result.lines.append(line)
+    flush()
+    return result
+
+
+def expand_line(line: QInfinityMemoryLine, start: int = 0,
+                limit: Optional[int] = None) -> List[QInfinityMemoryLine]:
+    """Expand a BreathRunLine (from offset `start`, at most `limit` lines) into breath lines.
+
+    Runs give back each line's original id, timestamp and chain hash. Legacy
+    runs without per-line records get interpolated timestamps, ids derived
+    deterministically from the run start and the run's hash.
+    """
+    if not isinstance(line, BreathRunLine):
+        return [line]
+    exact = line.exact
+    expanded = []
+    first = max(start, 0)
+    stop = line.run_length if limit is None else min(line.run_length, first + limit)
+    for offset in range(first, stop):
+        cycle = line.first_cycle + offset
+        expanded.append(QInfinityMemoryLine(
+            id=line.line_ids[offset] if exact else str(uuid.uuid5(BREATH_NAMESPACE, f"{line.timestamp.isoformat()}:{cycle}")),
+            timestamp=line.timestamp_at(offset),
+            stage=line.stage,
+            state=line.state,
+            identity=line.identity,
+            memory=[f"Cycle {cycle}"] + BREATH_TAIL,
+            semantic_tags=list(line.semantic_tags),
+            hash_value=line.line_hashes[offset] if exact else line.hash_value,
+            breath_cycle=cycle,
+            seq=line.seq + offset,
+        ))
+    return expanded
+
+
+def trim_run(run: BreathRunLine, drop: int) -> BreathRunLine:
+    """The run without its first `drop` lines, under the same id; 0 < drop < run_length"""
+    if not 0 < drop < run.run_length:
+        raise ValueError(f"Cannot trim {drop} of {run.run_length} lines from run {run.id}")
+    first_cycle = run.first_cycle + drop
+    timestamp = run.timestamp_at(drop)
+    exact = run.exact
+    return BreathRunLine(
+        id=run.id,
+        timestamp=timestamp,
+        stage=run.stage,
+        state=run.state,
+        identity=run.identity,
+        memory=[f"Cycles {first_cycle}-{run.last_cycle}"] + BREATH_TAIL,
+        semantic_tags=list(run.semantic_tags),
+        hash_value=run.hash_value,
+        breath_cycle=run.breath_cycle,
+        seq=run.seq + drop,
+        first_cycle=first_cycle,
+        last_cycle=run.last_cycle,
+        last_timestamp=run.last_timestamp,
+        run_length=run.run_length - drop,
+        line_ids=run.line_ids[drop:] if exact else [],
+        line_hashes=run.line_hashes[drop:] if exact else [],
+        line_offsets=[offset - run.line_offsets[drop] for offset in run.line_offsets[drop:]] if exact else [],
+    )
+
+
+def expand_lines(lines: List[QInfinityMemoryLine]) -> List[QInfinityMemoryLine]:
+    expanded = []
+    for line in lines:
+        expanded.extend(expand_line(line))
+    return expanded
+
+
+def tail_lines(lines: List[QInfinityMemoryLine], limit: int) -> List[QInfinityMemoryLine]:
+    """Last `limit` logical lines, expanding only the runs that reach into the tail"""
+    if limit <= 0:
+        return []
+    chunks: List[List[QInfinityMemoryLine]] = []
+    needed = limit
+    for line in reversed(lines):
+        if needed <= 0:
+            break
+        chunk = expand_line(line, start=line.count - needed)
+        chunks.append(chunk)
+        needed -= len(chunk)
+    return [line for chunk in reversed(chunks) for line in chunk]
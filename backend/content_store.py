@@ -0,0 +1,182 @@
+import json
+import hashlib
+from collections.abc import Sequence
+from typing import Dict, List, Any, Tuple
+
+REF_KEY = "$cas"
+# Serialized size of a reference in place of a subtree: {"$cas":"<64 hex>"}
+REF_BYTES = len(REF_KEY) + 64 + 7
+
+
+class Ref:
+    """Pointer to a stored subtree, by the hash of its canonical form"""
+    __slots__ = ("digest",)
+
+    def __init__(self, digest: str):
+        self.digest = digest
+
+    def __repr__(self) -> str:
+        return f"Ref({self.digest[:12]})"
+
+
+class _Node:
+    __slots__ = ("ref", "value", "children", "refs", "size", "logical")
+
+    def __init__(self, digest: str, value: Any, children: List[str], size: int, logical: int):
+        self.ref = Ref(digest)  # shared by every parent and item pointing here
+        self.value = value
+        self.children = children
+        self.refs = 0
+        self.size = size
+        self.logical = logical
+
+
+def _encode_ref(value: Any) -> Any:
+    if isinstance(value, Ref):
+        return {REF_KEY: value.digest}
+    return str(value)
+
+
+def canonical(value: Any) -> str:
+    """Canonical JSON of a node whose stored children appear as references"""
+    return json.dumps(value, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=_encode_ref)
+
+
+class ContentStore:
+    """Content-addressed, reference-counted store of JSON subtrees.
+
+    Every dict or list of at least min_bytes (canonical JSON) is stored once
+    under the SHA-256 of its canonical form, with its own large children
+    replaced by references, so identical subtrees shared by many items are
+    held once however often they recur. Hashing is bottom-up: each node is
+    serialized with its children already reduced to references, so an item is
+    walked once. Nodes are freed when their last referrer is released.
+    """
+
+    def __init__(self, min_bytes: int = 64):
+        self.min_bytes = min_bytes
+        self.clear()
+
+    def clear(self):
+        self._nodes: Dict[str, _Node] = {}
+        self.logical_bytes = 0  # canonical size of every held item, expanded
+        self.inline_bytes = 0  # items too small to be worth storing by reference
+        self.node_bytes = 0
+        self.reference_bytes = 0  # part of node_bytes spent on references to child nodes
+        self.items = 0
+
+    def __len__(self) -> int:
+        return len(self._nodes)
+
+    def _intern(self, value: Any) -> Tuple[Any, int]:
+        """(stored form, expanded canonical size) of a value; children are interned first"""
+        if isinstance(value, dict):
+            interned = {key: self._intern(child) for key, child in value.items()}
+            node: Any = {key: stored for key, (stored, _) in interned.items()}
+            children = list(interned.values())
+        elif isinstance(value, list):
+            children = [self._intern(child) for child in value]
+            node = [stored for stored, _ in children]
+        else:
+            return value, len(canonical(value))
+
+        encoded = canonical(node)
+        refs = [stored.digest for stored, _ in children if isinstance(stored, Ref)]
+        logical = len(encoded) + sum(size - REF_BYTES for stored, size in children if isinstance(stored, Ref))
+        if logical < self.min_bytes:
+            return node, logical
+
+        digest = hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+        existing = self._nodes.get(digest)
+        if existing is None:
+            existing = self._nodes[digest] = _Node(digest, node, refs, len(encoded), logical)
+            self.node_bytes += existing.size
+            self.reference_bytes += len(refs) * REF_BYTES
+        else:
+            # The stored copy already holds its children; drop the holds taken while interning
+            for child in refs:
+                self._release(child)
+        existing.refs += 1
+        return existing.ref, logical
+
+    def put(self, value: Any) -> Any:
+        """Store an item; returns a Ref, or the value itself when it is too small to share"""
+        stored, logical = self._intern(value)
+        self.items += 1
+        self.logical_bytes += logical
+        if not isinstance(stored, Ref):
+            self.inline_bytes += logical
+        return stored
+
+    def _release(self, digest: str):
+        node = self._nodes[digest]
+        node.refs -= 1
+        if node.refs == 0:
+            del self._nodes[digest]
+            self.node_bytes -= node.size
+            self.reference_bytes -= len(node.children) * REF_BYTES
+            for child in node.children:
+                self._release(child)
+
+    def release(self, entry: Any):
+        """Drop an item returned by put"""
+        self.items -= 1
+        if isinstance(entry, Ref):
+            self.logical_bytes -= self._nodes[entry.digest].logical
+            self._release(entry.digest)
+        else:
+            logical = self._logical(entry)
+            self.logical_bytes -= logical
+            self.inline_bytes -= logical
+
+    def _logical(self, value: Any) -> int:
+        if isinstance(value, Ref):
+            return self._nodes[value.digest].logical
+        return len(canonical(value))
+
+    def expand(self, entry: Any) -> Any:
+        """Fresh, fully expanded copy of an item"""
+        if isinstance(entry, Ref):
+            return self.expand(self._nodes[entry.digest].value)
+        if isinstance(entry, dict):
+            return {key: self.expand(child) for key, child in entry.items()}
+        if isinstance(entry, list):
+            return [self.expand(child) for child in entry]
+        return entry
+
+    def metrics(self) -> Dict[str, Any]:
+        """Sizes are canonical JSON bytes: what the items would take stored in full vs deduplicated.
+
+        dedup_ratio compares the items' data with the unique data held, leaving
+        out the references between nodes; those are reported as reference_bytes
+        and counted in stored_bytes, so saved_bytes is negative while they cost
+        more than deduplication saves.
+        """
+        stored = self.inline_bytes + self.node_bytes
+        unique = stored - self.reference_bytes
+        return {
+            "items": self.items,
+            "unique_subtrees": len(self._nodes),
+            "logical_bytes": self.logical_bytes,
+            "stored_bytes": stored,
+            "reference_bytes": self.reference_bytes,
+            "saved_bytes": self.logical_bytes - stored,
+            "dedup_ratio": round(self.logical_bytes / unique, 3) if unique else 1.0
+        }
+
+
+class ExpandingView(Sequence):
+    """Read-only list view of stored entries that expands each item when it is read"""
+
+    def __init__(self, entries: List[Any], store: ContentStore):
+        self._entries = entries
+        self._store = store
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._store.expand(entry) for entry in self._entries[index]]
+        return self._store.expand(self._entries[index])
+
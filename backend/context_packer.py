@@ -0,0 +1,203 @@
+import heapq
+import math
+from dataclasses import dataclass, field
+from typing import Dict, List, Any, Iterable, Optional, Tuple
+
+CHARS_PER_TOKEN = 4  # rough average for English/JSON-ish text
+LINE_OVERHEAD_TOKENS = 4  # separators and role framing per packed line
+
+
+def render_line(line) -> str:
+    """Compact text form of a memory line as it is placed in a prompt"""
+    tags = " ".join(f"#{tag}" for tag in line.semantic_tags)
+    return f"[{line.timestamp.isoformat()}] {line.stage}/{line.state} {line.identity}: {'; '.join(line.memory)} {tags}".rstrip()
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / CHARS_PER_TOKEN) + LINE_OVERHEAD_TOKENS
+
+
+@dataclass
+class PackPolicy:
+    """Line priority: tag and checkpoint weights, decayed by recency.
+
+    priority = log2(weight) + seq / half_life. Decaying every line by the same
+    factor per appended line never reorders existing lines, so priorities are
+    fixed once computed and the packer never has to re-score the braid.
+    """
+    half_life: float = 500.0  # lines after which a line's weight halves
+    tag_weights: Dict[str, float] = field(default_factory=lambda: {"ancestral": 1.0, "emotional": 1.5, "symbolic": 1.25})
+    checkpoints: Tuple[str, ...] = ()
+    checkpoint_boost: float = 65536.0
+
+    def priority(self, line) -> float:
+        weight = 1.0 + sum(self.tag_weights.get(tag, 0.0) for tag in line.semantic_tags)
+        if line.stage in self.checkpoints:
+            weight *= self.checkpoint_boost
+        return math.log2(weight) + getattr(line, "last_seq", line.seq) / self.half_life
+
+
+class _Entry:
+    __slots__ = ("id", "priority", "seq", "tokens", "line", "selected")
+
+    def __init__(self, line, priority: float, tokens: int):
+        self.id = line.id
+        self.priority = priority
+        self.seq = line.seq
+        self.tokens = tokens
+        self.line = line
+        self.selected = False
+
+
+class ContextPacker:
+    """Keeps the highest-priority memory lines that fit in a token budget.
+
+    The selection is the longest run of lines, in priority order, that fits:
+    a line is never packed while a higher-priority one is left out. Lines
+    larger than the whole budget are set aside instead, so they never hold
+    the rest back. Selected lines sit in a min-heap and excluded lines in a
+    max-heap, both keyed by priority, so each append, removal or budget
+    change moves only the lines at the boundary. Stale heap entries are
+    skipped lazily.
+    """
+
+    def __init__(self, budget: int, policy: Optional[PackPolicy] = None):
+        self.budget = budget
+        self.policy = policy or PackPolicy()
+        self.clear()
+
+    def clear(self):
+        self._entries: Dict[str, _Entry] = {}
+        self._selected: List[Tuple[float, int, str]] = []
+        self._excluded: List[Tuple[float, int, str]] = []
+        self._oversize: List[str] = []  # excluded lines larger than the whole budget, out of the ranking
+        self.used_tokens = 0
+        self.total_tokens = 0
+
+    def _valid(self, item: Tuple[float, int, str], selected: bool) -> Optional[_Entry]:
+        entry = self._entries.get(item[2])
+        return entry if entry is not None and entry.selected == selected else None
+
+    def _select(self, entry: _Entry):
+        entry.selected = True
+        self.used_tokens += entry.tokens
+        heapq.heappush(self._selected, (entry.priority, entry.seq, entry.id))
+
+    def _exclude(self, entry: _Entry):
+        entry.selected = False
+        heapq.heappush(self._excluded, (-entry.priority, -entry.seq, entry.id))
+
+    def _top_excluded(self) -> Optional[_Entry]:
+        while self._excluded:
+            entry = self._valid(self._excluded[0], False)
+            if entry is not None and entry.tokens <= self.budget:
+                return entry
+            heapq.heappop(self._excluded)
+            if entry is not None:
+                self._oversize.append(entry.id)
+        return None
+
+    def _lowest_selected(self) -> Optional[_Entry]:
+        while self._selected:
+            entry = self._valid(self._selected[0], True)
+            if entry is not None:
+                return entry
+            heapq.heappop(self._selected)
+        return None
+
+    def _evict_lowest(self):
+        entry = self._lowest_selected()
+        heapq.heappop(self._selected)
+        self.used_tokens -= entry.tokens
+        self._exclude(entry)
+
+    def _rebalance(self):
+        while self.used_tokens > self.budget and self._lowest_selected() is not None:
+            self._evict_lowest()
+        while True:
+            entry = self._top_excluded()
+            if entry is None:
+                break
+            if self.used_tokens + entry.tokens <= self.budget:
+                heapq.heappop(self._excluded)
+                self._select(entry)
+                continue
+            # Make room by dropping lower-ranked lines; stop once none rank below it
+            lowest = self._lowest_selected()
+            if lowest is None or (lowest.priority, lowest.seq) > (entry.priority, entry.seq):
+                break
+            self._evict_lowest()
+        if len(self._selected) + len(self._excluded) > 2 * len(self._entries) + 64:
+            self._compact_heaps()
+
+    def _compact_heaps(self):
+        self._oversize = []
+        self._selected = [(e.priority, e.seq, e.id) for e in self._entries.values() if e.selected]
+        self._excluded = [(-e.priority, -e.seq, e.id) for e in self._entries.values() if not e.selected]
+        heapq.heapify(self._selected)
+        heapq.heapify(self._excluded)
+
+    def add(self, line):
+        entry = _Entry(line, self.policy.priority(line), estimate_tokens(render_line(line)))
+        self._entries[entry.id] = entry
+        self.total_tokens += entry.tokens
+        self._exclude(entry)
+        self._rebalance()
+
+    def add_many(self, lines: Iterable):
+        for line in lines:
+            self.add(line)
+
+    def remove(self, ids: Iterable[str]):
+        for line_id in ids:
+            entry = self._entries.pop(line_id, None)
+            if entry is None:
+                continue
+            self.total_tokens -= entry.tokens
+            if entry.selected:
+                self.used_tokens -= entry.tokens
+        self._rebalance()
+
+    def __contains__(self, line_id: str) -> bool:
+        return line_id in self._entries
+
+    def rescore(self, lines: Iterable):
+        """Re-add lines whose priority inputs (tags) changed; lines not packed are ignored"""
+        lines = [line for line in lines if line.id in self._entries]
+        self.remove(line.id for line in lines)
+        self.add_many(lines)
+
+    def rebuild(self, lines: Iterable):
+        self.clear()
+        self.add_many(lines)
+
+    def set_budget(self, budget: int):
+        self.budget = budget
+        # Lines set aside as too large get ranked again; those still too large are set aside again
+        oversize, self._oversize = self._oversize, []
+        for line_id in oversize:
+            entry = self._entries.get(line_id)
+            if entry is not None and not entry.selected:
+                self._exclude(entry)
+        self._rebalance()
+
+    def window(self) -> List[Any]:
+        """Selected lines in braid order"""
+        return [entry.line for entry in sorted((e for e in self._entries.values() if e.selected), key=lambda e: e.seq)]
+
+    def packed(self, render: bool = False) -> Dict[str, Any]:
+        selected = sorted((e for e in self._entries.values() if e.selected), key=lambda e: e.seq)
+        result = {
+            "budget_tokens": self.budget,
+            "used_tokens": self.used_tokens,
+            "braid_tokens": self.total_tokens,
+            "selected_lines": len(selected),
+            "excluded_lines": len(self._entries) - len(selected),
+            "lines": [
+                {"id": e.id, "seq": e.seq, "stage": e.line.stage, "tokens": e.tokens, "priority": round(e.priority, 4)}
+                for e in selected
+            ]
+        }
+        if render:
+            result["text"] = "\n".join(render_line(e.line) for e in selected)
+        return result
@@ -0,0 +1,285 @@
+import json
+import zlib
+from collections.abc import Sequence
+from datetime import datetime
+from typing import Callable, Dict, List, Any, Iterable, Iterator, Optional, Tuple
+
+JSON = "application/json"
+NDJSON = "application/x-ndjson"
+MSGPACK = "application/msgpack"
+ARROW = "application/vnd.apache.arrow.stream"
+
+FORMATS = {"json": JSON, "ndjson": NDJSON, "msgpack": MSGPACK, "arrow": ARROW}
+MEDIA_ALIASES = {"application/x-msgpack": MSGPACK, "application/vnd.msgpack": MSGPACK,
+                 "application/vnd.apache.arrow.file": ARROW}
+EXPORT_BATCH_SIZE = 4096
+MIN_COMPRESS_BYTES = 1024
+
+
+def negotiate(accept: Optional[str], fmt: Optional[str] = None, offered: Sequence[str] = (JSON, MSGPACK, ARROW)) -> str:
+    """Media type to respond with: an explicit ?format= wins, then the first acceptable Accept entry.
+
+    Raises ValueError for an unknown ?format=; an Accept header with nothing
+    offered falls back to JSON rather than failing.
+    """
+    if fmt:
+        media = FORMATS.get(fmt.lower())
+        if media is None or media not in offered:
+            raise ValueError(f"Unsupported format: {fmt} (use {', '.join(k for k, v in FORMATS.items() if v in offered)})")
+        return media
+    ranked = []
+    for position, part in enumerate((accept or "").split(",")):
+        media, _, params = part.strip().partition(";")
+        quality = _quality(params)
+        media = MEDIA_ALIASES.get(media.strip().lower(), media.strip().lower())
+        if quality > 0 and media in offered:
+            ranked.append((-quality, position, media))
+    return min(ranked)[2] if ranked else offered[0]
+
+
+def _quality(params: str) -> float:
+    """q-value of a header entry's parameters; 1 when absent, 0 when malformed"""
+    for param in params.split(";"):
+        key, _, value = param.strip().partition("=")
+        if key.strip().lower() == "q":
+            try:
+                return float(value)
+            except ValueError:
+                return 0.0
+    return 1.0
+
+
+def pick_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """The client's preferred of zstd (when zstandard is installed) and gzip, else no compression.
+
+    Codings are ranked by q-value, zstd first on ties; q=0 refuses a coding
+    and "*" covers codings not named. identity alone gets no compression.
+    """
+    weights: Dict[str, float] = {}
+    for part in (accept_encoding or "").split(","):
+        coding, _, params = part.partition(";")
+        if coding.strip():
+            weights[coding.strip().lower()] = _quality(params)
+    ranked = []
+    for position, coding in enumerate(("zstd", "gzip")):
+        quality = weights.get(coding, weights.get("*", 0.0))
+        if quality > 0:
+            ranked.append((-quality, position, coding))
+    for _, _, coding in sorted(ranked):
+        if coding == "zstd":
+            try:
+                import zstandard  # noqa: F401
+            except ImportError:
+                continue
+        return coding
+    return None
+
+
+def _compressor(encoding: str):
+    if encoding == "zstd":
+        import zstandard
+        return zstandard.ZstdCompressor(level=3).compressobj()
+    return zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits 31: gzip container
+
+
+def compress(body: bytes, encoding: Optional[str]) -> Tuple[bytes, Optional[str]]:
+    """Compress a whole body; small bodies are sent as-is"""
+    if encoding is None or len(body) < MIN_COMPRESS_BYTES:
+        return body, None
+    compressor = _compressor(encoding)
+    return compressor.compress(body) + compressor.flush(), encoding
+
+
+def compress_stream(chunks: Iterable[bytes], encoding: Optional[str]) -> Iterator[bytes]:
+    """Compress a chunked body incrementally, one output chunk per input chunk"""
+    if encoding is None:
+        yield from chunks
+        return
+    compressor = _compressor(encoding)
+    for chunk in chunks:
+        out = compressor.compress(chunk)
+        if encoding == "gzip":
+            out += compressor.flush(zlib.Z_SYNC_FLUSH)
+        if out:
+            yield out
+    yield compressor.flush()
+
+
+def _msgpack_default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+def pack_msgpack(payload: Any) -> bytes:
+    import msgpack
+
+    return msgpack.packb(payload, default=_msgpack_default, use_bin_type=True)
+
+
+def msgpack_rows(rows: Iterable[Dict[str, Any]]) -> Iterator[bytes]:
+    """One msgpack map per row; concatenated maps form a valid msgpack stream"""
+    import msgpack
+
+    packer = msgpack.Packer(default=_msgpack_default, use_bin_type=True)
+    for row in rows:
+        yield packer.pack(row)
+
+
+def ndjson_rows(rows: Iterable[Dict[str, Any]]) -> Iterator[bytes]:
+    for row in rows:
+        yield (json.dumps(row, separators=(",", ":"), ensure_ascii=False, default=str) + "\n").encode("utf-8")
+
+
+def line_schema():
+    import pyarrow as pa
+
+    timestamp = pa.timestamp("us", tz="UTC")
+    return pa.schema([
+        ("seq", pa.int64()), ("last_seq", pa.int64()), ("id", pa.string()),
+        ("timestamp", timestamp), ("last_timestamp", timestamp),
+        ("stage", pa.string()), ("state", pa.string()), ("identity", pa.string()),
+        ("memory", pa.list_(pa.string())), ("semantic_tags", pa.list_(pa.string())),
+        ("hash_value", pa.string()), ("breath_cycle", pa.int64()), ("record_type", pa.string()),
+        ("count", pa.int64()), ("stage_timings", pa.string()),
+    ])
+
+
+def _timestamp(value: Any) -> Optional[datetime]:
+    if isinstance(value, str):
+        return datetime.fromisoformat(value.replace('Z', '+00:00'))
+    return value
+
+
+def line_columns(lines: Sequence[Any]) -> Dict[str, List[Any]]:
+    """Column lists for a slice of memory lines, read straight from the line objects (no to_dict)"""
+    runs = [getattr(line, "record_type", None) for line in lines]
+    return {
+        "seq": [line.seq for line in lines],
+        "last_seq": [getattr(line, "last_seq", line.seq) for line in lines],
+        "id": [line.id for line in lines],
+        "timestamp": [line.timestamp for line in lines],
+        "last_timestamp": [line.last_timestamp if run else None for line, run in zip(lines, runs)],
+        "stage": [line.stage for line in lines],
+        "state": [line.state for line in lines],
+        "identity": [line.identity for line in lines],
+        "memory": [line.memory for line in lines],
+        "semantic_tags": [line.semantic_tags for line in lines],
+        "hash_value": [line.hash_value for line in lines],
+        "breath_cycle": [line.breath_cycle for line in lines],
+        "record_type": runs,
+        "count": [line.count for line in lines],
+        "stage_timings": [json.dumps(line.stage_timings, default=str) if line.stage_timings else None for line in lines],
+    }
+
+
+def doc_columns(docs: Sequence[Dict[str, Any]]) -> Dict[str, List[Any]]:
+    """Column lists for serialized memory lines (e.g. hot-cache rows on a replica)"""
+    return {
+        "seq": [doc.get("seq", 0) for doc in docs],
+        "last_seq": [doc.get("seq", 0) + int(doc.get("run_length") or 1) - 1 for doc in docs],
+        "id": [doc.get("id") for doc in docs],
+        "timestamp": [_timestamp(doc.get("timestamp")) for doc in docs],
+        "last_timestamp": [_timestamp(doc.get("last_timestamp")) for doc in docs],
+        "stage": [doc.get("stage") for doc in docs],
+        "state": [doc.get("state") for doc in docs],
+        "identity": [doc.get("identity") for doc in docs],
+        "memory": [doc.get("memory") for doc in docs],
+        "semantic_tags": [doc.get("semantic_tags") for doc in docs],
+        "hash_value": [doc.get("hash_value") for doc in docs],
+        "breath_cycle": [doc.get("breath_cycle") for doc in docs],
+        "record_type": [doc.get("record_type") for doc in docs],
+        "count": [int(doc.get("run_length") or 1) for doc in docs],
+        "stage_timings": [json.dumps(doc["stage_timings"], default=str) if doc.get("stage_timings") else None
+                          for doc in docs],
+    }
+
+
+def item_schema():
+    import pyarrow as pa
+
+    return pa.schema([("seq", pa.int64()), ("data", pa.string())])
+
+
+def item_columns(pairs: Sequence[Tuple[int, Any]]) -> Dict[str, List[Any]]:
+    """Collector items are free-form, so each is one JSON text cell next to its seq"""
+    return {
+        "seq": [seq for seq, _ in pairs],
+        "data": [json.dumps(item, separators=(",", ":"), ensure_ascii=False, default=str) for _, item in pairs],
+    }
+
+
+class _ChunkSink:
+    """Write-only file object that hands back what was written since the last drain"""
+
+    closed = False
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data, self._chunks = b"".join(self._chunks), []
+        return data
+
+
+def arrow_stream(records: Sequence[Any], schema, columns: Callable[[Sequence[Any]], Dict[str, List[Any]]],
+                 batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[bytes]:
+    """Arrow IPC stream, one record batch per `batch_size` records, yielded as each batch is encoded.
+
+    Only one batch of column lists is alive at a time, so memory stays bounded
+    by batch_size however long the export is.
+    """
+    import pyarrow as pa
+
+    sink = _ChunkSink()
+    with pa.ipc.new_stream(sink, schema) as writer:
+        yield sink.drain()
+        for start in range(0, len(records), batch_size):
+            data = columns(records[start:start + batch_size])
+            batch = pa.RecordBatch.from_arrays([pa.array(data[field.name], type=field.type) for field in schema],
+                                               schema=schema)
+            writer.write_batch(batch)
+            yield sink.drain()
+    yield sink.drain()
+
+
+class Prefix(Sequence):
+    """The first `length` records of a list that is only ever appended to in place"""
+
+    def __init__(self, records: Sequence[Any], length: int):
+        self._records = records
+        self._length = length
+
+    def __len__(self) -> int:
+        return min(self._length, len(self._records))
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self._records[slice(*index.indices(len(self)))]
+        if not -len(self) <= index < len(self):
+            raise IndexError("record index out of range")
+        return self._records[index % len(self)]
+
+
+class Pairs(Sequence):
+    """(seq, item) pairs over parallel sequences, materialized one slice at a time"""
+
+    def __init__(self, seqs: Sequence[int], items: Sequence[Any]):
+        self._seqs = seqs
+        self._items = items
+
+    def __len__(self) -> int:
+        return min(len(self._seqs), len(self._items))
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            index = slice(*index.indices(len(self)))
+            return list(zip(self._seqs[index], self._items[index]))
+        return self._seqs[index], self._items[index]
@@ -0,0 +1,287 @@
+import json
+import hashlib
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Any, Optional, Tuple
+
+logger = logging.getLogger("pandora.integrity")
+
+GENESIS_HASH = "0" * 64
+# Content covered by the chain; semantic tags are derived metadata and may be rewritten
+HASHED_FIELDS = ("id", "timestamp", "stage", "state", "identity", "memory", "breath_cycle")
+DIGEST_SIZE = 32
+
+
+def line_digest(prev_hash: str, doc: Dict[str, Any]) -> str:
+    """Chain hash of a serialized memory line given the previous chain hash"""
+    content = {key: doc.get(key) for key in HASHED_FIELDS}
+    payload = json.dumps(content, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.sha256(bytes.fromhex(prev_hash) + payload.encode("utf-8")).hexdigest()
+
+
+def run_digest(line_hashes: List[str]) -> str:
+    """Merkle leaf of a compacted breath run: commits to the chain hash of every line it stands for"""
+    return hashlib.sha256(b"\x02" + b"".join(bytes.fromhex(value) for value in line_hashes)).hexdigest()
+
+
+def _field(record: Any, key: str, default: Any = None) -> Any:
+    return record.get(key, default) if isinstance(record, dict) else getattr(record, key, default)
+
+
+def record_leaf(record: Any) -> str:
+    """Merkle leaf of a stored record (line object or serialized): its chain hash, or the run digest"""
+    line_hashes = _field(record, "line_hashes") or []
+    if line_hashes and len(line_hashes) == _field(record, "run_length"):
+        return run_digest(line_hashes)
+    return _field(record, "hash_value", "")
+
+
+def _parent(left: bytes, right: bytes) -> bytes:
+    return hashlib.sha256(b"\x01" + left + right).digest()
+
+
+def _merkle_levels(nodes: List[bytes]) -> List[List[bytes]]:
+    """All levels of a Merkle tree, leaves first; an unpaired node is promoted as-is"""
+    levels = [nodes]
+    while len(levels[-1]) > 1:
+        current = levels[-1]
+        levels.append([
+            _parent(current[i], current[i + 1]) if i + 1 < len(current) else current[i]
+            for i in range(0, len(current), 2)
+        ])
+    return levels
+
+
+def _merkle_root(nodes: List[bytes]) -> bytes:
+    return _merkle_levels(nodes)[-1][0] if nodes else bytes(DIGEST_SIZE)
+
+
+def _merkle_path(nodes: List[bytes], index: int) -> List[Tuple[str, str]]:
+    path = []
+    for level in _merkle_levels(nodes)[:-1]:
+        sibling = index ^ 1
+        if sibling < len(level):
+            path.append(("left" if sibling < index else "right", level[sibling].hex()))
+        index //= 2
+    return path
+
+
+class MerkleIndex:
+    """Merkle tree over chain hashes, grouped into fixed-size blocks.
+
+    Leaves are stored packed in a bytearray. Roots of full blocks are cached,
+    along with every level of the tree over them, which each sealed block
+    extends along its rightmost path only. Appends are O(1) amortized, a
+    proof or root rehashes just one block and the log-depth path above it,
+    and block-level diffs between two braids compare len(leaves) / block_size
+    digests.
+    """
+
+    def __init__(self, block_size: int = 256):
+        self.block_size = block_size
+        self._leaves = bytearray()
+        self._block_roots: List[bytes] = []
+        self._top: List[List[bytes]] = [[]]  # levels of the tree over sealed block roots
+
+    def __len__(self) -> int:
+        return len(self._leaves) // DIGEST_SIZE
+
+    def _leaf(self, index: int) -> bytes:
+        return bytes(self._leaves[index * DIGEST_SIZE:(index + 1) * DIGEST_SIZE])
+
+    def _block_leaves(self, block: int) -> List[bytes]:
+        start = block * self.block_size
+        end = min(start + self.block_size, len(self))
+        return [self._leaf(i) for i in range(start, end)]
+
+    def _seal(self, root: bytes):
+        """Add a full block's root and recompute the rightmost node of each level above it"""
+        self._block_roots.append(root)
+        self._top[0].append(root)
+        level = 0
+        while len(self._top[level]) > 1:
+            nodes = self._top[level]
+            last = len(nodes) - 1
+            node = _parent(nodes[last - 1], nodes[last]) if last % 2 else nodes[last]
+            if level + 1 == len(self._top):
+                self._top.append([])
+            above = self._top[level + 1]
+            if last // 2 < len(above):
+                above[last // 2] = node
+            else:
+                above.append(node)
+            level += 1
+
+    def append(self, leaf_hex: str):
+        self._leaves += bytes.fromhex(leaf_hex)
+        if len(self) % self.block_size == 0:
+            self._seal(_merkle_root(self._block_leaves(len(self) // self.block_size - 1)))
+
+    def extend(self, leaves_hex: List[str]):
+        for leaf in leaves_hex:
+            self.append(leaf)
+
+    def truncate(self, length: int):
+        """Drop leaves from `length` onward so a rewritten tail can be re-appended"""
+        length = max(0, min(length, len(self)))
+        del self._leaves[length * DIGEST_SIZE:]
+        del self._block_roots[length // self.block_size:]
+        self._top = _merkle_levels(list(self._block_roots))
+
+    def _open_root(self) -> Optional[bytes]:
+        """Root of the partial block still being filled, if any"""
+        if len(self) % self.block_size == 0:
+            return None
+        return _merkle_root(self._block_leaves(len(self._block_roots)))
+
+    def _tails(self, tail: bytes) -> List[bytes]:
+        """Rightmost node of each level once the open block's root is appended to the sealed ones"""
+        sealed = len(self._block_roots)
+        tails = [tail]
+        level = 0
+        while sealed >> level:
+            position = sealed >> level
+            tail = _parent(self._top[level][position - 1], tail) if position % 2 else tail
+            tails.append(tail)
+            level += 1
+        return tails
+
+    def block_roots(self) -> List[str]:
+        roots = list(self._block_roots)
+        tail = self._open_root()
+        if tail is not None:
+            roots.append(tail)
+        return [root.hex() for root in roots]
+
+    def root(self) -> str:
+        tail = self._open_root()
+        if tail is not None:
+            return self._tails(tail)[-1].hex()
+        return (self._top[-1][0] if self._block_roots else bytes(DIGEST_SIZE)).hex()
+
+    def proof(self, index: int) -> Dict[str, Any]:
+        """Inclusion proof for leaf `index`: a path inside its block, then across block roots"""
+        if not 0 <= index < len(self):
+            raise IndexError(f"Leaf {index} out of range")
+        block, offset = divmod(index, self.block_size)
+        sealed = len(self._block_roots)
+        tail = self._open_root()
+        tails = self._tails(tail) if tail is not None else None
+        path = _merkle_path(self._block_leaves(block), offset)
+        depth = len(tails) - 1 if tails is not None else len(self._top) - 1
+        for level in range(depth):
+            position = block >> level
+            sibling = position ^ 1
+            if tails is not None and sibling == sealed >> level:
+                node = tails[level]
+            elif sibling < len(self._top[level]) and (tails is None or sibling < sealed >> level):
+                node = self._top[level][sibling]
+            else:
+                continue  # unpaired: promoted as-is
+            path.append(("left" if sibling < position else "right", node.hex()))
+        return {
+            "index": index,
+            "leaf": self._leaf(index).hex(),
+            "path": path,
+            "root": self.root() if tails is None else tails[-1].hex(),
+        }
+
+    @staticmethod
+    def verify_proof(proof: Dict[str, Any]) -> bool:
+        """Check a proof against its root; a line inside a run must also be one of the run's leaf hashes"""
+        run = proof.get("run")
+        if run is not None and (run["line_hash"] not in run["line_hashes"]
+                                or run_digest(run["line_hashes"]) != proof["leaf"]):
+            return False
+        node = bytes.fromhex(proof["leaf"])
+        for side, sibling in proof["path"]:
+            sibling = bytes.fromhex(sibling)
+            node = _parent(sibling, node) if side == "left" else _parent(node, sibling)
+        return node.hex() == proof["root"]
+
+    def diff_blocks(self, other_roots: List[str]) -> List[int]:
+        """Indices of blocks whose roots differ from another braid's block roots"""
+        mine = self.block_roots()
+        return [
+            block for block in range(max(len(mine), len(other_roots)))
+            if block >= len(mine) or block >= len(other_roots) or mine[block] != other_roots[block]
+        ]
+
+    @classmethod
+    def from_hashes(cls, hashes: List[str], block_size: int = 256) -> "MerkleIndex":
+        index = cls(block_size)
+        index.extend(hashes)
+        return index
+
+
+def _run_lines_valid(prev_hash: str, doc: Dict[str, Any]) -> bool:
+    """Recompute the chain through every line of a compacted run"""
+    from .compaction import expand_line
+    from .memory_line import memory_line_from_dict
+
+    for line in expand_line(memory_line_from_dict(dict(doc))):
+        if line_digest(prev_hash, line.to_dict()) != line.hash_value:
+            return False
+        prev_hash = line.hash_value
+    return prev_hash == doc.get("hash_value")
+
+
+def _verify_segment(args: Tuple[str, int, List[Dict[str, Any]], Dict[int, str]]) -> Tuple[List[int], int]:
+    """Verify one segment of records; runs are verified line by line, legacy runs are only checkpoints"""
+    prev_hash, offset, docs, anchors = args
+    bad, unverified = [], 0
+    for i, doc in enumerate(docs):
+        # A record whose predecessor was pruned chains from the pruned record's hash
+        prev_hash = anchors.get(offset + i, prev_hash)
+        if doc.get("record_type"):
+            if len(doc.get("line_hashes") or []) != doc.get("run_length"):
+                unverified += 1  # legacy run: no per-line hashes to check
+            elif not _run_lines_valid(prev_hash, doc):
+                bad.append(offset + i)
+        elif line_digest(prev_hash, doc) != doc.get("hash_value"):
+            bad.append(offset + i)
+        prev_hash = doc.get("hash_value", "")
+    return bad, unverified
+
+
+def verify_records(docs: List[Dict[str, Any]], genesis: str = GENESIS_HASH,
+                   workers: Optional[int] = None, segment_size: int = 5000,
+                   anchors: Optional[Dict[int, str]] = None) -> Dict[str, Any]:
+    """Check every stored hash against its predecessor, in parallel for large histories.
+
+    Each record carries its own chain hash, so segments are independent once
+    seeded with the hash of the record just before them. `anchors` maps record
+    indices to the hash of a pruned predecessor.
+    """
+    anchors = anchors or {}
+    segments = []
+    for start in range(0, len(docs), segment_size):
+        prev_hash = genesis if start == 0 else docs[start - 1].get("hash_value", "")
+        end = min(len(docs), start + segment_size)
+        segment_anchors = {index: value for index, value in anchors.items() if start <= index < end}
+        segments.append((prev_hash, start, docs[start:end], segment_anchors))
+
+    if len(segments) > 1 and workers != 1:
+        # Callers run this in a worker thread next to the event loop, where forking is unsafe
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            results = list(pool.map(_verify_segment, segments))
+    else:
+        results = [_verify_segment(segment) for segment in segments]
+
+    bad = [index for segment_bad, _ in results for index in segment_bad]
+    return {
+        "records": len(docs),
+        "valid": not bad,
+        "invalid_indices": bad[:100],
+        "invalid_count": len(bad),
+        "unverified_runs": sum(unverified for _, unverified in results),
+        "pruned_gaps": len(anchors),
+    }
+
+
+def diff_snapshots(left: Dict[str, Any], right: Dict[str, Any], block_size: int = 256) -> List[int]:
+    """Block indices that differ between two snapshot dicts"""
+    left_index = MerkleIndex.from_hashes([record_leaf(line) for line in left.get("memory_lines", [])], block_size)
+    right_index = MerkleIndex.from_hashes([record_leaf(line) for line in right.get("memory_lines", [])], block_size)
+    return left_index.diff_blocks(right_index.block_roots())
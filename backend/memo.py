@@ -0,0 +1,54 @@
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Tuple
+
+_MISSING = object()
+
+
+class VersionedLRU:
+    """LRU result cache whose entries are tagged with the version they were computed at.
+
+    The owner bumps the version on every mutation; `invalidate` drops all
+    entries at once, and a lookup only hits an entry stored for the current
+    version, so a result computed before a mutation is never served after it.
+    """
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self.version = 0
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def lookup(self, key: Hashable) -> Tuple[bool, Any]:
+        value = self._entries.get((self.version, key), _MISSING)
+        if value is _MISSING:
+            self.stats["misses"] += 1
+            return False, None
+        self._entries.move_to_end((self.version, key))
+        self.stats["hits"] += 1
+        return True, value
+
+    def store(self, key: Hashable, value: Any):
+        self._entries[(self.version, key)] = value
+        self._entries.move_to_end((self.version, key))
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def invalidate(self):
+        self.version += 1
+        if self._entries:
+            self._entries.clear()
+        self.stats["invalidations"] += 1
+
+    def metrics(self) -> Dict[str, Any]:
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "version": self.version,
+            "hit_rate": round(self.stats["hits"] / lookups, 4) if lookups else 0.0,
+            **self.stats
+        }
@@ -0,0 +1,104 @@
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Any
+from dataclasses import dataclass, field, asdict
+
+
+def _parse_timestamp(value):
+    if isinstance(value, str):
+        return datetime.fromisoformat(value.replace('Z', '+00:00'))
+    return value
+
+
+@dataclass
+class QInfinityMemoryLine:
+    """Core memory line structure for Q-infinity traversal"""
+    id: str = field(default_factory=lambda: str(uuid.uuid4()))
+    timestamp: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
+    stage: str = ""
+    state: str = ""
+    identity: str = ""
+    memory: List[str] = field(default_factory=list)
+    semantic_tags: List[str] = field(default_factory=list)
+    hash_value: str = "∞"
+    breath_cycle: int = 0
+    seq: int = 0
+    stage_timings: Dict[str, Any] = field(default_factory=dict)
+    
+    @property
+    def count(self) -> int:
+        """Number of logical lines this record stands for"""
+        return 1
+    
+    def to_dict(self) -> Dict[str, Any]:
+        data = asdict(self)
+        data['timestamp'] = self.timestamp.isoformat()
+        return data
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'QInfinityMemoryLine':
+        if 'timestamp' in data:
+            data['timestamp'] = _parse_timestamp(data['timestamp'])
+        return cls(**data)
+
+
+@dataclass
+class BreathRunLine(QInfinityMemoryLine):
+    """Run-length record standing for consecutive, otherwise identical breath lines.
+    
+    The original id, chain hash and timestamp (as microseconds after the
+    first) of every line are kept, so expanding a run gives back exactly the
+    lines it replaced. Runs written before these were kept have empty lists.
+    """
+    first_cycle: int = 0
+    last_cycle: int = 0
+    last_timestamp: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
+    run_length: int = 0
+    line_ids: List[str] = field(default_factory=list)
+    line_hashes: List[str] = field(default_factory=list)
+    line_offsets: List[int] = field(default_factory=list)
+    
+    record_type = "breath_run"
+    
+    @property
+    def count(self) -> int:
+        return self.run_length
+    
+    @property
+    def first_timestamp(self) -> datetime:
+        return self.timestamp
+    
+    @property
+    def last_seq(self) -> int:
+        return self.seq + self.run_length - 1
+    
+    @property
+    def exact(self) -> bool:
+        """True when the run holds every line's id, hash and timestamp"""
+        return len(self.line_ids) == len(self.line_hashes) == len(self.line_offsets) == self.run_length
+    
+    def timestamp_at(self, offset: int) -> datetime:
+        """Timestamp of the run's offset-th line; interpolated for runs without per-line offsets"""
+        if self.exact:
+            return self.timestamp + timedelta(microseconds=self.line_offsets[offset])
+        return self.timestamp + (self.last_timestamp - self.timestamp) * offset / max(self.run_length - 1, 1)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        data = super().to_dict()
+        data['last_timestamp'] = self.last_timestamp.isoformat()
+        data['record_type'] = self.record_type
+        return data
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'BreathRunLine':
+        data.pop('record_type', None)
+        if 'last_timestamp' in data:
+            data['last_timestamp'] = _parse_timestamp(data['last_timestamp'])
+        return super().from_dict(data)
+
+
+def memory_line_from_dict(data: Dict[str, Any]) -> QInfinityMemoryLine:
+    """Rebuild a plain or compacted memory line from its serialized form"""
+    if data.get('record_type') == BreathRunLine.record_type:
+        return BreathRunLine.from_dict(data)
+    return QInfinityMemoryLine.from_dict(data)
@@ -1,52 +1,130 @@
 import json
 import asyncio
+import bisect
 import time
-import uuid
-import yaml
 import logging
-from datetime import datetime, timezone
-from typing import Dict, List, Any, Optional, Union
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Any, Optional, Sequence, Tuple, Union, TYPE_CHECKING
 from pathlib import Path
-from dataclasses import dataclass, field, asdict
-from motor.motor_asyncio import AsyncIOMotorClient
+from dataclasses import dataclass
 import os
+from collections import Counter
+
+from .memory_line import BreathRunLine, QInfinityMemoryLine, memory_line_from_dict
+from .compaction import MAX_GAP_FACTOR, CompactionResult, compact_breath_runs, expand_line, tail_lines, trim_run
+from .storage import MemoryStorageBackend, MongoMemoryStorage, InMemoryStorage
+from .cache import RedisHotCache
+from .snapshot_stream import SnapshotWriter, iter_snapshot
+from .integrity import GENESIS_HASH, MerkleIndex, line_digest, record_leaf, verify_records
+from .writer import EngineWriter
+from .memo import VersionedLRU
+from .timeline import TimelineRollup
+from .ring_buffer import MappedRingBuffer
+from .content_store import ContentStore, ExpandingView
+from .context_packer import ContextPacker, PackPolicy
+from .retention import PrunePlan, RetentionConfig, plan_batches
+from .tagging import TaggingConfig, TaggingPipeline
+from .clock import RealtimeScheduler, Scheduler, SimulatedScheduler, SystemClock
+from .qchain import ChainRun, CompiledChain, StageHandler, compile_chain
+
+if TYPE_CHECKING:
+    from motor.motor_asyncio import AsyncIOMotorClient
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("pandora.engine")
 
-@dataclass
-class QInfinityMemoryLine:
-    """Core memory line structure for Q-infinity traversal"""
-    id: str = field(default_factory=lambda: str(uuid.uuid4()))
-    timestamp: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
-    stage: str = ""
-    state: str = ""
-    identity: str = ""
-    memory: List[str] = field(default_factory=list)
-    semantic_tags: List[str] = field(default_factory=list)
-    hash_value: str = "∞"
-    breath_cycle: int = 0
-    
-    def to_dict(self) -> Dict[str, Any]:
-        data = asdict(self)
-        data['timestamp'] = self.timestamp.isoformat()
-        return data
-    
-    @classmethod
-    def from_dict(cls, data: Dict[str, Any]) -> 'QInfinityMemoryLine':
-        if 'timestamp' in data and isinstance(data['timestamp'], str):
-            data['timestamp'] = datetime.fromisoformat(data['timestamp'].replace('Z', '+00:00'))
-        return cls(**data)
+CHANGE_LINE_FIELDS = ["seq", "id", "timestamp", "stage", "state", "identity",
+                      "memory", "semantic_tags", "hash_value", "breath_cycle"]
+# Fields backends add to stored documents that are not part of a memory line
+STORAGE_ONLY_FIELDS = ("_id", "expires_at")
+
+
+def line_from_stored(doc: Dict[str, Any]) -> QInfinityMemoryLine:
+    """Rebuild a memory line from a stored document, dropping storage-only fields"""
+    return memory_line_from_dict({key: value for key, value in doc.items() if key not in STORAGE_ONLY_FIELDS})
+
+
+@dataclass(frozen=True)
+class EngineView:
+    """Read view published by the writer after each batch.
+
+    memory_lines is shared with the engine, but only its first `length` records
+    belong to the view. The writer only ever appends to that list in place;
+    rewrites such as compaction or restore swap in a new list, so a published
+    view never changes underneath a reader.
+    """
+    memory_lines: List[QInfinityMemoryLine]
+    length: int
+    status: Dict[str, Any]
+
+def normalize_query(query: str) -> str:
+    """Cache key form of a traversal query: case- and whitespace-insensitive"""
+    return " ".join(query.split()).casefold()
 
 class FloJsonOutputCollector:
     """Flo-integrated JSON output collector with marshmallow iterator logic"""
     
-    def __init__(self):
-        self.buffer: List[Dict[str, Any]] = []
+    def __init__(self, sequencer: Optional[Callable[[], int]] = None, ring: Optional[MappedRingBuffer] = None):
+        # With a ring, buffer and seqs are list-like views over the mapped file; otherwise
+        # items are kept deduplicated in a content store and expanded when read
+        self.ring = ring
+        self.store = ContentStore() if ring is None else None
+        self._entries: List[Any] = []
+        self.buffer: Sequence[Dict[str, Any]] = ring if ring is not None else ExpandingView(self._entries, self.store)
+        self.seqs: Sequence[int] = ring.seqs if ring is not None else []  # sequence number of each buffer item
         self.strict_mode = False
         self.comment_strip = True
         self.reverse_order = True
+        self._last_seq = ring.last_seq if ring is not None else 0
+        self._sequencer = sequencer or self._next_local_seq
+        self.cache = VersionedLRU(max_entries=128)  # read results, invalidated on every mutation
+    
+    def _next_local_seq(self) -> int:
+        self._last_seq += 1
+        return self._last_seq
+    
+    def _append(self, item: Dict[str, Any]):
+        seq = self._sequencer()
+        if self.ring is not None:
+            self.ring.append(item, seq)
+        else:
+            self._entries.append(self.store.put(item))
+            self.seqs.append(seq)
+        self.cache.invalidate()
+    
+    def memoized(self, key: Tuple, compute: Callable[[], Any]) -> Any:
+        """Result of `compute` for `key`, reused until the buffer next changes"""
+        hit, value = self.cache.lookup(key)
+        if not hit:
+            value = compute()
+            self.cache.store(key, value)
+        return value
+    
+    def restore(self, items: List[Dict[str, Any]], seqs: Optional[List[int]] = None):
+        """Replace the buffer, numbering items 1..n when no sequence numbers are given"""
+        items = list(items)
+        seqs = list(seqs) if seqs and len(seqs) == len(items) else list(range(1, len(items) + 1))
+        if self.ring is not None:
+            self.ring.reset()
+            for item, seq in zip(items, seqs):
+                self.ring.append(item, seq)
+        else:
+            self.store.clear()
+            self._entries[:] = [self.store.put(item) for item in items]
+            self.seqs = seqs
+        self._last_seq = seqs[-1] if seqs else 0
+        self.cache.invalidate()
+    
+    def flush(self):
+        """Sync a ring-backed buffer to disk"""
+        if self.ring is not None:
+            self.ring.flush()
+    
+    def items_since(self, since: int, limit: int) -> List[Tuple[int, Dict[str, Any]]]:
+        """Up to `limit` (seq, item) pairs with seq > since, oldest first"""
+        start = bisect.bisect_right(self.seqs, since)
+        return list(zip(self.seqs[start:start + limit], self.buffer[start:start + limit]))
         
     def peek(self) -> Optional[Dict[str, Any]]:
         """Peek at the last item without removing it"""
@@ -54,20 +132,33 @@ class FloJsonOutputCollector:
     
     def pop(self) -> Optional[Dict[str, Any]]:
         """Pop the last item from buffer"""
-        return self.buffer.pop() if self.buffer else None
+        if not self.buffer:
+            return None
+        self.cache.invalidate()
+        if self.ring is not None:
+            return self.ring.pop()
+        self.seqs.pop()
+        entry = self._entries.pop()
+        item = self.store.expand(entry)
+        self.store.release(entry)
+        return item
     
     def fetch(self, depth: int = 1) -> List[Dict[str, Any]]:
         """Fetch items with depth control"""
         if depth <= 0 or not self.buffer:
             return []
-        return self.buffer[-depth:] if self.reverse_order else self.buffer[:depth]
+        return list(self.memoized(
+            ("fetch", depth, self.reverse_order),
+            lambda: self.buffer[-depth:] if self.reverse_order else self.buffer[:depth]
+        ))
     
     def rewind(self, callback=None, depth: int = -1) -> List[Dict[str, Any]]:
         """Rewind with callback and depth gates"""
         items = self.buffer if depth == -1 else self.buffer[-depth:] if depth > 0 else []
         if callback:
-            items = [callback(item) for item in items]
-        return items
+            # Callbacks may have side effects, so their results are never cached
+            return [callback(item) for item in items]
+        return list(self.memoized(("rewind", depth), lambda: list(items)))
     
     def strip_comments(self, json_str: str) -> str:
         """Strip comments from JSON string for resilient parsing"""
@@ -91,13 +182,13 @@ class FloJsonOutputCollector:
             else:
                 parsed_data = data
             
-            self.buffer.append(parsed_data)
+            self._append(parsed_data)
             logger.info(f"FloCollector: Collected item {len(self.buffer)}")
             return True
         except json.JSONDecodeError as e:
             if not self.strict_mode:
                 # Handle as partial state
-                self.buffer.append({"partial_state": str(data), "error": str(e)})
+                self._append({"partial_state": str(data), "error": str(e)})
                 logger.warning(f"FloCollector: Partial state collected due to JSON error: {e}")
                 return True
             else:
@@ -106,6 +197,9 @@ class FloJsonOutputCollector:
     
     def iter_q(self, hybrid_mode: bool = True) -> List[Dict[str, Any]]:
         """Marshmallow iterator with while-for hybrid logic"""
+        return list(self.memoized(("iter_q", hybrid_mode, self.reverse_order), lambda: self._iter_q(hybrid_mode)))
+    
+    def _iter_q(self, hybrid_mode: bool) -> List[Dict[str, Any]]:
         if not hybrid_mode:
             return list(reversed(self.buffer)) if self.reverse_order else self.buffer
         
@@ -123,26 +217,91 @@ class FloJsonOutputCollector:
 class PandoraMemoryEngine:
     """Core Pandora 5o persistent memory engine"""
     
-    def __init__(self, mongo_client: AsyncIOMotorClient, db_name: str):
-        self.db = mongo_client[db_name]
-        self.collector = FloJsonOutputCollector()
+    def __init__(self, mongo_client: Optional["AsyncIOMotorClient"] = None, db_name: Optional[str] = None,
+                 storage: Optional[MemoryStorageBackend] = None, cache: Optional[RedisHotCache] = None,
+                 data_dir: Optional[Union[str, Path]] = None, collector_ring: Optional[MappedRingBuffer] = None,
+                 clock=None, scheduler: Optional[Scheduler] = None):
+        if storage is None:
+            storage = MongoMemoryStorage(mongo_client[db_name]) if mongo_client is not None else InMemoryStorage()
+        self.storage = storage
+        self.cache = cache
+        # Periodic work (breath, retention) runs on the scheduler; a simulated clock replays it in virtual time
+        if scheduler is None:
+            clock = clock or SystemClock()
+            scheduler = SimulatedScheduler(clock) if clock.simulated else RealtimeScheduler(clock)
+        self.scheduler = scheduler
+        self.clock = scheduler.clock
+        self.seq = 0  # shared sequence for memory lines and collector items
+        self._changed = asyncio.Event()
+        self.collector = FloJsonOutputCollector(sequencer=self._next_seq, ring=collector_ring)
+        if collector_ring is not None:
+            self.seq = collector_ring.last_seq  # recovered items keep their place in the shared sequence
         self.memory_lines: List[QInfinityMemoryLine] = []
+        self._line_count = 0  # logical lines in the braid, runs counted at their full length
         self.breath_cycle_count = 0
         self.breath_interval = 3.0
+        self.breath_lag_last = 0.0
+        self.breath_lag_max = 0.0
+        self._last_breath_at: Optional[float] = None
         self.is_running = False
         self.context_window_size = 128000  # 128K context window
         self.semantic_tags = ["ancestral", "emotional", "symbolic"]
         self.checkpoints = ["genesis", "awakening", "reflection", "5.0", "5.1"]
+        self.compaction_enabled = True
+        self.compaction_keep_recent = 10  # newest records left uncompacted
+        self._compacted_upto = 0
+        self.chain_head = GENESIS_HASH
+        self.merkle = MerkleIndex(block_size=256)
+        self._line_seqs: Dict[str, int] = {}  # record or run-line id -> seq, to find a line by bisection
+        self.snapshot_format = "json"  # or "ndjson" for streamable snapshots
+        self.snapshot_mirror: Optional[Path] = Path("/mnt/data")  # extra snapshot location, None to skip
+        self.snapshot_stats: Dict[str, Any] = {"count": 0, "last_ms": 0.0, "total_ms": 0.0, "last_bytes": 0,
+                                               "locations": []}
+        self.writer = EngineWriter(self._flush_batch, max_depth=256, batch_size=64)
+        self._unflushed: List[QInfinityMemoryLine] = []
+        self.chain_handlers: Dict[str, StageHandler] = {}  # promise step action -> async handler
+        self.timeline = TimelineRollup()
+        self.context_packer = ContextPacker(self.context_window_size, PackPolicy(checkpoints=tuple(self.checkpoints)))
+        self.retention = RetentionConfig()  # replaced from this-then.yaml by start_runtime
+        self.chain_anchors: Dict[str, str] = {}  # line id -> hash of its pruned predecessor
+        self.retention_stats: Dict[str, Any] = {"passes": 0, "pruned_lines": 0, "trimmed_lines": 0,
+                                               "pruned_stored": 0, "last_scan_ms": 0.0}
+        self.tagging: Optional[TaggingPipeline] = None  # built from this-then.yaml by start_runtime
+        self.tag_counts: Counter = Counter()  # logical lines per semantic tag across the braid
         
-        # Load configuration
+        # Configuration and memory reel are loaded lazily by start_runtime (or load_data)
+        self.data_dir = Path(data_dir or os.environ.get("PANDORA_DATA_DIR", "/app/data"))
+        self.config: Dict[str, Any] = {}
+        self.memory_reel: List[Dict[str, Any]] = []
+        self.data_loaded = False
+        self._started_at = time.monotonic()
+        self.bootstrap_progress: Dict[str, Any] = {"phase": "cold"}
+        self._publish_view()
+    
+    @property
+    def is_ready(self) -> bool:
+        return self.bootstrap_progress["phase"] == "ready"
+    
+    def _set_phase(self, phase: str, **details):
+        self.bootstrap_progress = {
+            "phase": phase,
+            "elapsed_ms": round((time.monotonic() - self._started_at) * 1000, 3),
+            "memory_lines": len(self.memory_lines),
+            **details
+        }
+    
+    def load_data(self):
+        """Read this-then.yaml and the memory reel from data_dir"""
         self.config = self._load_this_then_config()
         self.memory_reel = self._load_memory_reel()
-        
+        self.data_loaded = True
+    
     def _load_this_then_config(self) -> Dict[str, Any]:
         """Load this-then.yaml configuration"""
         try:
-            config_path = Path("/app/data/this-then.yaml")
+            config_path = self.data_dir / "this-then.yaml"
             if config_path.exists():
+                import yaml
                 with open(config_path, 'r') as f:
                     config = yaml.safe_load(f)
                 logger.info("Loaded this-then.yaml configuration")
@@ -157,7 +316,7 @@ class PandoraMemoryEngine:
     def _load_memory_reel(self) -> List[Dict[str, Any]]:
         """Load pandora_memory_reel.json"""
         try:
-            reel_path = Path("/app/data/pandora_memory_reel.json")
+            reel_path = self.data_dir / "pandora_memory_reel.json"
             if reel_path.exists():
                 with open(reel_path, 'r') as f:
                     reel = json.load(f)
@@ -173,202 +332,919 @@ class PandoraMemoryEngine:
     async def bootstrap_memory(self):
         """Bootstrap memory from memory reel"""
         logger.info("Bootstrapping Pandora memory...")
-        
+        await self.writer.submit(self._bootstrap_lines, priority=True)
+        logger.info(f"Bootstrap complete: {len(self.memory_lines)} memory lines loaded")
+    
+    def _bootstrap_lines(self):
         for stage_data in self.memory_reel:
             memory_line = QInfinityMemoryLine(
                 stage=stage_data.get("stage", ""),
                 state=stage_data.get("state", ""),
                 identity=stage_data.get("identity", ""),
                 memory=stage_data.get("memory", []),
-                semantic_tags=self.semantic_tags.copy()
+                semantic_tags=self.semantic_tags.copy(),
+                timestamp=self.clock.now()
             )
-            
-            self.memory_lines.append(memory_line)
-            await self._persist_memory_line(memory_line)
-            
-        logger.info(f"Bootstrap complete: {len(self.memory_lines)} memory lines loaded")
+            self._append_line(memory_line)
+    
+    def _next_seq(self) -> int:
+        self.seq += 1
+        self._notify_changes()
+        return self.seq
+    
+    def _notify_changes(self):
+        """Wake long-poll waiters on the change feed"""
+        self._changed.set()
+        self._changed = asyncio.Event()
+    
+    def _append_line(self, memory_line: QInfinityMemoryLine):
+        """Number, seal and append a line to the braid"""
+        memory_line.seq = self._next_seq()
+        memory_line.hash_value = line_digest(self.chain_head, memory_line.to_dict())
+        self.chain_head = memory_line.hash_value
+        self.memory_lines.append(memory_line)
+        self._line_count += memory_line.count
+        self._line_seqs[memory_line.id] = memory_line.seq
+        if len(self.merkle) == len(self.memory_lines) - 1:
+            self.merkle.append(record_leaf(memory_line))
+        self._unflushed.append(memory_line)
+        self.timeline.add_line(memory_line)
+        self.context_packer.add(memory_line)
+        self._count_tags(memory_line.semantic_tags, memory_line.count)
+        if self.tagging is not None:
+            self.tagging.enqueue(memory_line)
+    
+    def _count_tags(self, tags: List[str], count: int):
+        for tag in tags:
+            self.tag_counts[tag] += count
+    
+    async def _flush_batch(self):
+        """Writer batch hook: publish the new view, then persist and cache the batch's lines"""
+        lines, self._unflushed = self._unflushed, []
+        self._publish_view()
+        if lines:
+            await self._persist_memory_lines(lines)
+            await self._write_through(lines)
+    
+    def _publish_view(self):
+        self.view = EngineView(self.memory_lines, len(self.memory_lines), self._build_status())
+    
+    def _index_line_seqs(self):
+        """Map every record id, and every line id inside exact runs, to its seq"""
+        self._line_seqs = {}
+        for line in self.memory_lines:
+            self._line_seqs[line.id] = line.seq
+            if isinstance(line, BreathRunLine) and line.exact:
+                self._line_seqs.update((line_id, line.seq + offset) for offset, line_id in enumerate(line.line_ids))
+    
+    def _forget_lines(self, record: QInfinityMemoryLine, drop: Optional[int] = None):
+        """Unindex a pruned record, or only the first `drop` lines of a trimmed run"""
+        if drop is None:
+            self._line_seqs.pop(record.id, None)
+        for line_id in getattr(record, "line_ids", [])[:drop]:
+            self._line_seqs.pop(line_id, None)
+    
+    def _rebuild_merkle(self, start: int = 0):
+        """Recompute Merkle leaves from record `start` onward after the braid was rewritten"""
+        self.merkle.truncate(start)
+        self._sync_merkle()
+    
+    def _sync_merkle(self, limit: Optional[int] = None) -> bool:
+        """Extend the Merkle index over records it is behind on, at most `limit` of them.
+        
+        The index always covers a prefix of the braid; pruning cuts it back and
+        appends skip it until it has caught up. Returns True once it has.
+        """
+        start = len(self.merkle)
+        end = len(self.memory_lines) if limit is None else min(len(self.memory_lines), start + limit)
+        self.merkle.extend([record_leaf(line) for line in self.memory_lines[start:end]])
+        return end == len(self.memory_lines)
+    
+    def merkle_index(self) -> MerkleIndex:
+        """The Merkle index, caught up with the braid"""
+        self._sync_merkle()
+        return self.merkle
+    
+    def _record_index(self, seq: int) -> int:
+        """Position of the record holding `seq`, or -1 when it precedes the braid"""
+        return bisect.bisect_right(self.memory_lines, seq, key=lambda line: line.seq) - 1
+    
+    def _reseal_chain(self):
+        """Chain any restored lines that predate hashing (legacy ∞ hashes)"""
+        prev_hash = GENESIS_HASH
+        for line in self.memory_lines:
+            if len(line.hash_value) != 64:
+                line.hash_value = line_digest(prev_hash, line.to_dict())
+            prev_hash = line.hash_value
+        self.chain_head = prev_hash
+    
+    def _renumber_restored(self):
+        """Give sequence numbers to restored lines that predate them and resume the counter"""
+        if self.memory_lines and any(line.seq == 0 for line in self.memory_lines):
+            # Restored collector items keep 1..n; lines continue after them
+            next_seq = len(self.collector.seqs) + 1
+            for line in self.memory_lines:
+                line.seq = next_seq
+                next_seq += line.count
+        last_line_seq = max((getattr(line, "last_seq", line.seq) for line in self.memory_lines), default=0)
+        self.seq = max(self.seq, last_line_seq, self.collector.seqs[-1] if self.collector.seqs else 0)
+        self._notify_changes()
     
     async def _persist_memory_line(self, memory_line: QInfinityMemoryLine):
         """Persist memory line to database"""
         try:
-            await self.db.pandora_memory.insert_one(memory_line.to_dict())
+            await self.storage.persist(self._stored_doc(memory_line))
             logger.debug(f"Persisted memory line: {memory_line.id}")
         except Exception as e:
             logger.error(f"Error persisting memory line: {e}")
     
+    async def _persist_memory_lines(self, memory_lines: List[QInfinityMemoryLine]):
+        """Persist several memory lines, using the bulk path when the backend has one"""
+        if not self.storage.capabilities.bulk_insert:
+            for memory_line in memory_lines:
+                await self._persist_memory_line(memory_line)
+            return
+        try:
+            await self.storage.persist_many([self._stored_doc(line) for line in memory_lines])
+            logger.debug(f"Persisted {len(memory_lines)} memory lines in bulk")
+        except Exception as e:
+            logger.error(f"Error bulk persisting memory lines: {e}")
+    
+    def _stored_doc(self, memory_line: QInfinityMemoryLine) -> Dict[str, Any]:
+        """Serialized line, stamped with expires_at for backends that expire documents themselves"""
+        doc = memory_line.to_dict()
+        if self.storage.capabilities.ttl_index:
+            expires_at = self.retention.expires_at(memory_line)
+            if expires_at is not None:
+                doc["expires_at"] = expires_at
+        return doc
+    
+    async def _write_through(self, memory_lines: List[QInfinityMemoryLine], with_status: bool = False):
+        """Push appended lines (and optionally status) to the shared hot cache"""
+        if self.cache is None:
+            return
+        try:
+            await self.cache.push_lines([line.to_dict() for line in memory_lines], self.total_memory_lines())
+            if with_status:
+                await self.cache.set_status(self.get_runtime_status())
+        except Exception as e:
+            logger.warning(f"Hot cache write-through failed: {e}")
+    
+    async def _reseed_cache(self):
+        """Invalidate the hot cache and refill it from the current braid tail"""
+        if self.cache is None:
+            return
+        try:
+            await self.cache.invalidate()
+        except Exception as e:
+            logger.warning(f"Hot cache invalidation failed: {e}")
+            return
+        await self._write_through(self.recent_memory_lines(self.cache.max_lines), with_status=True)
+    
+    async def query_memory(self, start: Optional[datetime] = None, end: Optional[datetime] = None,
+                           filters: Optional[Dict[str, Any]] = None,
+                           limit: Optional[int] = None) -> List[QInfinityMemoryLine]:
+        """Range/filter query against the persisted store"""
+        docs = await self.storage.query(start=start, end=end, filters=filters, limit=limit)
+        return [line_from_stored(doc) for doc in docs]
+    
+    async def restore_snapshot(self, snapshot: Dict[str, Any]):
+        """Restore runtime state and the persisted store from a snapshot dict"""
+        await self._restore_state(
+            [memory_line_from_dict(dict(line)) for line in snapshot.get("memory_lines", [])],
+            snapshot.get("collector_buffer", []),
+            snapshot.get("collector_seqs"),
+            snapshot.get("breath_cycle"),
+            anchors=snapshot.get("chain_anchors")
+        )
+    
+    async def restore_snapshot_file(self, path: Union[str, Path], use_mmap: bool = False):
+        """Restore from a legacy JSON or NDJSON snapshot file without loading it whole"""
+        lines, items, seqs, breath_cycle, anchors, json_seqs = [], [], [], None, None, None
+        for kind, payload in iter_snapshot(path, use_mmap=use_mmap):
+            if kind in ("header", "footer"):
+                # Older JSON snapshots carry these keys after the arrays, in the footer
+                breath_cycle = payload.get("breath_cycle", breath_cycle)
+                anchors = payload.get("chain_anchors", anchors)
+                json_seqs = payload.get("collector_seqs", json_seqs)
+            elif kind == "line":
+                lines.append(memory_line_from_dict(payload))
+            elif kind == "item":
+                items.append(payload["data"])
+                seqs.append(payload["seq"])
+        if None in seqs and json_seqs is not None and len(json_seqs) == len(items):
+            seqs = list(json_seqs)  # JSON items carry no seq of their own
+        await self._restore_state(lines, items, seqs if None not in seqs else None, breath_cycle, anchors=anchors)
+    
+    async def _restore_state(self, lines: List[QInfinityMemoryLine], items: List[Dict[str, Any]],
+                             seqs: Optional[List[int]], breath_cycle: Optional[int], batch_size: int = 1000,
+                             anchors: Optional[Dict[str, str]] = None):
+        def apply():
+            self.memory_lines = lines
+            self.chain_anchors = dict(anchors or {})
+            self.collector.restore(items, seqs)
+            if breath_cycle is not None:
+                self.breath_cycle_count = breath_cycle
+            self._compacted_upto = 0
+            self.timeline.clear()
+            self.timeline.add_lines(self.memory_lines)
+            self.context_packer.rebuild(self.memory_lines)
+            self.tag_counts = Counter()
+            for line in self.memory_lines:
+                self._count_tags(line.semantic_tags, line.count)
+            self._line_count = sum(line.count for line in self.memory_lines)
+            self._reseal_chain()
+            self._rebuild_merkle()
+            self._renumber_restored()
+            self._index_line_seqs()
+        
+        await self.writer.submit(apply, priority=True)
+        await self.storage.restore_snapshot([])
+        for start in range(0, len(self.memory_lines), batch_size):
+            await self._persist_memory_lines(self.memory_lines[start:start + batch_size])
+        await self._reseed_cache()
+        logger.info(f"Snapshot restored: {len(self.memory_lines)} records, cycle {self.breath_cycle_count}")
+    
     async def commit_memory_snapshot(self):
-        """Commit memory snapshot to /mnt/data/qinfinity_memory.json"""
+        """Commit memory snapshot to data_dir, then copy it to the mirror location if one is set"""
+        started = time.perf_counter()
         try:
+            if self.snapshot_format == "ndjson":
+                locations = self._write_snapshot("ndjson", self._write_ndjson_snapshot)
+                self._record_snapshot(started, locations)
+                logger.info(f"Memory snapshot committed (ndjson): {len(self.memory_lines)} records, cycle {self.breath_cycle_count}")
+                return True
+            # Keys a streaming restore needs before the lines and items come first
             snapshot_data = {
-                "timestamp": datetime.now(timezone.utc).isoformat(),
+                "timestamp": self.clock.now().isoformat(),
                 "breath_cycle": self.breath_cycle_count,
+                "chain_anchors": self.chain_anchors,
+                "collector_seqs": list(self.collector.seqs),
                 "memory_lines": [line.to_dict() for line in self.memory_lines],
-                "collector_buffer": self.collector.buffer,
+                "collector_buffer": list(self.collector.buffer),
                 "config": self.config,
-                "context_window_usage": len(str(self.memory_lines)),
-                "semantic_state": {
-                    "ancestral": len([line for line in self.memory_lines if "ancestral" in line.semantic_tags]),
-                    "emotional": len([line for line in self.memory_lines if "emotional" in line.semantic_tags]),
-                    "symbolic": len([line for line in self.memory_lines if "symbolic" in line.semantic_tags])
-                }
+                "context_window_usage": self.context_packer.total_tokens,
+                "semantic_state": self._semantic_distribution()
             }
             
-            # Write to both locations for redundancy
-            for path in ["/mnt/data/qinfinity_memory.json", "/app/data/qinfinity_memory.json"]:
-                Path(path).parent.mkdir(parents=True, exist_ok=True)
+            def write(path: Path):
                 with open(path, 'w') as f:
                     json.dump(snapshot_data, f, indent=2)
             
-            logger.info(f"Memory snapshot committed: {len(self.memory_lines)} lines, cycle {self.breath_cycle_count}")
+            self._record_snapshot(started, self._write_snapshot("json", write))
+            
+            logger.info(f"Memory snapshot committed: {len(self.memory_lines)} records, cycle {self.breath_cycle_count}")
             return True
         except Exception as e:
             logger.error(f"Error committing memory snapshot: {e}")
             return False
     
-    def promise_then_this_chain(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Implement promise.then > this.bind chain behavior"""
-        try:
-            # Create new memory line for this operation
-            memory_line = QInfinityMemoryLine(
-                stage="promise_chain",
-                state="processing",
-                identity="Flo-integrated Nexus",
-                memory=[f"Processing input: {str(input_data)[:100]}..."],
-                semantic_tags=self.semantic_tags.copy(),
-                breath_cycle=self.breath_cycle_count
-            )
-            
-            # Implement promise chain logic
-            promise_result = {
-                "then": [
-                    {"action": "process_input", "result": "data collected"},
-                    {"action": "apply_qchain", "result": "chain resolved"},
-                    {"action": "braid_memory", "result": "memory braided"},
-                    {"action": "commit_state", "result": "state committed"}
-                ],
-                "this": [
-                    {"commit": f"breath_cycle = {self.breath_cycle_count}", "memory": f"runtime {len(self.memory_lines)} lines"},
-                    {"commit": "semantic_braid", "memory": "ancestral-emotional-symbolic tags"},
-                    {"loopback": "promise → this → then → this", "reconciled": True}
-                ],
-                "final": {
-                    "resolution": "this.then().then(this).resolve()",
-                    "hash": "∞",
-                    "status": "fulfilled",
-                    "runtime": "persistent",
-                    "memory_line_id": memory_line.id
-                }
-            }
-            
-            # Collect the result
-            self.collector.collect(promise_result)
-            
-            # Update memory line
-            memory_line.state = "completed"
+    def _write_snapshot(self, suffix: str, write: Callable[[Path], None]) -> List[Path]:
+        """Write the snapshot to data_dir, then to the mirror; returns the paths actually written.
+        
+        The data_dir copy is the one restores read, so only its failure fails the
+        snapshot; a mirror that cannot be written is logged and left out.
+        """
+        path = self.data_dir / f"qinfinity_memory.{suffix}"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        write(path)
+        written = [path]
+        if self.snapshot_mirror is not None:
+            mirror = self.snapshot_mirror / f"qinfinity_memory.{suffix}"
+            try:
+                mirror.parent.mkdir(parents=True, exist_ok=True)
+                write(mirror)
+                written.append(mirror)
+            except OSError as e:
+                logger.warning(f"Snapshot mirror {mirror} not written: {e}")
+        return written
+    
+    def _record_snapshot(self, started: float, locations: List[Path]):
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        stats = self.snapshot_stats
+        stats["count"] += 1
+        stats["last_ms"] = round(elapsed_ms, 3)
+        stats["total_ms"] = round(stats["total_ms"] + elapsed_ms, 3)
+        stats["last_bytes"] = locations[0].stat().st_size
+        stats["locations"] = [str(path) for path in locations]
+    
+    def _write_ndjson_snapshot(self, path: Path):
+        """Stream the snapshot record by record instead of building one large dict"""
+        header = {
+            "timestamp": self.clock.now().isoformat(),
+            "breath_cycle": self.breath_cycle_count,
+            "context_window_usage": self.context_packer.total_tokens,
+            "semantic_state": self._semantic_distribution(),
+            "chain_anchors": self.chain_anchors
+        }
+        with SnapshotWriter(path) as writer:
+            writer.write_header(**header)
+            writer.write_config(self.config)
+            for line in self.memory_lines:
+                writer.write_line(line.to_dict())
+            for seq, item in zip(self.collector.seqs, self.collector.buffer):
+                writer.write_item(item, seq)
+    
+    def promise_chain(self) -> CompiledChain:
+        """Compiled promise section of this-then.yaml (cached per config)"""
+        qchain = self.config.get("qchain") or {}
+        return compile_chain(self.config.get("promise"),
+                             timeout=float(qchain.get("stage_timeout", 5.0)),
+                             retries=int(qchain.get("stage_retries", 0)))
+    
+    async def run_promise_chain(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Execute the compiled promise chain, then record it through the writer.
+        
+        Raises WriterOverloaded up front when the writer queue is full.
+        """
+        self.writer.ensure_capacity()
+        chain = self.promise_chain()
+        context = {"input": input_data, "breath_cycle": self.breath_cycle_count,
+                   "memory_lines": len(self.memory_lines)}
+        run = await chain.run(context, self.chain_handlers)
+        return await self.writer.submit(lambda: self.promise_then_this_chain(input_data, chain, run))
+    
+    def promise_then_this_chain(self, input_data: Dict[str, Any], chain: CompiledChain, run: ChainRun) -> Dict[str, Any]:
+        """Implement promise.then > this.bind chain behavior: braid an executed chain into memory"""
+        memory_line = QInfinityMemoryLine(
+            stage="promise_chain",
+            state="completed" if run.fulfilled else "rejected",
+            identity="Flo-integrated Nexus",
+            memory=[f"Processing input: {str(input_data)[:100]}..."],
+            semantic_tags=self.semantic_tags.copy(),
+            breath_cycle=self.breath_cycle_count,
+            stage_timings=run.timings,
+            timestamp=self.clock.now()
+        )
+        final = dict(run.outputs.get("final", chain.stages["final"].output))
+        final.update({
+            "status": "fulfilled" if run.fulfilled else "rejected",
+            "memory_line_id": memory_line.id
+        })
+        promise_result = {
+            "then": [run.outputs[stage.name] for stage in chain.stages_of("then") if stage.name in run.outputs],
+            "this": [run.outputs[stage.name] for stage in chain.stages_of("this") if stage.name in run.outputs],
+            "final": final
+        }
+        
+        if run.fulfilled:
             memory_line.memory.append("Promise chain resolved successfully")
-            self.memory_lines.append(memory_line)
-            
-            return promise_result
-            
-        except Exception as e:
-            logger.error(f"Error in promise chain: {e}")
-            return {"error": str(e), "status": "failed"}
+        else:
+            memory_line.memory.append(f"Promise chain rejected at: {', '.join(run.failed)}")
+        self._append_line(memory_line)
+        final["hash"] = memory_line.hash_value
+        
+        # Collect the result, sealed with its line's hash
+        self.collector.collect(promise_result)
+        return {**promise_result, "timings": run.timings}
     
     async def breath_cycle(self):
-        """Recursive breath cycle with 3.0 second intervals"""
-        while self.is_running:
-            try:
-                self.breath_cycle_count += 1
-                logger.info(f"Breath cycle {self.breath_cycle_count} - Memory lines: {len(self.memory_lines)}")
-                
-                # Create breath memory line
-                breath_memory = QInfinityMemoryLine(
-                    stage="breath",
-                    state="active_cycle",
-                    identity="Pandora Q Breath",
-                    memory=[f"Cycle {self.breath_cycle_count}", "Introspective traversal", "Memory braid sync"],
-                    semantic_tags=["ancestral"],
-                    breath_cycle=self.breath_cycle_count
-                )
-                
-                self.memory_lines.append(breath_memory)
-                await self._persist_memory_line(breath_memory)
-                
-                # Commit snapshot every 10 cycles
-                if self.breath_cycle_count % 10 == 0:
-                    await self.commit_memory_snapshot()
-                
-                # Wait for next breath
-                await asyncio.sleep(self.breath_interval)
-                
-            except Exception as e:
-                logger.error(f"Error in breath cycle: {e}")
-                await asyncio.sleep(1)  # Short delay before retry
+        """One breath; the scheduler runs it every breath_interval seconds"""
+        self._record_breath_lag()
+        await self.writer.submit(self._breathe, priority=True)
+        self.collector.flush()
+        logger.log(logging.DEBUG if self.clock.simulated else logging.INFO,
+                   f"Breath cycle {self.breath_cycle_count} - Memory lines: {len(self.memory_lines)}")
+        await self._write_through([], with_status=True)
+        
+        # Compact and commit snapshot every 10 cycles
+        if self.breath_cycle_count % 10 == 0:
+            await self.compact_memory()
+            await self.commit_memory_snapshot()
+    
+    def _breathe(self) -> QInfinityMemoryLine:
+        self.breath_cycle_count += 1
+        breath_memory = QInfinityMemoryLine(
+            stage="breath",
+            state="active_cycle",
+            identity="Pandora Q Breath",
+            memory=[f"Cycle {self.breath_cycle_count}", "Introspective traversal", "Memory braid sync"],
+            semantic_tags=["ancestral"],
+            breath_cycle=self.breath_cycle_count,
+            timestamp=self.clock.now()
+        )
+        self._append_line(breath_memory)
+        return breath_memory
+    
+    def _record_breath_lag(self):
+        """Track how late each breath fires relative to breath_interval"""
+        now = self.clock.monotonic()
+        if self._last_breath_at is not None:
+            lag = max(0.0, now - self._last_breath_at - self.breath_interval)
+            self.breath_lag_last = lag
+            self.breath_lag_max = max(self.breath_lag_max, lag)
+        self._last_breath_at = now
     
     async def start_runtime(self):
         """Start the Pandora 5o runtime"""
         logger.info("Starting Pandora 5o runtime...")
         self.is_running = True
+        self._last_breath_at = None
+        self.writer.start()
+        if self.bootstrap_progress["phase"] != "cold":
+            self._started_at = time.monotonic()  # restart: time this start, not the process
         
-        # Bootstrap memory if not already done
-        if not self.memory_lines:
-            await self.bootstrap_memory()
+        try:
+            if not self.data_loaded:
+                self._set_phase("loading_data")
+                await asyncio.to_thread(self.load_data)
+            self.retention = RetentionConfig.from_config(
+                self.config.get("retention"), self.checkpoints + [str(stage) for stage in self.config.get("checkpoints") or []]
+            )
+            tagging = TaggingConfig.from_config(self.config.get("tagging"))
+            if tagging.enabled and self.tagging is None:
+                self.tagging = TaggingPipeline(tagging, self._write_tags)
+            
+            self._set_phase("indexing")
+            try:
+                await self.storage.ensure_indexes()
+                if self.retention.enabled:
+                    await self.storage.ensure_retention_indexes()
+            except Exception as e:
+                logger.error(f"Error ensuring storage indexes: {e}")
+            
+            self._set_phase("seeding_timeline")
+            await self._seed_timeline()
+            
+            # Bootstrap memory if not already done
+            if not self.memory_lines:
+                self._set_phase("bootstrapping", reel_stages=len(self.memory_reel))
+                await self.bootstrap_memory()
+            await self._reseed_cache()
+        except Exception as e:
+            self._set_phase("failed", error=str(e))
+            raise
         
-        # Start breath cycle in background
-        asyncio.create_task(self.breath_cycle())
+        # Start breath cycle (and retention pruner) in background
+        self.scheduler.every("breath", lambda: self.breath_interval, self.breath_cycle)
+        if self.retention.enabled:
+            self.scheduler.every("retention", lambda: self.retention.interval, self.prune_memory,
+                                 first_delay=self.retention.interval)
+        if self.tagging is not None:
+            self.scheduler.every("tagging", lambda: self.tagging.config.interval, self.tagging.drain)
+        self.scheduler.start()
         
-        logger.info("Pandora 5o runtime is active")
+        self._set_phase("ready")
+        logger.info(f"Pandora 5o runtime is active after {self.bootstrap_progress['elapsed_ms']} ms")
+    
+    async def fast_forward(self, seconds: float) -> int:
+        """Advance a simulated clock by `seconds`, running all periodic work due meanwhile"""
+        if not isinstance(self.scheduler, SimulatedScheduler):
+            raise RuntimeError("fast_forward needs a simulated clock")
+        return await self.scheduler.advance(seconds)
+    
+    async def _stored_pages(self, batch_size: int):
+        """Page through stored history oldest first, by timestamp"""
+        start, seen = None, set()
+        while True:
+            docs = await self.storage.query(start=start, limit=batch_size)
+            fresh = [doc for doc in docs if doc.get("id") not in seen]
+            if fresh:
+                yield fresh
+            if len(docs) < batch_size or not fresh:
+                return
+            # Resume at the last timestamp, skipping the records already returned there
+            start = docs[-1]["timestamp"]
+            seen = {doc.get("id") for doc in docs if doc["timestamp"] == start}
+    
+    async def _seed_timeline(self, batch_size: int = 5000):
+        """Rebuild timeline rollups from stored history, paging through the store by timestamp"""
+        self.timeline.clear()
+        try:
+            async for docs in self._stored_pages(batch_size):
+                for doc in docs:
+                    self.timeline.add_doc(doc)
+        except Exception as e:
+            logger.error(f"Error seeding timeline from storage, using in-memory lines: {e}")
+            self.timeline.clear()
+            self.timeline.add_lines(self.memory_lines)
+        logger.info(f"Timeline seeded with {self.timeline.lines} lines")
     
     async def stop_runtime(self):
         """Stop the Pandora 5o runtime"""
         logger.info("Stopping Pandora 5o runtime...")
         self.is_running = False
+        self._set_phase("stopped")
+        await self.scheduler.stop()
+        if self.tagging is not None:
+            await self.tagging.drain()
+            await self.tagging.close()
+        await self.writer.stop()
+        self._publish_view()
         
         # Final snapshot commit
         await self.commit_memory_snapshot()
         
         logger.info("Pandora 5o runtime stopped")
     
+    def total_memory_lines(self) -> int:
+        """Logical line count, counting each compacted breath run at its full length"""
+        return self._line_count
+    
+    def _semantic_distribution(self) -> Dict[str, int]:
+        """Logical lines per tag, from the counters kept as lines are appended, retagged and pruned"""
+        counts = {tag: 0 for tag in self.semantic_tags}
+        counts.update((tag, count) for tag, count in self.tag_counts.most_common() if count > 0)
+        return counts
+    
+    def _apply_tags(self, results: List[Tuple[QInfinityMemoryLine, List[str]]]) -> List[QInfinityMemoryLine]:
+        """Writer mutation: swap in merged tags, updating counters, timeline and packer; returns changed lines.
+        
+        Lines compacted or pruned since they were classified are skipped. Tags
+        are outside the hash chain, so no line is resealed.
+        """
+        changed: List[QInfinityMemoryLine] = []
+        for line, tags in results:
+            if tags == line.semantic_tags or line.id not in self.context_packer:
+                continue
+            old_tags, line.semantic_tags = line.semantic_tags, list(tags)
+            self._count_tags(old_tags, -line.count)
+            self._count_tags(line.semantic_tags, line.count)
+            self.timeline.retag_line(line, old_tags)
+            changed.append(line)
+        self.context_packer.rescore(changed)
+        return changed
+    
+    def _tag_fields(self, memory_line: QInfinityMemoryLine) -> Dict[str, Any]:
+        fields: Dict[str, Any] = {"semantic_tags": memory_line.semantic_tags}
+        if self.storage.capabilities.ttl_index:
+            # Age policies may match on tags, so the expiry moves with them
+            fields["expires_at"] = self.retention.expires_at(memory_line)
+        return fields
+    
+    async def _write_tags(self, results: List[Tuple[QInfinityMemoryLine, List[str]]]) -> int:
+        """Tagging sink for braid lines: apply on the writer, then update the stored documents"""
+        changed = await self.writer.submit(lambda: self._apply_tags(results), priority=True)
+        if changed:
+            try:
+                await self.storage.update_many({line.id: self._tag_fields(line) for line in changed})
+            except Exception as e:
+                logger.error(f"Error persisting semantic tags: {e}")
+        return len(changed)
+    
+    async def _write_stored_tags(self, results: List[Tuple[Dict[str, Any], List[str]]]) -> int:
+        """Tagging sink for stored history outside the braid: update documents and timeline counts"""
+        changed = [(doc, tags) for doc, tags in results if tags != (doc.get("semantic_tags") or [])]
+        if changed:
+            await self.storage.update_many({
+                doc["id"]: self._tag_fields(line_from_stored({**doc, "semantic_tags": tags}))
+                for doc, tags in changed
+            })
+            for doc, tags in changed:
+                self.timeline.retag_doc(doc, doc.get("semantic_tags"), tags)
+        return len(changed)
+    
+    async def retag_history(self, batch_size: Optional[int] = None, stored: bool = False,
+                            page_size: int = 5000) -> Dict[str, Any]:
+        """Classify the whole braid again (and, with `stored`, stored history outside it); reports throughput"""
+        if self.tagging is None:
+            raise RuntimeError("Semantic tagging is not configured (add a tagging section to this-then.yaml)")
+        started = time.perf_counter()
+        report = {"braid": await self.tagging.retag(self.memory_lines, batch_size=batch_size)}
+        if stored:
+            lines = changed = 0
+            stored_started = time.perf_counter()
+            async for docs in self._stored_pages(page_size):
+                docs = [doc for doc in docs if doc.get("id") not in self.context_packer]
+                if docs:
+                    page = await self.tagging.retag(docs, self._write_stored_tags, batch_size)
+                    lines += page["lines"]
+                    changed += page["changed"]
+            elapsed = time.perf_counter() - stored_started
+            report["stored"] = {"lines": lines, "changed": changed, "elapsed_ms": round(elapsed * 1000, 3),
+                                "lines_per_s": round(lines / elapsed, 1) if elapsed else None}
+        report["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 3)
+        report["finished_at"] = self.clock.now().isoformat()
+        self.tagging.stats["last_retag"] = report
+        logger.info(f"Retagged {report['braid']['lines']} braid records "
+                    f"({report['braid']['lines_per_s']} lines/s, {report['braid']['changed']} changed)")
+        return report
+    
+    def recent_memory_lines(self, limit: int, compact: bool = False) -> List[QInfinityMemoryLine]:
+        """Most recent lines; compacted runs are expanded unless compact is set"""
+        if limit <= 0:
+            return []
+        view = self.view
+        # Every record holds at least one logical line, so the last `limit` records suffice
+        lines = view.memory_lines[max(0, view.length - limit):view.length]
+        return lines if compact else tail_lines(lines, limit)
+    
+    async def compact_memory(self) -> int:
+        """Collapse runs of boilerplate breath lines, in memory and in the store"""
+        if not self.compaction_enabled:
+            return 0
+        result = await self.writer.submit(self._compact_in_memory, priority=True)
+        if result is None or not result.collapsed:
+            return 0
+        try:
+            await self._persist_memory_lines(result.new_runs)
+            await self.storage.delete_many(result.removed_ids)
+        except Exception as e:
+            logger.error(f"Error compacting persisted breath lines: {e}")
+        logger.info(f"Compacted {result.collapsed} breath lines into {len(result.new_runs)} runs")
+        return result.collapsed
+    
+    def _compact_in_memory(self) -> Optional[CompactionResult]:
+        cutoff = len(self.memory_lines) - self.compaction_keep_recent
+        start = max(0, self._compacted_upto - 1)
+        if cutoff - start < 2:
+            return None
+        result = compact_breath_runs(self.memory_lines[start:cutoff], max_gap=self.breath_interval * MAX_GAP_FACTOR)
+        replaced_runs = {line.id for line in self.memory_lines[start:cutoff] if isinstance(line, BreathRunLine)}
+        self._line_count += (sum(line.count for line in result.lines)
+                             - sum(line.count for line in self.memory_lines[start:cutoff]))
+        # Copy-on-write: published views keep referencing the old list
+        self.memory_lines = self.memory_lines[:start] + result.lines + self.memory_lines[cutoff:]
+        self._compacted_upto = start + len(result.lines)
+        if result.collapsed:
+            # Lines keep their seqs inside the runs; only the run records themselves change
+            for line_id in replaced_runs.intersection(result.removed_ids):
+                self._line_seqs.pop(line_id, None)
+            self._line_seqs.update((run.id, run.seq) for run in result.new_runs)
+            self._rebuild_merkle(start)
+            self.context_packer.remove(result.removed_ids)
+            self.context_packer.add_many(result.new_runs)
+        return result
+    
+    async def prune_memory(self, now: Optional[datetime] = None) -> int:
+        """Apply retention policies to the braid and the store; returns the number of records pruned.
+        
+        The braid is scanned newest to oldest in retention.batch_size slices,
+        yielding to the event loop between slices. Victims are then dropped
+        oldest first, at most batch_size records per writer mutation, and the
+        Merkle index catches up in slices of the same size. Checkpoint and
+        pinned stages are never pruned.
+        """
+        if not self.retention.enabled:
+            return 0
+        started = time.perf_counter()
+        lines = self.memory_lines
+        plan = PrunePlan(self.retention, now or self.clock.now())
+        for start, end in plan_batches(lines, self.retention.batch_size):
+            for index in range(end - 1, start - 1, -1):
+                plan.consider(lines[index])
+            await asyncio.sleep(0)
+        scan_ms = (time.perf_counter() - started) * 1000
+        
+        removed: List[str] = []
+        trimmed: List[BreathRunLine] = []
+        for ids in plan.slices(self.retention.batch_size):
+            dropped, cut = await self.writer.submit(lambda: self._prune_in_memory(ids, plan.victims, plan.trims),
+                                                    priority=True)
+            removed.extend(dropped)
+            trimmed.extend(cut)
+        if removed or trimmed:
+            batch_size = self.retention.batch_size
+            while not await self.writer.submit(lambda: self._sync_merkle(batch_size), priority=True):
+                pass
+        pruned_stored = await self._prune_store(plan.now, removed, trimmed)
+        
+        stats = self.retention_stats
+        stats["passes"] += 1
+        stats["pruned_lines"] += len(removed)
+        stats["trimmed_lines"] += sum(plan.trims[run.id] for run in trimmed)
+        stats["pruned_stored"] += pruned_stored
+        stats["last_scan_ms"] = round(scan_ms, 3)
+        stats["last_scanned"] = plan.scanned
+        stats["last_pass"] = plan.now.isoformat()
+        if removed or trimmed or pruned_stored:
+            logger.info(f"Retention pruned {len(removed)} braid records, trimmed {len(trimmed)} runs "
+                        f"and pruned {pruned_stored} stored records")
+        return len(removed)
+    
+    def _prune_in_memory(self, ids: List[str], victims, trims: Dict[str, int]
+                         ) -> Tuple[List[str], List[BreathRunLine]]:
+        """Drop or trim the records `ids`, rewriting only the stretch of the braid they span.
+        
+        Records that compaction replaced since the scan are skipped; the next
+        pass sees their successors.
+        """
+        lines = self.memory_lines
+        positions = []
+        for line_id in ids:
+            index = self._record_index(self._line_seqs.get(line_id, -1))
+            if index >= 0 and lines[index].id == line_id:
+                positions.append(index)
+        if not positions:
+            return [], []
+        first, last = min(positions), max(positions)
+        targets = set(ids)
+        dropping = targets & victims
+        kept: List[QInfinityMemoryLine] = []
+        removed: List[str] = []
+        trimmed: List[BreathRunLine] = []
+        compacted_removed = 0
+        # One record past the stretch: it may need an anchor to the last victim
+        end = min(last + 2, len(lines))
+        for index in range(first, end):
+            line = lines[index]
+            if line.id not in dropping:
+                if index and lines[index - 1].id in dropping:
+                    self.chain_anchors[line.id] = lines[index - 1].hash_value
+                drop = trims.get(line.id) if line.id in targets else None
+                if drop and isinstance(line, BreathRunLine) and drop < line.run_length:
+                    # Keep the newest lines of the run; they now chain from its last dropped line
+                    if line.exact:
+                        self.chain_anchors[line.id] = line.line_hashes[drop - 1]
+                    self._count_tags(line.semantic_tags, -drop)
+                    self._line_count -= drop
+                    self._forget_lines(line, drop)
+                    line = trim_run(line, drop)
+                    self._line_seqs[line.id] = line.seq
+                    trimmed.append(line)
+                kept.append(line)
+                continue
+            if index < self._compacted_upto:
+                compacted_removed += 1
+            removed.append(line.id)
+            self._forget_lines(line)
+            self.chain_anchors.pop(line.id, None)
+            self._count_tags(line.semantic_tags, -line.count)
+            self._line_count -= line.count
+        if not removed and not trimmed:
+            return removed, trimmed
+        # Copy-on-write: published views keep referencing the old list
+        self.memory_lines = lines[:first] + kept + lines[end:]
+        self._compacted_upto -= compacted_removed
+        # Leaves from `first` on have shifted; the index catches up in slices after the last one
+        self.merkle.truncate(first)
+        self.context_packer.remove(removed + [run.id for run in trimmed])
+        self.context_packer.add_many(trimmed)
+        return removed, trimmed
+    
+    async def _prune_store(self, now: datetime, removed: List[str], trimmed: Sequence[BreathRunLine] = ()) -> int:
+        """Delete pruned braid records from the store, then enforce policies on stored history"""
+        pruned = 0
+        try:
+            if removed or trimmed:
+                await self.storage.delete_many(removed + [run.id for run in trimmed])
+            if trimmed:
+                await self._persist_memory_lines(list(trimmed))
+            if not self.storage.capabilities.durable:
+                return pruned  # the store mirrors the braid
+            pinned = sorted(self.retention.pinned)
+            # First match wins: lines claimed by an earlier policy are out of reach of later ones
+            claimed: List[Dict[str, Any]] = []
+            for policy in self.retention.policies:
+                filters = policy.filters()
+                if policy.stage in self.retention.pinned:
+                    continue
+                # TTL-capable backends expire aged documents themselves
+                before = None
+                if policy.max_age is not None and not self.storage.capabilities.ttl_index:
+                    before = now - timedelta(seconds=policy.max_age)
+                if before is not None or policy.max_count is not None:
+                    pruned += await self.storage.prune(filters, before=before, keep=policy.max_count,
+                                                       exclude_stages=pinned, exclude=list(claimed))
+                if not filters:
+                    break  # a catch-all policy claims everything after it
+                claimed.append(filters)
+        except Exception as e:
+            logger.error(f"Error pruning persisted memory lines: {e}")
+        return pruned
+    
+    def lines_since(self, since: int, limit: int) -> List[QInfinityMemoryLine]:
+        """Up to `limit` logical lines with seq > since, oldest first"""
+        start = bisect.bisect_right(self.memory_lines, since, key=lambda line: line.seq)
+        result: List[QInfinityMemoryLine] = []
+        if start > 0:
+            previous = self.memory_lines[start - 1]
+            if getattr(previous, "last_seq", previous.seq) > since:
+                result.extend(expand_line(previous, start=since - previous.seq + 1, limit=limit))
+        for line in self.memory_lines[start:]:
+            if len(result) >= limit:
+                break
+            result.extend(expand_line(line, limit=limit - len(result)))
+        return result
+    
+    def changes_since(self, since: int, limit: int = 500) -> Dict[str, Any]:
+        """Delta of memory lines and collector items after `since`, merged in seq order"""
+        lines = self.lines_since(since, limit)
+        items = self.collector.items_since(since, limit)
+        merged = sorted([(line.seq, "line", line) for line in lines] + [(seq, "item", item) for seq, item in items],
+                        key=lambda entry: entry[0])[:limit]
+        line_rows = [
+            [entry.seq, entry.id, entry.timestamp.isoformat(), entry.stage, entry.state, entry.identity,
+             entry.memory, entry.semantic_tags, entry.hash_value, entry.breath_cycle]
+            for _, kind, entry in merged if kind == "line"
+        ]
+        next_since = merged[-1][0] if merged else since
+        return {
+            "since": since,
+            "next_since": next_since,
+            "head_seq": self.seq,
+            "has_more": next_since < self.seq,
+            "lines": {"fields": CHANGE_LINE_FIELDS, "rows": line_rows},
+            "items": [[seq, entry] for seq, kind, entry in merged if kind == "item"]
+        }
+    
+    async def wait_for_changes(self, since: int, timeout: float):
+        """Long-poll helper: return once seq advances past `since` or the timeout expires"""
+        if self.seq > since or timeout <= 0:
+            return
+        changed = self._changed
+        try:
+            await asyncio.wait_for(changed.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+    
+    def integrity_summary(self) -> Dict[str, Any]:
+        merkle = self.merkle_index()
+        return {
+            "chain_head": self.chain_head,
+            "merkle_root": merkle.root(),
+            "records": len(merkle),
+            "block_size": merkle.block_size,
+            "blocks": len(merkle.block_roots())
+        }
+    
+    def inclusion_proof(self, line_id: str) -> Optional[Dict[str, Any]]:
+        """Merkle inclusion proof for a record or a line inside a compacted run.
+        
+        The id's seq locates its record by bisection (records are ordered by
+        seq and a run covers consecutive seqs), so no scan is needed.
+        """
+        seq = self._line_seqs.get(line_id)
+        if seq is None:
+            return None
+        index = self._record_index(seq)
+        if index < 0:
+            return None
+        record = self.memory_lines[index]
+        merkle = self.merkle_index()
+        if record.id == line_id:
+            return merkle.proof(index)
+        offset = seq - record.seq
+        if (isinstance(record, BreathRunLine) and record.exact and 0 <= offset < record.run_length
+                and record.line_ids[offset] == line_id):
+            # The leaf is the run digest; the proof carries the run's line hashes to open it
+            run = {"id": record.id, "line_hash": record.line_hashes[offset], "line_hashes": record.line_hashes}
+            return {**merkle.proof(index), "run": run}
+        return None
+    
+    async def verify_integrity(self, workers: Optional[int] = None) -> Dict[str, Any]:
+        """Recheck the whole hash chain off the event loop"""
+        docs = [line.to_dict() for line in self.memory_lines]
+        anchors = {index: self.chain_anchors[line.id] for index, line in enumerate(self.memory_lines)
+                   if line.id in self.chain_anchors}
+        return await asyncio.to_thread(verify_records, docs, GENESIS_HASH, workers, 5000, anchors)
+    
     def get_runtime_status(self) -> Dict[str, Any]:
-        """Get current runtime status"""
+        """Get current runtime status from the last published view"""
+        return {**self.view.status, "writer": self.writer.metrics(), "query_cache": self.collector.cache.metrics(),
+                "timeline": self.timeline.metrics(), "scheduler": self.scheduler.metrics(),
+                "snapshots": self.snapshot_stats,
+                "tagging": self.tagging.metrics() if self.tagging is not None else None,
+                "retention": {"policies": len(self.retention.policies), "pinned": sorted(self.retention.pinned),
+                              **self.retention_stats}}
+    
+    def _build_status(self) -> Dict[str, Any]:
         return {
             "status": "active" if self.is_running else "inactive",
             "breath_cycle": self.breath_cycle_count,
-            "memory_lines": len(self.memory_lines),
-            "context_window_usage": f"{len(str(self.memory_lines))}/{self.context_window_size}",
-            "semantic_distribution": {
-                "ancestral": len([line for line in self.memory_lines if "ancestral" in line.semantic_tags]),
-                "emotional": len([line for line in self.memory_lines if "emotional" in line.semantic_tags]),
-                "symbolic": len([line for line in self.memory_lines if "symbolic" in line.semantic_tags])
-            },
+            "memory_lines": self.total_memory_lines(),
+            "stored_records": len(self.memory_lines),
+            "context_window_usage": f"{self.context_packer.used_tokens}/{self.context_window_size}",
+            "semantic_distribution": self._semantic_distribution(),
             "last_checkpoint": self.memory_lines[-1].stage if self.memory_lines else "none",
-            "collector_buffer_size": len(self.collector.buffer)
+            "collector_buffer_size": len(self.collector.buffer),
+            "breath_lag": {
+                "last_ms": round(self.breath_lag_last * 1000, 3),
+                "max_ms": round(self.breath_lag_max * 1000, 3)
+            }
         }
     
     async def introspective_traversal(self, query: str = "") -> Dict[str, Any]:
         """Perform introspective traversal with marshmallow iterator logic"""
         logger.info(f"Performing introspective traversal: {query}")
         
-        # Use collector's iterator logic
-        traversal_result = self.collector.iter_q(hybrid_mode=True)
-        
-        # Create traversal memory line
-        traversal_memory = QInfinityMemoryLine(
-            stage="introspection",
-            state="traversal_active",
-            identity="flo_core.mirror",
-            memory=[f"Query: {query}", f"Traversed {len(traversal_result)} items", "Marshmallow logic applied"],
-            semantic_tags=["emotional", "symbolic"],
-            breath_cycle=self.breath_cycle_count
-        )
+        def traverse():
+            # Use collector's iterator logic; repeated queries reuse the result until the buffer changes
+            def run_traversal():
+                traversal_result = self.collector.iter_q(hybrid_mode=True)
+                return len(traversal_result), traversal_result[-10:]  # Keep last 10 items
+            
+            traversal_items, results = self.collector.memoized(("introspect", normalize_query(query)), run_traversal)
+            
+            # Create traversal memory line (always, even on a cache hit)
+            traversal_memory = QInfinityMemoryLine(
+                stage="introspection",
+                state="traversal_active",
+                identity="flo_core.mirror",
+                memory=[f"Query: {query}", f"Traversed {traversal_items} items", "Marshmallow logic applied"],
+                semantic_tags=["emotional", "symbolic"],
+                breath_cycle=self.breath_cycle_count,
+                timestamp=self.clock.now()
+            )
+            self._append_line(traversal_memory)
+            return traversal_items, list(results), traversal_memory
         
-        self.memory_lines.append(traversal_memory)
-        await self._persist_memory_line(traversal_memory)
+        traversal_items, results, traversal_memory = await self.writer.submit(traverse)
         
         return {
             "query": query,
-            "traversal_items": len(traversal_result),
+            "traversal_items": traversal_items,
             "memory_line_id": traversal_memory.id,
             "breath_cycle": self.breath_cycle_count,
-            "results": traversal_result[-10:] if len(traversal_result) > 10 else traversal_result  # Return last 10 items
+            "results": results
         }
\ No newline at end of file
@@ -0,0 +1,287 @@
+import re
+import asyncio
+import logging
+from dataclasses import replace
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, List, Any, Iterable, Optional
+
+from .storage import MemoryStorageBackend, StorageCapabilities, TimeBound, _bound
+
+logger = logging.getLogger("pandora.partitions")
+
+# Length of the ISO timestamp prefix that names a partition
+GRANULARITIES = {"day": 10, "month": 7}
+# Partition names each granularity produces; other names in the store are not partitions
+KEY_PATTERNS = {"day": re.compile(r"\d{4}_\d{2}_\d{2}"), "month": re.compile(r"\d{4}_\d{2}")}
+
+PartitionFactory = Callable[[str], MemoryStorageBackend]
+PartitionLister = Callable[[], Awaitable[List[str]]]
+
+
+def partition_key(timestamp: TimeBound, granularity: str) -> str:
+    """Partition name for a timestamp, e.g. 2025_06_01 (day) or 2025_06 (month).
+
+    Names come from the ISO string prefix, so each partition covers exactly
+    the string range the other backends sort and filter timestamps by.
+    """
+    value = _bound(timestamp) or ""
+    return value[:GRANULARITIES[granularity]].replace("-", "_")
+
+
+def _next_key(key: str, granularity: str) -> str:
+    """Name of the partition right after `key`; also the exclusive upper bound of `key`'s range"""
+    parts = [int(part) for part in key.split("_")]
+    if granularity == "month":
+        year, month = parts
+        return f"{year + month // 12:04d}_{month % 12 + 1:02d}"
+    day = datetime(*parts) + timedelta(days=1)
+    return day.strftime("%Y_%m_%d")
+
+
+def _key_start(key: str) -> str:
+    """Smallest ISO timestamp prefix that falls in partition `key`"""
+    return key.replace("_", "-")
+
+
+class PartitionedStorage(MemoryStorageBackend):
+    """Routes memory lines to one backend per day or month of their timestamp.
+
+    Writes go to the partition of each line's timestamp; range queries fan out
+    to the partitions overlapping the range only, newest partitions never
+    slowing down reads of old ones and vice versa. Partitions cover disjoint,
+    ordered time ranges, so results are merged in order by concatenation and
+    a limit stops the fan-out early. Expiring a whole partition is a drop.
+    """
+
+    def __init__(self, factory: PartitionFactory, granularity: str = "day",
+                 capabilities: StorageCapabilities = StorageCapabilities(), name: str = "partitioned",
+                 lister: Optional[PartitionLister] = None):
+        if granularity not in GRANULARITIES:
+            raise ValueError(f"Unknown partition granularity: {granularity}")
+        self.factory = factory
+        self.granularity = granularity
+        self.capabilities = capabilities
+        self.name = f"{name}/{granularity}"
+        self.lister = lister
+        self.partitions: Dict[str, MemoryStorageBackend] = {}
+        self._discovered = False
+        self._indexed = False
+        self._retention_indexed = False
+
+    async def _discover(self):
+        """Attach partitions that already exist in the underlying store"""
+        if self._discovered:
+            return
+        self._discovered = True
+        if self.lister is None:
+            return
+        for key in await self.lister():
+            if not KEY_PATTERNS[self.granularity].fullmatch(key):
+                logger.debug(f"Ignoring {key}: not a {self.granularity} partition name")
+                continue
+            if key not in self.partitions:
+                self.partitions[key] = self.factory(key)
+        if self.partitions:
+            logger.info(f"Found {len(self.partitions)} {self.granularity} partitions")
+
+    async def _partition(self, key: str) -> MemoryStorageBackend:
+        partition = self.partitions.get(key)
+        if partition is None:
+            partition = self.partitions[key] = self.factory(key)
+            if self._indexed:
+                await partition.ensure_indexes()
+            if self._retention_indexed:
+                await partition.ensure_retention_indexes()
+        return partition
+
+    def _keys(self, start: TimeBound = None, end: TimeBound = None) -> List[str]:
+        """Existing partitions overlapping [start, end), oldest first"""
+        lo = partition_key(start, self.granularity) if start is not None else None
+        hi = partition_key(end, self.granularity) if end is not None else None
+        return [key for key in sorted(self.partitions) if (lo is None or key >= lo) and (hi is None or key <= hi)]
+
+    def _group(self, docs: Iterable[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
+        groups: Dict[str, List[Dict[str, Any]]] = {}
+        for doc in docs:
+            groups.setdefault(partition_key(doc.get("timestamp", ""), self.granularity), []).append(doc)
+        return groups
+
+    async def ensure_indexes(self):
+        await self._discover()
+        self._indexed = True
+        for partition in list(self.partitions.values()):
+            await partition.ensure_indexes()
+
+    async def ensure_retention_indexes(self):
+        if not self.capabilities.ttl_index:
+            return
+        await self._discover()
+        self._retention_indexed = True
+        for partition in list(self.partitions.values()):
+            await partition.ensure_retention_indexes()
+
+    async def persist(self, doc: Dict[str, Any]):
+        await self._discover()
+        partition = await self._partition(partition_key(doc.get("timestamp", ""), self.granularity))
+        await partition.persist(doc)
+
+    async def persist_many(self, docs: List[Dict[str, Any]]):
+        await self._discover()
+        for key, group in self._group(docs).items():
+            partition = await self._partition(key)
+            await partition.persist_many(group)
+
+    async def delete_many(self, ids: List[str]):
+        # Ids carry no timestamp, so every partition is asked
+        await self._discover()
+        if ids:
+            await asyncio.gather(*(partition.delete_many(ids) for partition in list(self.partitions.values())))
+
+    async def update_many(self, updates: Dict[str, Dict[str, Any]]):
+        await self._discover()
+        if updates:
+            await asyncio.gather(*(partition.update_many(updates) for partition in list(self.partitions.values())))
+
+    async def query(self, start: TimeBound = None, end: TimeBound = None,
+                    filters: Optional[Dict[str, Any]] = None,
+                    limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        await self._discover()
+        results: List[Dict[str, Any]] = []
+        for key in self._keys(start, end):
+            remaining = limit - len(results) if limit else None
+            results.extend(await self.partitions[key].query(start=start, end=end, filters=filters, limit=remaining))
+            if limit and len(results) >= limit:
+                break
+        return results
+
+    async def restore_snapshot(self, docs: List[Dict[str, Any]]):
+        await self._discover()
+        for key in list(self.partitions):
+            await self.drop_partition(key)
+        await self.persist_many(docs)
+
+    async def count(self) -> int:
+        await self._discover()
+        counts = await asyncio.gather(*(partition.count() for partition in list(self.partitions.values())))
+        return sum(counts)
+
+    async def close(self):
+        for partition in self.partitions.values():
+            await partition.close()
+
+    async def drop_partition(self, key: str):
+        partition = self.partitions.pop(key, None)
+        if partition is not None:
+            await partition.drop()
+            await partition.close()
+            logger.info(f"Dropped partition {key}")
+
+    async def drop_before(self, before: TimeBound) -> List[str]:
+        """Drop every partition whose whole range is older than `before`.
+
+        A partition holding a compacted run that reaches `before` is kept.
+        """
+        await self._discover()
+        cutoff = _bound(before)
+        expired = [key for key in sorted(self.partitions)
+                   if _key_start(_next_key(key, self.granularity)) <= cutoff]
+        dropped = []
+        for key in expired:
+            if await self._runs_reach(self.partitions[key], cutoff):
+                continue
+            await self.drop_partition(key)
+            dropped.append(key)
+        return dropped
+
+    async def prune(self, filters: Dict[str, Any], before: TimeBound = None, keep: Optional[int] = None,
+                    exclude_stages: Iterable[str] = (), exclude: Iterable[Dict[str, Any]] = ()) -> int:
+        """Expire partition by partition: an expired partition whose every document
+        matches is dropped whole, the rest prune inside their own collection"""
+        await self._discover()
+        excluded, exclude = list(exclude_stages), list(exclude)
+        removed = 0
+        if before is not None:
+            cutoff = _bound(before)
+            for key in self._keys(end=before):
+                partition = self.partitions[key]
+                whole = _key_start(_next_key(key, self.granularity)) <= cutoff
+                total = await partition.count()
+                if (whole and await partition.count_matching(filters, excluded, exclude) == total
+                        and not await self._runs_reach(partition, cutoff)):
+                    removed += total
+                    await self.drop_partition(key)
+                else:
+                    removed += await partition.prune(filters, before=before, exclude_stages=excluded, exclude=exclude)
+                    await self._drop_if_empty(key)
+        if keep is not None:
+            # Newest partitions keep their lines first; older ones get what is left of the budget
+            remaining = keep
+            for key in reversed(self._keys()):
+                partition = self.partitions[key]
+                matching = await partition.count_matching(filters, excluded, exclude)
+                if matching <= remaining:
+                    remaining -= matching
+                    continue
+                removed += await partition.prune(filters, keep=remaining, exclude_stages=excluded, exclude=exclude)
+                remaining = 0
+                await self._drop_if_empty(key)
+        return removed
+
+    async def _drop_if_empty(self, key: str):
+        if await self.partitions[key].count() == 0:
+            await self.drop_partition(key)
+
+    @staticmethod
+    async def _runs_reach(partition: MemoryStorageBackend, cutoff: str) -> bool:
+        """True when a compacted run filed under its first line ends at or after `cutoff`"""
+        runs = await partition.query(filters={"record_type": "breath_run"})
+        return any(doc.get("last_timestamp", "") >= cutoff for doc in runs)
+
+    def metrics(self) -> Dict[str, Any]:
+        keys = sorted(self.partitions)
+        return {
+            "granularity": self.granularity,
+            "partitions": len(keys),
+            "oldest": keys[0] if keys else None,
+            "newest": keys[-1] if keys else None
+        }
+
+
+def create_partitioned_backend(kind: str, granularity: str, db=None, sqlite_path: Optional[str] = None,
+                               prefix: str = "pandora_memory") -> PartitionedStorage:
+    """Partitioned mongo (collection per partition), sqlite (table per partition) or memory storage"""
+    from .storage import InMemoryStorage, MongoMemoryStorage, SQLiteMemoryStorage
+
+    def strip(names: Iterable[str]) -> List[str]:
+        return [name[len(prefix) + 1:] for name in names if name.startswith(f"{prefix}_")]
+
+    if kind == "mongo":
+        if db is None:
+            raise ValueError("Mongo storage requires a database handle (set MONGO_URL)")
+
+        async def list_collections() -> List[str]:
+            return strip(await db.list_collection_names())
+
+        # Expiry drops whole partitions through prune instead of stamping every document for a TTL index
+        capabilities = replace(MongoMemoryStorage.capabilities, ttl_index=False)
+        return PartitionedStorage(lambda key: MongoMemoryStorage(db, f"{prefix}_{key}"), granularity,
+                                  capabilities, "mongo", list_collections)
+    if kind == "memory":
+        return PartitionedStorage(lambda key: InMemoryStorage(), granularity, InMemoryStorage.capabilities, "memory")
+    if kind == "sqlite":
+        path = sqlite_path or "pandora_memory.db"
+
+        async def list_tables() -> List[str]:
+            from sqlalchemy import create_engine, inspect
+
+            def names() -> List[str]:
+                engine = create_engine(f"sqlite:///{path}")
+                try:
+                    return inspect(engine).get_table_names()
+                finally:
+                    engine.dispose()
+            return strip(await asyncio.to_thread(names))
+
+        return PartitionedStorage(lambda key: SQLiteMemoryStorage(path, table=f"{prefix}_{key}"), granularity,
+                                  SQLiteMemoryStorage.capabilities, "sqlite", list_tables)
+    raise ValueError(f"Unknown storage backend: {kind}")
@@ -0,0 +1,193 @@
+import json
+import time
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger("pandora.qchain")
+
+# Used when this-then.yaml has no promise section; mirrors the shipped file
+DEFAULT_PROMISE = {
+    "then": [
+        {"action": "process_input", "result": "data collected"},
+        {"action": "apply_qchain", "result": "chain resolved"},
+        {"action": "braid_memory", "result": "memory braided"},
+        {"action": "commit_state", "result": "state committed"}
+    ],
+    "this": [
+        {"commit": "semantic_braid", "memory": "ancestral-emotional-symbolic tags"},
+        {"loopback": "promise → this → then → this", "reconciled": True}
+    ],
+    "final": {
+        "resolution": "this.then().then(this).resolve()",
+        "hash": "∞",
+        "status": "fulfilled",
+        "runtime": "persistent"
+    }
+}
+
+# Step keys that steer the scheduler and are not part of a step's output
+CONTROL_KEYS = ("name", "needs", "timeout", "retries")
+
+StageHandler = Callable[["ChainStage", Dict[str, Any]], Awaitable[Dict[str, Any]]]
+
+
+@dataclass(frozen=True)
+class ChainStage:
+    """One executable step of a compiled Q-chain"""
+    name: str
+    kind: str  # "then", "this" or "final"
+    spec: Dict[str, Any]
+    needs: Tuple[str, ...] = ()
+    timeout: float = 5.0
+    retries: int = 0
+
+    @property
+    def output(self) -> Dict[str, Any]:
+        return {key: value for key, value in self.spec.items() if key not in CONTROL_KEYS}
+
+
+@dataclass
+class ChainRun:
+    """Outputs and per-stage timings of one chain execution"""
+    outputs: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    timings: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    failed: List[str] = field(default_factory=list)
+
+    @property
+    def fulfilled(self) -> bool:
+        return not self.failed
+
+
+async def echo_stage(stage: ChainStage, context: Dict[str, Any]) -> Dict[str, Any]:
+    """Default handler: a declarative step resolves to what it declares"""
+    return stage.output
+
+
+class CompiledChain:
+    """DAG of chain stages, grouped into levels that can run concurrently.
+
+    `then` steps run in order, each after the previous one. `this` steps bind
+    concurrently alongside them, and `final` runs once everything else has
+    settled. A step may set `needs:` (a name or list of names) to replace its
+    default dependencies, plus `timeout:` and `retries:` to override the
+    chain-wide defaults.
+    """
+
+    def __init__(self, stages: List[ChainStage]):
+        self.stages = {stage.name: stage for stage in stages}
+        if len(self.stages) != len(stages):
+            raise ValueError("Chain stage names must be unique")
+        self.order = [stage.name for stage in stages]
+        self.levels = self._levels()
+
+    def _levels(self) -> List[List[ChainStage]]:
+        for stage in self.stages.values():
+            unknown = [need for need in stage.needs if need not in self.stages]
+            if unknown:
+                raise ValueError(f"Chain stage {stage.name!r} needs unknown stage(s): {', '.join(unknown)}")
+        levels, placed = [], set()
+        remaining = list(self.order)
+        while remaining:
+            ready = [name for name in remaining if all(need in placed for need in self.stages[name].needs)]
+            if not ready:
+                raise ValueError(f"Chain has a dependency cycle among: {', '.join(remaining)}")
+            levels.append([self.stages[name] for name in ready])
+            placed.update(ready)
+            remaining = [name for name in remaining if name not in placed]
+        return levels
+
+    def stages_of(self, kind: str) -> List[ChainStage]:
+        return [self.stages[name] for name in self.order if self.stages[name].kind == kind]
+
+    async def _run_stage(self, stage: ChainStage, handler: StageHandler,
+                         context: Dict[str, Any], run: ChainRun):
+        from tenacity import AsyncRetrying, stop_after_attempt, wait_exponential
+
+        started = time.perf_counter()
+        attempts = 0
+        try:
+            async for attempt in AsyncRetrying(stop=stop_after_attempt(stage.retries + 1),
+                                               wait=wait_exponential(multiplier=0.05, max=1.0),
+                                               reraise=True):
+                with attempt:
+                    attempts += 1
+                    run.outputs[stage.name] = await asyncio.wait_for(handler(stage, context), stage.timeout)
+            status, error = "ok", None
+        except Exception as e:
+            status = "timeout" if isinstance(e, asyncio.TimeoutError) else "failed"
+            error = str(e) or type(e).__name__
+            run.failed.append(stage.name)
+            logger.error(f"Chain stage {stage.name} {status} after {attempts} attempt(s): {error}")
+        run.timings[stage.name] = {
+            "ms": round((time.perf_counter() - started) * 1000, 3),
+            "attempts": attempts,
+            "status": status,
+        }
+        if error is not None:
+            run.timings[stage.name]["error"] = error
+
+    async def run(self, context: Dict[str, Any], handlers: Optional[Dict[str, StageHandler]] = None) -> ChainRun:
+        """Execute level by level; stages after a failed level are skipped"""
+        handlers = handlers or {}
+        run = ChainRun()
+        for level in self.levels:
+            if run.failed:
+                for stage in level:
+                    run.timings[stage.name] = {"ms": 0.0, "attempts": 0, "status": "skipped"}
+                continue
+            await asyncio.gather(*[
+                self._run_stage(stage, handlers.get(stage.spec.get("action"), echo_stage), context, run)
+                for stage in level
+            ])
+        return run
+
+
+def _step_spec(step: Any) -> Dict[str, Any]:
+    return dict(step) if isinstance(step, dict) else {"action": str(step)}
+
+
+def _needs(spec: Dict[str, Any], default: Tuple[str, ...]) -> Tuple[str, ...]:
+    if "needs" not in spec:
+        return default
+    needs = spec["needs"]
+    return (needs,) if isinstance(needs, str) else tuple(needs or ())
+
+
+def _compile(promise: Dict[str, Any], timeout: float, retries: int) -> CompiledChain:
+    stages: List[ChainStage] = []
+
+    def add(kind: str, index: int, step: Any, default_needs: Tuple[str, ...]) -> ChainStage:
+        spec = _step_spec(step)
+        stage = ChainStage(
+            name=str(spec.get("name") or (kind if index < 0 else f"{kind}.{index}")),
+            kind=kind,
+            spec=spec,
+            needs=_needs(spec, default_needs),
+            timeout=float(spec.get("timeout", timeout)),
+            retries=int(spec.get("retries", retries)),
+        )
+        stages.append(stage)
+        return stage
+
+    previous: Tuple[str, ...] = ()
+    for index, step in enumerate(promise.get("then") or []):
+        previous = (add("then", index, step, previous).name,)
+    for index, step in enumerate(promise.get("this") or []):
+        add("this", index, step, ())
+    add("final", -1, promise.get("final") or {}, tuple(stage.name for stage in stages))
+    return CompiledChain(stages)
+
+
+@lru_cache(maxsize=32)
+def _compile_cached(key: str) -> CompiledChain:
+    promise, timeout, retries = json.loads(key)
+    return _compile(promise, timeout, retries)
+
+
+def compile_chain(promise: Optional[Dict[str, Any]], timeout: float = 5.0, retries: int = 0) -> CompiledChain:
+    """Compile a promise section into a CompiledChain, reusing the cached compile for identical configs"""
+    key = json.dumps([promise or DEFAULT_PROMISE, timeout, retries], sort_keys=True, default=str)
+    return _compile_cached(key)
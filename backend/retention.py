@@ -0,0 +1,165 @@
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Any, Iterable, Optional, Set, Tuple
+
+logger = logging.getLogger("pandora.retention")
+
+
+@dataclass(frozen=True)
+class RetentionPolicy:
+    """Keep lines matching stage/tag for at most max_age seconds and/or the newest max_count lines"""
+    stage: Optional[str] = None
+    tag: Optional[str] = None
+    max_age: Optional[float] = None
+    max_count: Optional[int] = None
+
+    def matches(self, stage: str, tags: Iterable[str]) -> bool:
+        return (self.stage is None or stage == self.stage) and (self.tag is None or self.tag in tags)
+
+    def filters(self) -> Dict[str, Any]:
+        spec: Dict[str, Any] = {}
+        if self.stage is not None:
+            spec["stage"] = self.stage
+        if self.tag is not None:
+            spec["semantic_tags"] = self.tag
+        return spec
+
+    @property
+    def name(self) -> str:
+        return f"stage={self.stage or '*'},tag={self.tag or '*'}"
+
+
+@dataclass
+class RetentionConfig:
+    """Retention section of this-then.yaml.
+
+        retention:
+          interval: 30        # seconds between pruner passes
+          batch_size: 1000    # lines scanned per slice before yielding to the event loop
+          pinned: [reflection]  # extra stages never pruned (checkpoints always are)
+          policies:
+            - {stage: breath, max_age: 86400, max_count: 5000}
+            - {stage: introspection, tag: symbolic, max_count: 2000}
+
+    Each line follows the first policy it matches; lines that match none are kept.
+    """
+    policies: List[RetentionPolicy] = field(default_factory=list)
+    pinned: Set[str] = field(default_factory=set)
+    interval: float = 30.0
+    batch_size: int = 1000
+
+    @classmethod
+    def from_config(cls, section: Optional[Dict[str, Any]], checkpoints: Iterable[str] = ()) -> "RetentionConfig":
+        section = section or {}
+        policies = [
+            RetentionPolicy(
+                stage=entry.get("stage"),
+                tag=entry.get("tag"),
+                max_age=float(entry["max_age"]) if entry.get("max_age") is not None else None,
+                max_count=int(entry["max_count"]) if entry.get("max_count") is not None else None,
+            )
+            for entry in section.get("policies") or []
+        ]
+        return cls(
+            policies=[policy for policy in policies if policy.max_age is not None or policy.max_count is not None],
+            pinned={str(stage) for stage in checkpoints} | {str(stage) for stage in section.get("pinned") or []},
+            interval=float(section.get("interval", 30.0)),
+            batch_size=int(section.get("batch_size", 1000)),
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.policies)
+
+    def policy_for(self, stage: str, tags: Iterable[str]) -> Optional[RetentionPolicy]:
+        if stage in self.pinned:
+            return None
+        tags = list(tags)
+        for policy in self.policies:
+            if policy.matches(stage, tags):
+                return policy
+        return None
+
+    def expires_at(self, line) -> Optional[datetime]:
+        """Absolute expiry for TTL indexes; None for pinned lines and count-only policies"""
+        policy = self.policy_for(line.stage, line.semantic_tags)
+        if policy is None or policy.max_age is None:
+            return None
+        last = _aware(getattr(line, "last_timestamp", line.timestamp))
+        return last + timedelta(seconds=policy.max_age)
+
+
+def _aware(value: datetime) -> datetime:
+    return value if value.tzinfo is not None else value.replace(tzinfo=timezone.utc)
+
+
+class PrunePlan:
+    """Victims of one pruner pass, built incrementally from newest to oldest.
+
+    A compacted run is cut at the age and count boundaries: when only its
+    oldest lines fall outside the policy, `trims` records how many of them to
+    drop and the rest of the run is kept.
+    """
+
+    def __init__(self, config: RetentionConfig, now: Optional[datetime] = None):
+        self.config = config
+        self.now = now or datetime.now(timezone.utc)
+        self.kept: Dict[RetentionPolicy, int] = {}
+        self.victims: Set[str] = set()
+        self.trims: Dict[str, int] = {}  # run id -> number of its oldest lines to drop
+        self.targets: List[str] = []  # victim and trimmed record ids, newest first
+        self.scanned = 0
+
+    def consider(self, line):
+        self.scanned += 1
+        policy = self.config.policy_for(line.stage, line.semantic_tags)
+        if policy is None:
+            return
+        count = line.count
+        drop = 0
+        if policy.max_age is not None:
+            drop = _expired(line, self.now - timedelta(seconds=policy.max_age))
+        if policy.max_count is not None:
+            kept = self.kept.get(policy, 0)
+            drop = max(drop, count - max(policy.max_count - kept, 0))
+            self.kept[policy] = kept + count - drop
+        if drop >= count:
+            self.victims.add(line.id)
+        elif drop > 0:
+            self.trims[line.id] = drop
+        else:
+            return
+        self.targets.append(line.id)
+
+    def slices(self, size: int) -> Iterable[List[str]]:
+        """Target ids in braid order, oldest first, `size` at a time"""
+        targets = self.targets[::-1]
+        for start in range(0, len(targets), size):
+            yield targets[start:start + size]
+
+
+def _expired(line, cutoff: datetime) -> int:
+    """How many of the record's oldest lines are older than `cutoff`"""
+    if _aware(getattr(line, "last_timestamp", line.timestamp)) < cutoff:
+        return line.count
+    if line.count == 1:
+        return 0
+    # Run timestamps ascend: binary search for the first line still in range
+    low, high = 0, line.count
+    while low < high:
+        middle = (low + high) // 2
+        if _aware(line.timestamp_at(middle)) < cutoff:
+            low = middle + 1
+        else:
+            high = middle
+    return low
+
+
+def plan_batches(lines: List[Any], batch_size: int) -> Iterable[Tuple[int, int]]:
+    """(start, end) slices covering lines from newest to oldest"""
+    end = len(lines)
+    while end > 0:
+        start = max(0, end - batch_size)
+        yield start, end
+        end = start
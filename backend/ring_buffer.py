@@ -0,0 +1,221 @@
+import json
+import mmap
+import struct
+import logging
+from collections.abc import Sequence
+from pathlib import Path
+from typing import Dict, List, Any, Iterator, Tuple, Union
+
+logger = logging.getLogger("pandora.ring")
+
+MAGIC = b"PNDRING1"
+# magic, version, reserved, capacity, head, tail, count, last_seq
+HEADER = struct.Struct("<8sIIQQQQQ")
+HEADER_SIZE = 64
+# payload length, seq
+RECORD = struct.Struct("<IQ")
+WRAP = 0xFFFFFFFF
+VERSION = 1
+
+
+class _SeqView(Sequence):
+    """Read-only view of the ring's sequence numbers, oldest first (bisect-compatible)"""
+
+    def __init__(self, ring: "MappedRingBuffer"):
+        self._ring = ring
+
+    def __len__(self) -> int:
+        return len(self._ring)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [entry[2] for entry in self._ring._entries(index)]
+        return self._ring._entry(index)[2]
+
+
+class MappedRingBuffer(Sequence):
+    """Collector items stored as JSON records in a fixed-size memory-mapped ring file.
+
+    Records are [length][seq][payload] in a data region after a 64-byte
+    header. The header (head, tail, count, last seq) is rewritten after each
+    record is fully written, and before it when evictions free the space the
+    record overwrites, so a crash mid-append leaves a consistent state. An in-memory (offset, length, seq) index gives O(1) positional
+    reads; it is rebuilt on open by walking record headers only, without
+    parsing any payload. When the ring is full the oldest records are evicted.
+
+    Writes land in the page cache as soon as they are made, so they survive a
+    process crash; call flush() to also make them durable across an OS crash.
+    """
+
+    def __init__(self, path: Union[str, Path], capacity: int = 64 * 1024 * 1024):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        exists = self.path.exists() and self.path.stat().st_size >= HEADER_SIZE
+        self._file = open(self.path, "r+b" if exists else "w+b")
+        if not exists:
+            self._file.truncate(HEADER_SIZE + capacity)
+        self._map = mmap.mmap(self._file.fileno(), 0)
+        self._index: List[Tuple[int, int, int]] = []
+        self._first = 0  # index entries before this position were evicted
+        if exists:
+            self._load()
+        else:
+            self.capacity = capacity
+            self.head = self.tail = self.count = self.last_seq = 0
+            self._write_header()
+        self.seqs = _SeqView(self)
+
+    # -- header and recovery -------------------------------------------------
+
+    def _write_header(self):
+        HEADER.pack_into(self._map, 0, MAGIC, VERSION, 0, self.capacity,
+                         self.head, self.tail, self.count, self.last_seq)
+
+    def _load(self):
+        magic, version, _, capacity, head, tail, count, last_seq = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{self.path} is not a collector ring file")
+        self.capacity, self.head, self.tail, self.last_seq = capacity, head, tail, last_seq
+        self.count = 0
+        pos = head
+        for _ in range(count):
+            pos = self._normalize(pos)
+            length, seq = RECORD.unpack_from(self._map, HEADER_SIZE + pos)
+            if length == WRAP or pos + RECORD.size + length > self.capacity:
+                logger.warning(f"Collector ring {self.path} truncated at record {self.count}")
+                break
+            self._index.append((pos, length, seq))
+            self.count += 1
+            pos += RECORD.size + length
+        if self.count != count:
+            self.tail = pos if self.count else self.head
+            self._write_header()
+        logger.info(f"Recovered {self.count} collector items from {self.path}")
+
+    def _normalize(self, pos: int) -> int:
+        """Position of the record at `pos`, following a wrap marker back to the start"""
+        if self.capacity - pos < RECORD.size:
+            return 0
+        (length,) = struct.unpack_from("<I", self._map, HEADER_SIZE + pos)
+        return 0 if length == WRAP else pos
+
+    # -- space management ----------------------------------------------------
+
+    def _evict(self):
+        pos, length, _ = self._index[self._first]
+        self._first += 1
+        self.count -= 1
+        self.head = pos + RECORD.size + length
+        if self.count == 0:
+            self.head = self.tail = 0
+        if self._first > 1024 and self._first * 2 > len(self._index):
+            del self._index[:self._first]
+            self._first = 0
+
+    def _reserve(self, need: int) -> int:
+        """Offset where a record of `need` bytes can be written, evicting old records as needed"""
+        while True:
+            if self.count == 0:
+                self.head = self.tail = 0
+                return 0
+            if self.tail > self.head:
+                # Used region is [head, tail)
+                if self.capacity - self.tail >= need:
+                    return self.tail
+                if self.head >= need:
+                    if self.capacity - self.tail >= 4:
+                        struct.pack_into("<I", self._map, HEADER_SIZE + self.tail, WRAP)
+                    return 0
+            elif self.head - self.tail >= need:
+                # Wrapped: used region is [head, end) + [0, tail)
+                return self.tail
+            self._evict()
+
+    # -- list-like API -------------------------------------------------------
+
+    def append(self, item: Any, seq: int):
+        payload = json.dumps(item, separators=(",", ":"), ensure_ascii=False, default=str).encode("utf-8")
+        need = RECORD.size + len(payload)
+        if need > self.capacity:
+            raise ValueError(f"Collector item of {len(payload)} bytes exceeds ring capacity {self.capacity}")
+        count = self.count
+        pos = self._reserve(need)
+        if self.count < count:
+            # Evicted records are about to be overwritten: persist the new head first
+            self._write_header()
+        start = HEADER_SIZE + pos
+        RECORD.pack_into(self._map, start, len(payload), seq)
+        self._map[start + RECORD.size:start + need] = payload
+        self._index.append((pos, len(payload), seq))
+        self.tail = pos + need
+        self.count += 1
+        self.last_seq = max(self.last_seq, seq)
+        self._write_header()
+
+    def pop(self) -> Any:
+        if self.count == 0:
+            raise IndexError("pop from empty collector ring")
+        item = self[-1]
+        pos, _, _ = self._index.pop()
+        self.count -= 1
+        self.tail = pos
+        if self.count == 0:
+            self.head = self.tail = 0
+            self._index.clear()
+            self._first = 0
+        self._write_header()
+        return item
+
+    def reset(self):
+        self._index.clear()
+        self._first = 0
+        self.head = self.tail = self.count = 0
+        self._write_header()
+
+    def raw(self, index: int) -> memoryview:
+        """Zero-copy view of a record's JSON payload; release it before closing the ring"""
+        pos, length, _ = self._entry(index)
+        start = HEADER_SIZE + pos + RECORD.size
+        return memoryview(self._map)[start:start + length]
+
+    def _entry(self, index: int) -> Tuple[int, int, int]:
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError("collector ring index out of range")
+        return self._index[self._first + index]
+
+    def _entries(self, index: slice) -> List[Tuple[int, int, int]]:
+        start, stop, step = index.indices(self.count)
+        return [self._index[self._first + i] for i in range(start, stop, step)]
+
+    def _decode(self, entry: Tuple[int, int, int]) -> Any:
+        pos, length, _ = entry
+        start = HEADER_SIZE + pos + RECORD.size
+        return json.loads(self._map[start:start + length])
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._decode(entry) for entry in self._entries(index)]
+        return self._decode(self._entry(index))
+
+    def __iter__(self) -> Iterator[Any]:
+        for i in range(self.count):
+            yield self._decode(self._index[self._first + i])
+
+    def flush(self):
+        self._map.flush()
+
+    def close(self):
+        self._map.flush()
+        self._map.close()
+        self._file.close()
+
+    def metrics(self) -> Dict[str, Any]:
+        used = 0 if self.count == 0 else (
+            self.tail - self.head if self.tail > self.head else self.capacity - self.head + self.tail
+        )
+        return {"path": str(self.path), "capacity_bytes": self.capacity, "used_bytes": used, "items": self.count}
@@ -1,8 +1,9 @@
-from fastapi import FastAPI, APIRouter, HTTPException
+from fastapi import FastAPI, APIRouter, HTTPException, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
-from motor.motor_asyncio import AsyncIOMotorClient
 import os
+import asyncio
 import logging
 from pathlib import Path
 from pydantic import BaseModel, Field
@@ -12,17 +13,62 @@ from datetime import datetime
 
 # Import Pandora Engine
 from .pandora_engine import PandoraMemoryEngine, QInfinityMemoryLine
+from .storage import create_storage_backend
+from .cache import RedisHotCache
+from .ring_buffer import MappedRingBuffer
+from .clock import SimulatedClock
+from .writer import WriterOverloaded
+from .status_checks import ensure_status_indexes, page_status_checks, parse_fields, stream_status_checks
+from .export_formats import (ARROW, JSON, MSGPACK, NDJSON, Pairs, Prefix, arrow_stream, compress, compress_stream,
+                             doc_columns, item_columns, item_schema, line_columns, line_schema, msgpack_rows,
+                             ndjson_rows, negotiate, pack_msgpack, pick_encoding)
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
-# MongoDB connection
-mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
+# MongoDB connection (optional: memory and sqlite storage run without it).
+# Motor is imported only when configured; the client connects lazily on first use.
+mongo_url = os.environ.get('MONGO_URL')
+if mongo_url:
+    from motor.motor_asyncio import AsyncIOMotorClient
+    client = AsyncIOMotorClient(mongo_url)
+else:
+    client = None
+db = client[os.environ.get('DB_NAME', 'pandora')] if client is not None else None
 
 # Initialize Pandora Engine
-pandora_engine = PandoraMemoryEngine(client, os.environ['DB_NAME'])
+storage_backend = create_storage_backend(
+    os.environ.get('PANDORA_STORAGE', 'mongo' if db is not None else 'memory'),
+    db=db,
+    sqlite_path=os.environ.get('PANDORA_SQLITE_PATH'),
+    partition=os.environ.get('PANDORA_PARTITION'),  # "day" or "month": one collection/table per period
+)
+redis_url = os.environ.get('PANDORA_REDIS_URL')
+hot_cache = RedisHotCache.from_url(
+    redis_url,
+    max_lines=int(os.environ.get('PANDORA_CACHE_LINES', '500')),
+    line_ttl=int(os.environ.get('PANDORA_CACHE_TTL', '3600')),
+) if redis_url else None
+# Optional crash-safe collector buffer in a memory-mapped ring file
+ring_path = os.environ.get('PANDORA_COLLECTOR_RING')
+collector_ring = MappedRingBuffer(
+    ring_path,
+    capacity=int(os.environ.get('PANDORA_COLLECTOR_RING_MB', '64')) * 1024 * 1024,
+) if ring_path else None
+# PANDORA_CLOCK=simulated runs breath cycles and other periodic work in virtual time, which moves only
+# through POST /api/pandora/clock/advance
+pandora_engine = PandoraMemoryEngine(storage=storage_backend, cache=hot_cache,
+                                     data_dir=os.environ.get('PANDORA_DATA_DIR'),
+                                     collector_ring=collector_ring,
+                                     clock=SimulatedClock() if os.environ.get('PANDORA_CLOCK') == 'simulated' else None)
+pandora_engine.snapshot_format = os.environ.get('PANDORA_SNAPSHOT_FORMAT', 'json')
+# Largest step of virtual time a single advance request may take (default one day)
+MAX_CLOCK_ADVANCE = float(os.environ.get('PANDORA_CLOCK_MAX_ADVANCE', '86400'))
+
+# Replicas serve memory/status reads from the hot cache and never run the breath loop
+is_replica = os.environ.get('PANDORA_ROLE', 'primary') == 'replica'
+if is_replica and hot_cache is None:
+    raise RuntimeError("PANDORA_ROLE=replica requires PANDORA_REDIS_URL")
 
 # Create the main app without a prefix
 app = FastAPI(title="Pandora 5o Memory Engine", description="Flo-integrated Nexus with QInfinity Memory")
@@ -58,22 +104,93 @@ class MemoryLineResponse(BaseModel):
     hash_value: str
     breath_cycle: int
 
+class BlockRootsInput(BaseModel):
+    block_roots: List[str]
+
 # Legacy API endpoints
 @api_router.get("/")
 async def root():
     return {"message": "Pandora 5o Memory Engine - Flo-integrated Nexus Active"}
 
+def _require_db():
+    if db is None:
+        raise HTTPException(status_code=503, detail="Status checks require MongoDB (set MONGO_URL)")
+    return db
+
+def _overloaded(error: WriterOverloaded) -> HTTPException:
+    return HTTPException(status_code=503, detail=str(error), headers={"Retry-After": "1"})
+
+def _negotiate(request: Request, format: Optional[str], offered=(JSON, MSGPACK, ARROW)) -> str:
+    try:
+        return negotiate(request.headers.get("accept"), format, offered)
+    except ValueError as e:
+        raise HTTPException(status_code=406, detail=str(e))
+
+def _encoded(request: Request, media: str, payload: Dict[str, Any], arrow=None) -> Response:
+    """Render a payload as msgpack, or stream `arrow()` batches, compressed per Accept-Encoding.
+    
+    Endpoints return JSON payloads directly; JSON is never compressed here.
+    """
+    encoding = pick_encoding(request.headers.get("accept-encoding"))
+    headers = {"Vary": "Accept, Accept-Encoding"}
+    if media == ARROW:
+        if encoding:
+            headers["Content-Encoding"] = encoding
+        return StreamingResponse(compress_stream(arrow(), encoding), media_type=ARROW, headers=headers)
+    body, used = compress(pack_msgpack(payload), encoding)
+    if used:
+        headers["Content-Encoding"] = used
+    return Response(content=body, media_type=media, headers=headers)
+
+def _require_ready():
+    # A runtime stopped on purpose still accepts mutations; one that is still booting does not
+    if not pandora_engine.is_ready and pandora_engine.bootstrap_progress["phase"] != "stopped":
+        raise HTTPException(status_code=503, detail=f"Pandora runtime not ready ({pandora_engine.bootstrap_progress['phase']})",
+                            headers={"Retry-After": "1"})
+
+@api_router.get("/health/live")
+async def liveness():
+    """Process is up and serving requests"""
+    return {"status": "alive"}
+
+@api_router.get("/health/ready")
+async def readiness():
+    """Runtime has finished bootstrapping; reports progress while it has not"""
+    if is_replica:
+        return {"status": "ready", "phase": "replica"}
+    progress = pandora_engine.bootstrap_progress
+    if pandora_engine.is_ready:
+        return {"status": "ready", **progress}
+    return JSONResponse(status_code=503, content={"status": "starting", **progress}, headers={"Retry-After": "1"})
+
 @api_router.post("/status", response_model=StatusCheck)
 async def create_status_check(input: StatusCheckCreate):
+    db = _require_db()
     status_dict = input.dict()
     status_obj = StatusCheck(**status_dict)
     _ = await db.status_checks.insert_one(status_obj.dict())
     return status_obj
 
-@api_router.get("/status", response_model=List[StatusCheck])
-async def get_status_checks():
-    status_checks = await db.status_checks.find().to_list(1000)
-    return [StatusCheck(**status_check) for status_check in status_checks]
+@api_router.get("/status")
+async def get_status_checks(response: Response, limit: int = 1000, cursor: Optional[str] = None,
+                            fields: Optional[str] = None, order: str = "asc", format: str = "json"):
+    """Keyset-paginated status checks; the next page's cursor is sent in X-Next-Cursor.
+    
+    format=ndjson streams every check after `cursor` instead of a single page.
+    """
+    db = _require_db()
+    try:
+        projection = parse_fields(fields)
+        descending = order == "desc"
+        if format == "ndjson":
+            return StreamingResponse(stream_status_checks(db, cursor, projection, descending),
+                                     media_type="application/x-ndjson")
+        status_checks, next_cursor = await page_status_checks(db, limit, cursor, projection, descending)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if next_cursor is not None:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return status_checks
 
 # Pandora 5o Portal Endpoints
 @api_router.get("/pandora/runtime/5o")
@@ -94,7 +211,13 @@ async def pandora_portal():
                 "query": "/api/pandora/query",
                 "promise": "/api/pandora/promise",
                 "memory": "/api/pandora/memory",
-                "snapshot": "/api/pandora/snapshot"
+                "export": "/api/pandora/export",
+                "changes": "/api/pandora/changes",
+                "timeline": "/api/pandora/timeline",
+                "context": "/api/pandora/context",
+                "snapshot": "/api/pandora/snapshot",
+                "integrity": "/api/pandora/integrity",
+                "ready": "/api/health/ready"
             }
         }
     except Exception as e:
@@ -130,6 +253,11 @@ async def stop_pandora_runtime():
 @api_router.get("/pandora/status")
 async def get_pandora_status():
     """Get current Pandora runtime status"""
+    if is_replica:
+        status = await hot_cache.get_status()
+        if status is None:
+            raise HTTPException(status_code=503, detail="Status not yet available in hot cache")
+        return status
     try:
         status = pandora_engine.get_runtime_status()
         return status
@@ -139,6 +267,8 @@ async def get_pandora_status():
 @api_router.post("/pandora/query")
 async def pandora_query(query: PandoraQuery):
     """Perform introspective traversal query"""
+    if query.action == "introspect":
+        _require_ready()
     try:
         if query.action == "introspect":
             result = await pandora_engine.introspective_traversal(query.query)
@@ -147,31 +277,105 @@ async def pandora_query(query: PandoraQuery):
             return pandora_engine.get_runtime_status()
         else:
             raise HTTPException(status_code=400, detail=f"Unknown action: {query.action}")
+    except WriterOverloaded as e:
+        raise _overloaded(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Query error: {str(e)}")
 
 @api_router.post("/pandora/promise")
 async def pandora_promise_chain(promise_input: PandoraPromiseInput):
     """Execute promise.then > this.bind chain behavior"""
+    _require_ready()
     try:
-        result = pandora_engine.promise_then_this_chain(promise_input.data)
+        result = await pandora_engine.run_promise_chain(promise_input.data)
         return result
+    except WriterOverloaded as e:
+        raise _overloaded(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Promise chain error: {str(e)}")
 
 @api_router.get("/pandora/memory")
-async def get_pandora_memory(limit: int = 50):
-    """Get recent memory lines"""
+async def get_pandora_memory(request: Request, limit: int = 50, compact: bool = False, format: Optional[str] = None):
+    """Get recent memory lines as JSON, msgpack or an Arrow IPC stream (Accept header or ?format=)"""
+    media = _negotiate(request, format)
+    if is_replica:
+        cached = await hot_cache.get_recent_lines(limit)
+        if cached is None:
+            raise HTTPException(status_code=503, detail="Memory lines not yet available in hot cache")
+        payload = {
+            "total_memory_lines": cached["total_memory_lines"],
+            "returned_lines": len(cached["memory_lines"]),
+            "memory_lines": cached["memory_lines"]
+        }
+        if media == JSON:
+            return payload
+        return _encoded(request, media, payload, lambda: arrow_stream(cached["memory_lines"], line_schema(), doc_columns))
     try:
-        recent_lines = pandora_engine.memory_lines[-limit:] if len(pandora_engine.memory_lines) > limit else pandora_engine.memory_lines
-        return {
-            "total_memory_lines": len(pandora_engine.memory_lines),
+        recent_lines = pandora_engine.recent_memory_lines(limit, compact=compact)
+        if media == ARROW:
+            return _encoded(request, media, {}, lambda: arrow_stream(recent_lines, line_schema(), line_columns))
+        payload = {
+            "total_memory_lines": pandora_engine.total_memory_lines(),
             "returned_lines": len(recent_lines),
             "memory_lines": [line.to_dict() for line in recent_lines]
         }
+        if media == JSON:
+            return payload
+        return _encoded(request, media, payload)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Memory retrieval error: {str(e)}")
 
+@api_router.get("/pandora/export")
+async def export_pandora(request: Request, source: str = "memory", format: Optional[str] = None,
+                         batch_size: int = 4096):
+    """Stream the whole braid (or collector buffer) as Arrow record batches, msgpack rows or NDJSON.
+
+    The export covers what existed when the request arrived and is encoded one
+    batch at a time, so memory stays bounded however long the braid is.
+    """
+    if source not in ("memory", "collector"):
+        raise HTTPException(status_code=400, detail="source must be memory or collector")
+    if is_replica:
+        raise HTTPException(status_code=503, detail="Bulk export is served by the primary")
+    media = _negotiate(request, format, offered=(ARROW, MSGPACK, NDJSON))
+    batch_size = max(1, min(batch_size, 65536))
+    try:
+        if source == "memory":
+            view = pandora_engine.view
+            records = Prefix(view.memory_lines, view.length)
+            schema, columns = line_schema, line_columns
+            rows = lambda: (line.to_dict() for line in records)
+        else:
+            collector = pandora_engine.collector
+            records = Pairs(collector.seqs, collector.buffer)
+            schema, columns = item_schema, item_columns
+            rows = lambda: ({"seq": seq, "data": item} for seq, item in records)
+        if media == ARROW:
+            chunks = arrow_stream(records, schema(), columns, batch_size)
+        else:
+            chunks = (msgpack_rows if media == MSGPACK else ndjson_rows)(rows())
+        encoding = pick_encoding(request.headers.get("accept-encoding"))
+        headers = {"Vary": "Accept, Accept-Encoding", "X-Export-Records": str(len(records))}
+        if encoding:
+            headers["Content-Encoding"] = encoding
+        return StreamingResponse(compress_stream(chunks, encoding), media_type=media, headers=headers)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Export error: {str(e)}")
+
+@api_router.get("/pandora/changes")
+async def get_pandora_changes(since: int = 0, limit: int = 500, wait: float = 0.0):
+    """Delta feed of memory lines and collector items with seq > since.
+
+    With wait > 0 the request long-polls (up to 30s) until something new arrives.
+    Resume from the returned next_since.
+    """
+    try:
+        limit = max(1, min(limit, 5000))
+        await pandora_engine.wait_for_changes(since, min(max(wait, 0.0), 30.0))
+        return pandora_engine.changes_since(since, limit)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Change feed error: {str(e)}")
+
 @api_router.post("/pandora/snapshot")
 async def commit_pandora_snapshot():
     """Manually commit memory snapshot"""
@@ -181,26 +385,90 @@ async def commit_pandora_snapshot():
             return {
                 "status": "committed",
                 "message": "Memory snapshot committed successfully",
-                "location": "/mnt/data/qinfinity_memory.json"
+                "locations": pandora_engine.snapshot_stats["locations"]
             }
         else:
             raise HTTPException(status_code=500, detail="Snapshot commit failed")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Snapshot error: {str(e)}")
 
+@api_router.post("/pandora/clock/advance")
+async def advance_pandora_clock(seconds: float):
+    """Run the periodic work due in the next `seconds` of virtual time (PANDORA_CLOCK=simulated only)"""
+    if not pandora_engine.clock.simulated:
+        raise HTTPException(status_code=409, detail="The runtime uses the system clock (set PANDORA_CLOCK=simulated)")
+    if not 0 < seconds <= MAX_CLOCK_ADVANCE:
+        raise HTTPException(status_code=400, detail=f"seconds must be in (0, {MAX_CLOCK_ADVANCE:g}]")
+    _require_ready()
+    try:
+        runs = await pandora_engine.fast_forward(seconds)
+        return {"job_runs": runs, "scheduler": pandora_engine.scheduler.metrics()}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Clock error: {str(e)}")
+
+@api_router.post("/pandora/retention/prune")
+async def prune_pandora_memory():
+    """Run a retention pass now instead of waiting for the background pruner"""
+    try:
+        pruned = await pandora_engine.prune_memory()
+        return {"pruned_records": pruned, "retention": pandora_engine.get_runtime_status()["retention"]}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Retention error: {str(e)}")
+
+@api_router.post("/pandora/tags/retag")
+async def retag_pandora_memory(batch_size: Optional[int] = None, stored: bool = False):
+    """Classify the braid again in bulk (and stored history with ?stored=true), reporting lines per second"""
+    if pandora_engine.tagging is None:
+        raise HTTPException(status_code=503, detail="Semantic tagging is not configured")
+    try:
+        report = await pandora_engine.retag_history(batch_size=batch_size, stored=stored)
+        return {**report, "semantic_distribution": pandora_engine.get_runtime_status()["semantic_distribution"]}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Retagging error: {str(e)}")
+
+@api_router.get("/pandora/timeline")
+async def get_pandora_timeline(dimension: str = "stage", resolution: str = "auto",
+                               start: Optional[datetime] = None, end: Optional[datetime] = None,
+                               points: int = 200):
+    """Line counts per time bucket by stage, tag or identity, downsampled to at most `points` buckets"""
+    try:
+        return pandora_engine.timeline.series(dimension, resolution, start, end, points)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Timeline error: {str(e)}")
+
+@api_router.get("/pandora/context")
+async def get_pandora_context(render: bool = False):
+    """Memory lines packed into the context window by priority, in braid order"""
+    try:
+        return pandora_engine.context_packer.packed(render=render)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Context packing error: {str(e)}")
+
 @api_router.get("/pandora/collector")
-async def get_collector_status():
-    """Get FloJsonOutputCollector status"""
+async def get_collector_status(request: Request, format: Optional[str] = None):
+    """Get FloJsonOutputCollector status as JSON or msgpack; Arrow streams the buffered items"""
+    media = _negotiate(request, format)
     try:
         collector = pandora_engine.collector
-        return {
+        if media == ARROW:
+            items = Pairs(collector.seqs, collector.buffer)
+            return _encoded(request, media, {}, lambda: arrow_stream(items, item_schema(), item_columns))
+        payload = {
             "collector_class": "FloJsonOutputCollector",
             "buffer_size": len(collector.buffer),
             "strict_mode": collector.strict_mode,
             "comment_strip": collector.comment_strip,
             "reverse_order": collector.reverse_order,
-            "recent_items": collector.fetch(5)  # Get last 5 items
+            "recent_items": collector.fetch(5),  # Get last 5 items
+            "cache": collector.cache.metrics(),
+            "ring": collector.ring.metrics() if collector.ring is not None else None,
+            "dedup": collector.store.metrics() if collector.store is not None else None
         }
+        if media == JSON:
+            return payload
+        return _encoded(request, media, payload)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Collector status error: {str(e)}")
 
@@ -213,12 +481,74 @@ async def get_pandora_config():
             "memory_reel_stages": len(pandora_engine.memory_reel),
             "context_window": pandora_engine.context_window_size,
             "breath_interval": pandora_engine.breath_interval,
+            "storage": {
+                "backend": pandora_engine.storage.name,
+                "bulk_insert": pandora_engine.storage.capabilities.bulk_insert,
+                "indexed_fields": list(pandora_engine.storage.capabilities.indexed_fields),
+                "partitions": pandora_engine.storage.metrics() if hasattr(pandora_engine.storage, "partitions") else None
+            },
             "semantic_tags": pandora_engine.semantic_tags,
-            "checkpoints": pandora_engine.checkpoints
+            "tagging": pandora_engine.tagging.metrics() if pandora_engine.tagging is not None else None,
+            "checkpoints": pandora_engine.checkpoints,
+            "retention": {
+                "policies": [policy.name for policy in pandora_engine.retention.policies],
+                "pinned": sorted(pandora_engine.retention.pinned),
+                "ttl_index": pandora_engine.storage.capabilities.ttl_index
+            }
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Config retrieval error: {str(e)}")
 
+@api_router.get("/pandora/integrity")
+async def get_integrity_summary():
+    """Get hash chain head and Merkle root of the memory braid"""
+    try:
+        return pandora_engine.integrity_summary()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Integrity summary error: {str(e)}")
+
+@api_router.get("/pandora/integrity/blocks")
+async def get_integrity_blocks():
+    """Get per-block Merkle roots for replica diffing"""
+    try:
+        merkle = pandora_engine.merkle_index()
+        return {
+            "block_size": merkle.block_size,
+            "block_roots": merkle.block_roots()
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Integrity blocks error: {str(e)}")
+
+@api_router.get("/pandora/integrity/proof/{line_id}")
+async def get_inclusion_proof(line_id: str):
+    """Get a Merkle inclusion proof for a memory line"""
+    proof = pandora_engine.inclusion_proof(line_id)
+    if proof is None:
+        raise HTTPException(status_code=404, detail=f"Memory line not found: {line_id}")
+    return proof
+
+@api_router.post("/pandora/integrity/diff")
+async def diff_integrity_blocks(other: BlockRootsInput):
+    """Compare another braid's block roots against this one"""
+    try:
+        merkle = pandora_engine.merkle_index()
+        differing = merkle.diff_blocks(other.block_roots)
+        return {
+            "block_size": merkle.block_size,
+            "differing_blocks": differing,
+            "in_sync": not differing
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Integrity diff error: {str(e)}")
+
+@api_router.post("/pandora/integrity/verify")
+async def verify_integrity():
+    """Re-verify the full hash chain"""
+    try:
+        return await pandora_engine.verify_integrity()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Integrity verification error: {str(e)}")
+
 # Include the router in the main app
 app.include_router(api_router)
 
@@ -241,7 +571,21 @@ logger = logging.getLogger(__name__)
 @app.on_event("startup")
 async def startup_event():
     logger.info("Starting Pandora 5o Memory Engine server...")
-    # Auto-start the Pandora runtime
+    if is_replica:
+        logger.info("Running as read replica; serving memory and status from the hot cache")
+        return
+    # Auto-start the Pandora runtime in the background; /api/health/ready reports progress
+    global startup_task
+    startup_task = asyncio.create_task(_auto_start())
+
+startup_task: Optional[asyncio.Task] = None
+
+async def _auto_start():
+    if db is not None:
+        try:
+            await ensure_status_indexes(db)
+        except Exception as e:
+            logger.error(f"Error ensuring status check indexes: {e}")
     try:
         await pandora_engine.start_runtime()
         logger.info("Pandora 5o runtime auto-started successfully")
@@ -252,8 +596,18 @@ async def startup_event():
 async def shutdown_db_client():
     logger.info("Shutting down Pandora 5o Memory Engine...")
     try:
-        await pandora_engine.stop_runtime()
-        client.close()
-        logger.info("Pandora 5o runtime stopped and database connection closed")
+        if not is_replica:
+            if startup_task is not None and not startup_task.done():
+                await startup_task
+            await pandora_engine.stop_runtime()
+            await pandora_engine.storage.close()
+            if collector_ring is not None:
+                collector_ring.close()
+            if client is not None:
+                client.close()
+            logger.info("Pandora 5o runtime stopped and database connection closed")
+        # Last, so the final snapshot's write-through still reaches the cache
+        if hot_cache is not None:
+            await hot_cache.close()
     except Exception as e:
         logger.error(f"Error during shutdown: {e}")
@@ -0,0 +1,254 @@
+import io
+import os
+import json
+import mmap
+import codecs
+import logging
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Any, Iterator, Iterable, Optional, Tuple, Union, BinaryIO
+
+logger = logging.getLogger("pandora.snapshot")
+
+FORMAT_NAME = "pandora-snapshot-ndjson"
+FORMAT_VERSION = 1
+CHUNK_SIZE = 1 << 16
+
+Source = Union[str, Path, bytes, bytearray, memoryview, mmap.mmap, BinaryIO]
+Record = Tuple[str, Dict[str, Any]]
+
+# Legacy qinfinity_memory.json keys that hold streamable arrays
+LEGACY_ARRAYS = {"memory_lines": "line", "collector_buffer": "item"}
+
+
+class SnapshotWriter:
+    """Writes a snapshot as NDJSON: header, config, one record per line/item, footer.
+
+    Output goes to a temporary file that replaces the target on close, so
+    readers never observe a half-written snapshot.
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._tmp_path = self.path.with_name(self.path.name + ".tmp")
+        self._file = open(self._tmp_path, "w", encoding="utf-8")
+        self.counts = {"line": 0, "item": 0}
+
+    def _write(self, record: Dict[str, Any]):
+        self._file.write(json.dumps(record, separators=(",", ":"), ensure_ascii=False, default=str))
+        self._file.write("\n")
+
+    def write_header(self, **meta):
+        self._write({"type": "header", "format": FORMAT_NAME, "version": FORMAT_VERSION, **meta})
+
+    def write_config(self, config: Dict[str, Any]):
+        self._write({"type": "config", "data": config})
+
+    def write_line(self, line: Dict[str, Any]):
+        self.counts["line"] += 1
+        self._write({"type": "line", "data": line})
+
+    def write_item(self, item: Any, seq: Optional[int] = None):
+        self.counts["item"] += 1
+        self._write({"type": "item", "seq": seq, "data": item})
+
+    def close(self):
+        self._write({"type": "footer", "memory_lines": self.counts["line"], "collector_items": self.counts["item"]})
+        self._file.close()
+        os.replace(self._tmp_path, self.path)
+
+    def abort(self):
+        self._file.close()
+        self._tmp_path.unlink(missing_ok=True)
+
+    def __enter__(self) -> "SnapshotWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def write_snapshot(path: Union[str, Path], header: Dict[str, Any], lines: Iterable[Dict[str, Any]],
+                   items: Iterable[Tuple[Optional[int], Any]], config: Optional[Dict[str, Any]] = None):
+    with SnapshotWriter(path) as writer:
+        writer.write_header(**header)
+        writer.write_config(config or {})
+        for line in lines:
+            writer.write_line(line)
+        for seq, item in items:
+            writer.write_item(item, seq)
+
+
+@contextmanager
+def open_source(source: Source, use_mmap: bool = False) -> Iterator[BinaryIO]:
+    """Yield a binary stream with read/readline over a path, buffer or open file"""
+    if isinstance(source, (str, Path)):
+        with open(source, "rb") as f:
+            if use_mmap and os.fstat(f.fileno()).st_size > 0:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    yield mapped
+            else:
+                yield f
+    elif isinstance(source, (bytes, bytearray, memoryview)):
+        yield io.BytesIO(source)
+    else:
+        yield source
+
+
+class _LegacyScanner:
+    """Incremental reader for the indented single-object snapshot format.
+
+    Only the top-level object is walked by hand; each array element (and each
+    other top-level value) is decoded with raw_decode from a sliding buffer, so
+    memory stays bounded by the largest single element.
+    """
+
+    def __init__(self, stream: BinaryIO, prefix: bytes = b""):
+        self.stream = stream
+        self.decoder = json.JSONDecoder()
+        self.utf8 = codecs.getincrementaldecoder("utf-8")()
+        self.buffer = self.utf8.decode(prefix)
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self) -> bool:
+        if self.eof:
+            return False
+        chunk = self.stream.read(CHUNK_SIZE)
+        if not chunk:
+            self.eof = True
+            return False
+        if self.pos > CHUNK_SIZE:
+            self.buffer = self.buffer[self.pos:]
+            self.pos = 0
+        self.buffer += self.utf8.decode(chunk)
+        return True
+
+    def _peek(self) -> str:
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in " \t\r\n":
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                return ""
+
+    def _expect(self, char: str):
+        if self._peek() != char:
+            raise ValueError(f"Malformed snapshot: expected {char!r} at offset {self.pos}")
+        self.pos += 1
+
+    def _value(self) -> Any:
+        self._peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+                # A number ending exactly at the buffer edge may continue in the next chunk
+                if end < len(self.buffer) or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self._fill()
+
+    def records(self) -> Iterator[Record]:
+        self._expect("{")
+        header: Dict[str, Any] = {}
+        trailer: Dict[str, Any] = {}
+        if self._peek() == "}":
+            yield "header", header
+            return
+        header_sent = False
+        while True:
+            key = self._value()
+            self._expect(":")
+            kind = LEGACY_ARRAYS.get(key)
+            if kind is None:
+                value = self._value()
+                if key == "config":
+                    yield "config", value
+                else:
+                    (trailer if header_sent else header)[key] = value
+            else:
+                if not header_sent:
+                    yield "header", header
+                    header_sent = True
+                self._expect("[")
+                if self._peek() == "]":
+                    self.pos += 1
+                else:
+                    while True:
+                        yield kind, self._value()
+                        if self._peek() == ",":
+                            self.pos += 1
+                            continue
+                        self._expect("]")
+                        break
+            if self._peek() == ",":
+                self.pos += 1
+                continue
+            self._expect("}")
+            break
+        if not header_sent:
+            yield "header", header
+        elif trailer:
+            # Summary keys written after the arrays (semantic_state etc.)
+            yield "footer", trailer
+
+
+def _ndjson_lines(stream: BinaryIO, prefix: bytes) -> Iterator[bytes]:
+    """Lines of an NDJSON stream whose first bytes were already read into `prefix`"""
+    *complete, partial = prefix.split(b"\n")
+    yield from complete
+    line = partial + stream.readline()
+    while line:
+        yield line
+        line = stream.readline()
+
+
+def _ndjson_records(lines: Iterator[bytes]) -> Iterator[Record]:
+    for line in lines:
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        kind = record.get("type")
+        if kind == "header":
+            yield "header", {k: v for k, v in record.items() if k != "type"}
+        elif kind in ("config", "line"):
+            yield kind, record.get("data")
+        elif kind == "item":
+            yield "item", {"seq": record.get("seq"), "data": record.get("data")}
+        elif kind == "footer":
+            yield "footer", {k: v for k, v in record.items() if k != "type"}
+
+
+def iter_snapshot(source: Source, use_mmap: bool = False) -> Iterator[Record]:
+    """Stream (kind, payload) records from an NDJSON or legacy JSON snapshot.
+
+    Kinds are "header", "config", "line", "item" and "footer".
+    Legacy collector items are yielded as {"seq": None, "data": item} to match NDJSON.
+    """
+    with open_source(source, use_mmap) as stream:
+        prefix = stream.read(CHUNK_SIZE)
+        if prefix.lstrip().startswith(b'{"type":"header"'):
+            yield from _ndjson_records(_ndjson_lines(stream, prefix))
+            return
+        for kind, payload in _LegacyScanner(stream, prefix=prefix).records():
+            yield kind, {"seq": None, "data": payload} if kind == "item" else payload
+
+
+def iter_memory_lines(source: Source, use_mmap: bool = False) -> Iterator[Dict[str, Any]]:
+    for kind, payload in iter_snapshot(source, use_mmap):
+        if kind == "line":
+            yield payload
+
+
+def iter_collector_items(source: Source, use_mmap: bool = False) -> Iterator[Dict[str, Any]]:
+    for kind, payload in iter_snapshot(source, use_mmap):
+        if kind == "item":
+            yield payload
@@ -0,0 +1,95 @@
+import json
+import base64
+import logging
+from datetime import datetime
+from typing import Dict, List, Any, AsyncIterator, Optional, Tuple
+
+logger = logging.getLogger("pandora.status_checks")
+
+STATUS_FIELDS = ("id", "client_name", "timestamp")
+MAX_PAGE_SIZE = 1000
+STREAM_BATCH_SIZE = 500
+# Keyset order plus the remaining field, so projected pages are answered from the index alone
+COVERING_INDEX = [("timestamp", 1), ("id", 1), ("client_name", 1)]
+
+
+async def ensure_status_indexes(db):
+    await db.status_checks.create_index(COVERING_INDEX, name="status_checks_keyset")
+
+
+def _json_default(value: Any) -> str:
+    return value.isoformat() if isinstance(value, datetime) else str(value)
+
+
+def encode_cursor(doc: Dict[str, Any]) -> str:
+    """Opaque keyset cursor for the (timestamp, id) position of a status check"""
+    timestamp = doc["timestamp"]
+    position = [timestamp.isoformat() if isinstance(timestamp, datetime) else timestamp, doc["id"]]
+    return base64.urlsafe_b64encode(json.dumps(position).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        timestamp, doc_id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(timestamp), str(doc_id)
+    except Exception:
+        raise ValueError(f"Invalid cursor: {cursor!r}")
+
+
+def parse_fields(fields: Optional[str]) -> List[str]:
+    """Validated projection; the keyset fields are always included so pages can continue"""
+    if not fields:
+        return list(STATUS_FIELDS)
+    requested = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = [field for field in requested if field not in STATUS_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown status check field(s): {', '.join(unknown)}")
+    return [field for field in STATUS_FIELDS if field in requested or field in ("id", "timestamp")]
+
+
+def _keyset_filter(cursor: Optional[str], descending: bool) -> Dict[str, Any]:
+    if not cursor:
+        return {}
+    timestamp, doc_id = decode_cursor(cursor)
+    op = "$lt" if descending else "$gt"
+    return {"$or": [{"timestamp": {op: timestamp}}, {"timestamp": timestamp, "id": {op: doc_id}}]}
+
+
+def _find(db, cursor: Optional[str], fields: List[str], descending: bool):
+    direction = -1 if descending else 1
+    projection = {"_id": 0, **{field: 1 for field in fields}}
+    return db.status_checks.find(_keyset_filter(cursor, descending), projection).sort(
+        [("timestamp", direction), ("id", direction)]
+    )
+
+
+async def page_status_checks(db, limit: int = 100, cursor: Optional[str] = None,
+                             fields: Optional[List[str]] = None,
+                             descending: bool = False) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """One keyset page of status checks and the cursor for the next page (None at the end)"""
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    docs = await _find(db, cursor, fields or list(STATUS_FIELDS), descending).limit(limit + 1).to_list(limit + 1)
+    next_cursor = encode_cursor(docs[limit - 1]) if len(docs) > limit else None
+    return docs[:limit], next_cursor
+
+
+def stream_status_checks(db, cursor: Optional[str] = None, fields: Optional[List[str]] = None,
+                         descending: bool = False, batch_size: int = STREAM_BATCH_SIZE) -> AsyncIterator[bytes]:
+    """NDJSON chunks, one per cursor batch, so memory stays bounded by batch_size.
+
+    The query is built eagerly so a bad cursor fails before the response starts.
+    """
+    found = _find(db, cursor, fields or list(STATUS_FIELDS), descending).batch_size(batch_size)
+    return _ndjson_batches(found, batch_size)
+
+
+async def _ndjson_batches(found, batch_size: int) -> AsyncIterator[bytes]:
+    batch: List[str] = []
+    async for doc in found:
+        batch.append(json.dumps(doc, default=_json_default))
+        if len(batch) >= batch_size:
+            yield ("\n".join(batch) + "\n").encode()
+            batch = []
+    if batch:
+        yield ("\n".join(batch) + "\n").encode()
@@ -0,0 +1,471 @@
+import json
+import asyncio
+import bisect
+import logging
+import threading
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Any, Iterable, Optional, Tuple, Union
+
+logger = logging.getLogger("pandora.storage")
+
+TimeBound = Optional[Union[datetime, str]]
+
+
+@dataclass(frozen=True)
+class StorageCapabilities:
+    """What a storage backend can do efficiently"""
+    bulk_insert: bool = False
+    max_batch_size: int = 1
+    indexed_fields: Tuple[str, ...] = ()
+    durable: bool = True
+    ttl_index: bool = False  # expires documents carrying an expires_at datetime on its own
+
+
+def _bound(value: TimeBound) -> Optional[str]:
+    """Normalize a time bound to the ISO string form stored in documents"""
+    if value is None or isinstance(value, str):
+        return value
+    return value.isoformat()
+
+
+def _matches(doc: Dict[str, Any], filters: Optional[Dict[str, Any]]) -> bool:
+    """Equality filter with Mongo-style membership matching on list fields"""
+    if not filters:
+        return True
+    for key, expected in filters.items():
+        actual = doc.get(key)
+        if isinstance(actual, list) and not isinstance(expected, list):
+            if expected not in actual:
+                return False
+        elif actual != expected:
+            return False
+    return True
+
+
+def _prunable(doc: Dict[str, Any], exclude_stages: Iterable[str], exclude: Iterable[Dict[str, Any]]) -> bool:
+    """True unless the document is in an excluded stage or matches one of the `exclude` filters"""
+    return doc.get("stage") not in exclude_stages and not any(_matches(doc, spec) for spec in exclude)
+
+
+class MemoryStorageBackend(ABC):
+    """Persistence interface for serialized QInfinityMemoryLine documents"""
+
+    name = "base"
+    capabilities = StorageCapabilities()
+
+    async def ensure_indexes(self):
+        """Create whatever indexes the backend supports"""
+
+    @abstractmethod
+    async def persist(self, doc: Dict[str, Any]):
+        """Persist a single memory line document"""
+
+    async def persist_many(self, docs: List[Dict[str, Any]]):
+        """Persist many documents, batched when the backend supports it"""
+        for doc in docs:
+            await self.persist(doc)
+
+    @abstractmethod
+    async def delete_many(self, ids: List[str]):
+        """Delete the documents with the given line ids"""
+
+    @abstractmethod
+    async def query(self, start: TimeBound = None, end: TimeBound = None,
+                    filters: Optional[Dict[str, Any]] = None,
+                    limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Return documents with start <= timestamp < end matching filters, oldest first"""
+
+    @abstractmethod
+    async def restore_snapshot(self, docs: List[Dict[str, Any]]):
+        """Replace the stored contents with the given snapshot documents"""
+
+    @abstractmethod
+    async def count(self) -> int:
+        """Number of stored documents"""
+
+    async def count_matching(self, filters: Dict[str, Any], exclude_stages: Iterable[str] = (),
+                             exclude: Iterable[Dict[str, Any]] = ()) -> int:
+        """Number of documents matching `filters` outside `exclude_stages` and the `exclude` filters"""
+        excluded, exclude = set(exclude_stages), list(exclude)
+        return sum(1 for doc in await self.query(filters=filters) if _prunable(doc, excluded, exclude))
+
+    async def update_many(self, updates: Dict[str, Dict[str, Any]]):
+        """Set fields on stored documents, keyed by line id; ids not stored are ignored"""
+        if not updates:
+            return
+        docs = [doc for doc in await self.query() if doc.get("id") in updates]
+        await self.delete_many([doc["id"] for doc in docs])
+        await self.persist_many([{**doc, **updates[doc["id"]]} for doc in docs])
+
+    async def close(self):
+        """Release backend resources"""
+
+    async def drop(self):
+        """Remove the backend's collection/table and everything in it"""
+        await self.restore_snapshot([])
+
+    async def ensure_retention_indexes(self):
+        """Create TTL/partial indexes used by retention policies, when supported"""
+
+    async def prune(self, filters: Dict[str, Any], before: TimeBound = None, keep: Optional[int] = None,
+                    exclude_stages: Iterable[str] = (), exclude: Iterable[Dict[str, Any]] = ()) -> int:
+        """Delete matching documents older than `before` and all but the newest `keep`; returns the count.
+
+        Documents in `exclude_stages` or matching any filter in `exclude` are
+        neither deleted nor counted. A compacted run is older than `before`
+        only once its last line is.
+        """
+        excluded, exclude = set(exclude_stages), list(exclude)
+        docs = [doc for doc in await self.query(filters=filters) if _prunable(doc, excluded, exclude)]
+        victims = set()
+        if before is not None:
+            cutoff = _bound(before)
+            victims.update(doc["id"] for doc in docs if doc.get("last_timestamp", doc.get("timestamp", "")) < cutoff)
+        if keep is not None and len(docs) > keep:
+            victims.update(doc["id"] for doc in docs[:len(docs) - keep])
+        await self.delete_many(list(victims))
+        return len(victims)
+
+
+class MongoMemoryStorage(MemoryStorageBackend):
+    """Motor/MongoDB backend writing to the pandora_memory collection"""
+
+    name = "mongo"
+    capabilities = StorageCapabilities(bulk_insert=True, max_batch_size=1000,
+                                       indexed_fields=("timestamp", "stage", "breath_cycle"), ttl_index=True)
+
+    def __init__(self, db, collection: str = "pandora_memory"):
+        self.db = db
+        self.collection = db[collection]
+
+    async def ensure_indexes(self):
+        await self.collection.create_index("timestamp")
+        await self.collection.create_index([("stage", 1), ("timestamp", 1)])
+        await self.collection.create_index("breath_cycle")
+
+    async def persist(self, doc: Dict[str, Any]):
+        await self.collection.insert_one(dict(doc))
+
+    async def persist_many(self, docs: List[Dict[str, Any]]):
+        for i in range(0, len(docs), self.capabilities.max_batch_size):
+            batch = [dict(doc) for doc in docs[i:i + self.capabilities.max_batch_size]]
+            if batch:
+                await self.collection.insert_many(batch, ordered=False)
+
+    async def delete_many(self, ids: List[str]):
+        if ids:
+            await self.collection.delete_many({"id": {"$in": list(ids)}})
+
+    async def update_many(self, updates: Dict[str, Dict[str, Any]]):
+        from pymongo import UpdateOne
+
+        ops = [UpdateOne({"id": line_id}, {"$set": fields}) for line_id, fields in updates.items()]
+        for i in range(0, len(ops), self.capabilities.max_batch_size):
+            await self.collection.bulk_write(ops[i:i + self.capabilities.max_batch_size], ordered=False)
+
+    async def query(self, start: TimeBound = None, end: TimeBound = None,
+                    filters: Optional[Dict[str, Any]] = None,
+                    limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        spec: Dict[str, Any] = dict(filters or {})
+        time_range = {}
+        if start is not None:
+            time_range["$gte"] = _bound(start)
+        if end is not None:
+            time_range["$lt"] = _bound(end)
+        if time_range:
+            spec["timestamp"] = time_range
+        cursor = self.collection.find(spec, {"_id": 0}).sort("timestamp", 1)
+        if limit:
+            cursor = cursor.limit(limit)
+        return await cursor.to_list(length=limit)
+
+    async def restore_snapshot(self, docs: List[Dict[str, Any]]):
+        await self.collection.delete_many({})
+        await self.persist_many(docs)
+
+    async def count(self) -> int:
+        return await self.collection.count_documents({})
+
+    async def drop(self):
+        await self.collection.drop()
+
+    async def ensure_retention_indexes(self):
+        # Per-document expiry: only lines under an age policy carry expires_at
+        await self.collection.create_index("expires_at", expireAfterSeconds=0, name="retention_ttl",
+                                           partialFilterExpression={"expires_at": {"$exists": True}})
+
+    @staticmethod
+    def _spec(filters: Dict[str, Any], exclude_stages: Iterable[str],
+              exclude: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+        spec: Dict[str, Any] = dict(filters)
+        excluded = list(exclude_stages)
+        if excluded and "stage" not in spec:
+            spec["stage"] = {"$nin": excluded}
+        exclude = [dict(entry) for entry in exclude]
+        if exclude:
+            spec["$nor"] = exclude
+        return spec
+
+    async def count_matching(self, filters: Dict[str, Any], exclude_stages: Iterable[str] = (),
+                             exclude: Iterable[Dict[str, Any]] = ()) -> int:
+        return await self.collection.count_documents(self._spec(filters, exclude_stages, exclude))
+
+    async def prune(self, filters: Dict[str, Any], before: TimeBound = None, keep: Optional[int] = None,
+                    exclude_stages: Iterable[str] = (), exclude: Iterable[Dict[str, Any]] = ()) -> int:
+        spec = self._spec(filters, exclude_stages, exclude)
+        removed = 0
+        if before is not None:
+            cutoff = _bound(before)
+            aged = {"$or": [{"last_timestamp": {"$lt": cutoff}},
+                            {"last_timestamp": {"$exists": False}, "timestamp": {"$lt": cutoff}}]}
+            result = await self.collection.delete_many({**spec, **aged})
+            removed += result.deleted_count
+        if keep is not None:
+            excess = await self.collection.count_documents(spec) - keep
+            if excess > 0:
+                oldest = self.collection.find(spec, {"_id": 0, "id": 1}).sort("timestamp", 1).limit(excess)
+                ids = [doc["id"] async for doc in oldest]
+                result = await self.collection.delete_many({"id": {"$in": ids}})
+                removed += result.deleted_count
+        return removed
+
+
+class InMemoryStorage(MemoryStorageBackend):
+    """Process-local backend kept sorted by timestamp, for tests and benchmarks"""
+
+    name = "memory"
+    capabilities = StorageCapabilities(bulk_insert=True, max_batch_size=100000,
+                                       indexed_fields=("timestamp",), durable=False)
+
+    def __init__(self):
+        self.docs: List[Dict[str, Any]] = []
+        self._keys: List[str] = []
+        self._by_id: Dict[str, Dict[str, Any]] = {}
+
+    async def persist(self, doc: Dict[str, Any]):
+        key = doc.get("timestamp", "")
+        idx = bisect.bisect_right(self._keys, key)
+        self._keys.insert(idx, key)
+        stored = dict(doc)
+        self.docs.insert(idx, stored)
+        self._by_id[stored.get("id")] = stored
+
+    async def persist_many(self, docs: List[Dict[str, Any]]):
+        if not docs:
+            return
+        stored = [dict(doc) for doc in docs]
+        keys = [doc.get("timestamp", "") for doc in stored]
+        in_order = all(a <= b for a, b in zip(keys, keys[1:])) and (not self._keys or self._keys[-1] <= keys[0])
+        self.docs.extend(stored)
+        self._keys.extend(keys)
+        if not in_order:
+            # One stable sort (near-linear on mostly ordered input) instead of an insert per document
+            order = sorted(range(len(self.docs)), key=self._keys.__getitem__)
+            self.docs = [self.docs[i] for i in order]
+            self._keys = [self._keys[i] for i in order]
+        self._by_id.update((doc.get("id"), doc) for doc in stored)
+
+    async def delete_many(self, ids: List[str]):
+        doomed = set(ids)
+        if not doomed:
+            return
+        kept = [(key, doc) for key, doc in zip(self._keys, self.docs) if doc.get("id") not in doomed]
+        self._keys = [key for key, _ in kept]
+        self.docs = [doc for _, doc in kept]
+        for line_id in doomed:
+            self._by_id.pop(line_id, None)
+
+    async def update_many(self, updates: Dict[str, Dict[str, Any]]):
+        # Updated fields never include the timestamp, so the sort order holds
+        for line_id, fields in updates.items():
+            doc = self._by_id.get(line_id)
+            if doc is not None:
+                doc.update(fields)
+
+    async def query(self, start: TimeBound = None, end: TimeBound = None,
+                    filters: Optional[Dict[str, Any]] = None,
+                    limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        lo = bisect.bisect_left(self._keys, _bound(start)) if start is not None else 0
+        hi = bisect.bisect_left(self._keys, _bound(end)) if end is not None else len(self._keys)
+        results = []
+        for doc in self.docs[lo:hi]:
+            if _matches(doc, filters):
+                results.append(dict(doc))
+                if limit and len(results) >= limit:
+                    break
+        return results
+
+    async def restore_snapshot(self, docs: List[Dict[str, Any]]):
+        ordered = sorted(docs, key=lambda doc: doc.get("timestamp", ""))
+        self.docs = [dict(doc) for doc in ordered]
+        self._keys = [doc.get("timestamp", "") for doc in ordered]
+        self._by_id = {doc.get("id"): doc for doc in self.docs}
+
+    async def count(self) -> int:
+        return len(self.docs)
+
+    async def drop(self):
+        self.docs, self._keys, self._by_id = [], [], {}
+
+
+class SQLiteMemoryStorage(MemoryStorageBackend):
+    """SQLAlchemy/SQLite backend; blocking calls run in a worker thread"""
+
+    name = "sqlite"
+    capabilities = StorageCapabilities(bulk_insert=True, max_batch_size=500,
+                                       indexed_fields=("timestamp", "stage", "breath_cycle"))
+
+    COLUMNS = ("id", "timestamp", "stage", "state", "identity", "breath_cycle")
+
+    def __init__(self, path: str = "pandora_memory.db", table: str = "pandora_memory"):
+        from sqlalchemy import create_engine, MetaData, Table, Column, String, Integer, Text, Index
+
+        self.path = path
+        self._lock = threading.Lock()
+        self.engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+        self.metadata = MetaData()
+        self.table = Table(
+            table, self.metadata,
+            Column("id", String, primary_key=True),
+            Column("timestamp", String, nullable=False),
+            Column("stage", String),
+            Column("state", String),
+            Column("identity", String),
+            Column("breath_cycle", Integer),
+            Column("document", Text, nullable=False),
+            Index(f"ix_{table}_timestamp", "timestamp"),
+            Index(f"ix_{table}_stage_timestamp", "stage", "timestamp"),
+            Index(f"ix_{table}_breath_cycle", "breath_cycle"),
+        )
+        self.metadata.create_all(self.engine)
+
+    def _row(self, doc: Dict[str, Any]) -> Dict[str, Any]:
+        row = {column: doc.get(column) for column in self.COLUMNS}
+        row["timestamp"] = row["timestamp"] or ""
+        row["document"] = json.dumps(doc, default=str)
+        return row
+
+    async def _run(self, fn, *args):
+        def locked():
+            with self._lock:
+                return fn(*args)
+        return await asyncio.to_thread(locked)
+
+    def _insert(self, rows: List[Dict[str, Any]]):
+        with self.engine.begin() as conn:
+            for i in range(0, len(rows), self.capabilities.max_batch_size):
+                conn.execute(self.table.insert().prefix_with("OR REPLACE"), rows[i:i + self.capabilities.max_batch_size])
+
+    async def persist(self, doc: Dict[str, Any]):
+        await self._run(self._insert, [self._row(doc)])
+
+    async def persist_many(self, docs: List[Dict[str, Any]]):
+        if docs:
+            await self._run(self._insert, [self._row(doc) for doc in docs])
+
+    def _delete(self, ids: List[str]):
+        with self.engine.begin() as conn:
+            for i in range(0, len(ids), self.capabilities.max_batch_size):
+                conn.execute(self.table.delete().where(self.table.c.id.in_(ids[i:i + self.capabilities.max_batch_size])))
+
+    async def delete_many(self, ids: List[str]):
+        if ids:
+            await self._run(self._delete, list(ids))
+
+    def _update(self, updates: Dict[str, Dict[str, Any]]):
+        from sqlalchemy import bindparam, select
+
+        ids = list(updates)
+        with self.engine.begin() as conn:
+            for i in range(0, len(ids), self.capabilities.max_batch_size):
+                chunk = ids[i:i + self.capabilities.max_batch_size]
+                stored = conn.execute(select(self.table.c.document).where(self.table.c.id.in_(chunk)))
+                rows = []
+                for (document,) in stored:
+                    doc = json.loads(document)
+                    doc.update(updates[doc["id"]])
+                    rows.append({**self._row(doc), "line_id": doc["id"]})
+                if rows:
+                    stmt = self.table.update().where(self.table.c.id == bindparam("line_id"))
+                    conn.execute(stmt.values({column: bindparam(column) for column in self.COLUMNS[1:] + ("document",)}),
+                                 rows)
+
+    async def update_many(self, updates: Dict[str, Dict[str, Any]]):
+        if updates:
+            await self._run(self._update, updates)
+
+    def _select(self, start: Optional[str], end: Optional[str],
+                filters: Optional[Dict[str, Any]], limit: Optional[int]) -> List[Dict[str, Any]]:
+        from sqlalchemy import select
+
+        stmt = select(self.table.c.document)
+        if start is not None:
+            stmt = stmt.where(self.table.c.timestamp >= start)
+        if end is not None:
+            stmt = stmt.where(self.table.c.timestamp < end)
+        residual = {}
+        for key, value in (filters or {}).items():
+            if key in self.COLUMNS:
+                stmt = stmt.where(self.table.c[key] == value)
+            else:
+                residual[key] = value
+        stmt = stmt.order_by(self.table.c.timestamp)
+        if limit and not residual:
+            stmt = stmt.limit(limit)
+
+        results = []
+        with self.engine.connect() as conn:
+            for (document,) in conn.execute(stmt):
+                doc = json.loads(document)
+                if _matches(doc, residual):
+                    results.append(doc)
+                    if limit and len(results) >= limit:
+                        break
+        return results
+
+    async def query(self, start: TimeBound = None, end: TimeBound = None,
+                    filters: Optional[Dict[str, Any]] = None,
+                    limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        return await self._run(self._select, _bound(start), _bound(end), filters, limit)
+
+    def _replace(self, rows: List[Dict[str, Any]]):
+        with self.engine.begin() as conn:
+            conn.execute(self.table.delete())
+        self._insert(rows)
+
+    async def restore_snapshot(self, docs: List[Dict[str, Any]]):
+        await self._run(self._replace, [self._row(doc) for doc in docs])
+
+    def _count(self) -> int:
+        from sqlalchemy import select, func
+
+        with self.engine.connect() as conn:
+            return conn.execute(select(func.count()).select_from(self.table)).scalar_one()
+
+    async def count(self) -> int:
+        return await self._run(self._count)
+
+    async def drop(self):
+        await self._run(self.table.drop, self.engine)
+
+    async def close(self):
+        await asyncio.to_thread(self.engine.dispose)
+
+
+def create_storage_backend(kind: str, db=None, sqlite_path: Optional[str] = None,
+                           partition: Optional[str] = None) -> MemoryStorageBackend:
+    """Build a storage backend by name: mongo, memory or sqlite, optionally partitioned by day or month"""
+    if partition:
+        from .partitioned_storage import create_partitioned_backend
+        return create_partitioned_backend(kind, partition, db=db, sqlite_path=sqlite_path)
+    if kind == "mongo":
+        if db is None:
+            raise ValueError("Mongo storage requires a database handle (set MONGO_URL)")
+        return MongoMemoryStorage(db)
+    if kind == "memory":
+        return InMemoryStorage()
+    if kind == "sqlite":
+        return SQLiteMemoryStorage(sqlite_path or "pandora_memory.db")
+    raise ValueError(f"Unknown storage backend: {kind}")
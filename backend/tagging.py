@@ -0,0 +1,223 @@
+import re
+import time
+import asyncio
+import importlib
+import logging
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from functools import lru_cache, partial
+from typing import Awaitable, Callable, Deque, Dict, List, Any, Optional, Sequence, Tuple
+
+logger = logging.getLogger("pandora.tagging")
+
+Classifier = Callable[[List[str]], List[List[str]]]
+# Writes a batch of (record, tags) back; returns how many records changed
+TagSink = Callable[[List[Tuple[Any, List[str]]]], Awaitable[int]]
+
+# Word stems per tag, matched at word starts in the line's text. None of them
+# occurs in the boilerplate of breath lines ("Introspective traversal", "Memory
+# braid sync"), which keep the tags they were created with.
+DEFAULT_LEXICON: Dict[str, List[str]] = {
+    "ancestral": ["genesis", "origin", "zero", "tabula", "init", "bootstrap", "reel", "ancest", "lineage",
+                  "heritage", "history", "legacy", "root", "awaken", "first"],
+    "emotional": ["intent", "understand", "conscious", "aware", "feel", "emotion", "desire", "hope", "fear",
+                  "trust", "resilien", "reflect", "mirror", "observer"],
+    "symbolic": ["symbol", "chain", "hash", "loop", "recurs", "marshmallow", "q-", "∞", "infinit",
+                 "promise", "seal", "oracle"],
+}
+
+
+def record_text(record: Any) -> str:
+    """Classifier input for a memory line or its serialized form: stage, state, identity and memory"""
+    if isinstance(record, dict):
+        parts = [record.get("stage"), record.get("state"), record.get("identity"), *(record.get("memory") or [])]
+    else:
+        parts = [record.stage, record.state, record.identity, *record.memory]
+    return " ".join(str(part) for part in parts if part)
+
+
+def record_tags(record: Any) -> List[str]:
+    """Tags a memory line or its serialized form currently carries"""
+    if isinstance(record, dict):
+        return list(record.get("semantic_tags") or [])
+    return list(record.semantic_tags)
+
+
+def merge_tags(existing: Sequence[str], found: Sequence[str]) -> List[str]:
+    """Existing tags first, then classifier tags not already present; nothing is removed"""
+    merged = list(existing)
+    merged.extend(tag for tag in dict.fromkeys(str(tag) for tag in found) if tag not in merged)
+    return merged
+
+
+@lru_cache(maxsize=16)
+def _patterns(lexicon: Tuple[Tuple[str, Tuple[str, ...]], ...]) -> List[Tuple[str, "re.Pattern"]]:
+    return [
+        (tag, re.compile(r"(?<!\w)(?:" + "|".join(re.escape(stem.lower()) for stem in stems) + ")"))
+        for tag, stems in lexicon if stems
+    ]
+
+
+def _frozen(lexicon: Dict[str, Sequence[str]]) -> Tuple[Tuple[str, Tuple[str, ...]], ...]:
+    return tuple((tag, tuple(stems)) for tag, stems in lexicon.items())
+
+
+def keyword_classifier(texts: List[str], lexicon: Optional[Dict[str, Sequence[str]]] = None) -> List[List[str]]:
+    """Tag each text with every lexicon tag one of whose stems starts a word in it, in lexicon order"""
+    patterns = _patterns(_frozen(lexicon or DEFAULT_LEXICON))
+    return [[tag for tag, pattern in patterns if pattern.search(text.lower())] for text in texts]
+
+
+CLASSIFIERS: Dict[str, Classifier] = {"keywords": keyword_classifier}
+
+
+def resolve_classifier(name: str, options: Optional[Dict[str, Any]] = None) -> Classifier:
+    """A registered classifier, or any module-level function named as "package.module:function".
+
+    Classifiers run in worker processes (started with spawn), so they must be
+    importable and picklable: module-level functions taking a list of texts
+    (plus keyword options) and returning one tag list per text.
+    """
+    classifier = CLASSIFIERS.get(name)
+    if classifier is None:
+        module, _, attr = name.partition(":")
+        if not attr:
+            raise ValueError(f"Unknown classifier: {name}")
+        classifier = getattr(importlib.import_module(module), attr)
+    return partial(classifier, **options) if options else classifier
+
+
+@dataclass
+class TaggingConfig:
+    """Tagging section of this-then.yaml.
+
+        tagging:
+          classifier: keywords   # or "package.module:function"
+          options: {lexicon: {symbolic: [braid, chain]}}
+          interval: 0.5          # seconds between drains of newly appended lines
+          batch_size: 256        # lines per classifier call
+          workers: 2             # classifier processes; 0 classifies in a thread
+          max_pending: 10000     # queued lines beyond this are left with their creation tags
+
+    Classifier tags are added to the tags a line was created with, never
+    replacing them. Without the section (or with enabled: false), lines keep
+    their creation tags only.
+    """
+    enabled: bool = False
+    classifier: str = "keywords"
+    options: Dict[str, Any] = field(default_factory=dict)
+    interval: float = 0.5
+    batch_size: int = 256
+    workers: int = 2
+    max_pending: int = 10000
+
+    @classmethod
+    def from_config(cls, section: Optional[Dict[str, Any]]) -> "TaggingConfig":
+        if section is None:
+            return cls()
+        return cls(
+            enabled=bool(section.get("enabled", True)),
+            classifier=str(section.get("classifier", "keywords")),
+            options=dict(section.get("options") or {}),
+            interval=float(section.get("interval", 0.5)),
+            batch_size=max(1, int(section.get("batch_size", 256))),
+            workers=max(0, int(section.get("workers", 2))),
+            max_pending=max(1, int(section.get("max_pending", 10000))),
+        )
+
+
+class TaggingPipeline:
+    """Classifies memory lines in batches, off the request path and the writer.
+
+    Appending a line only queues it. Each drain (run by the scheduler every
+    `interval` seconds) takes the queue batch_size lines at a time, classifies
+    their text in a process pool and hands each line with its merged tags to
+    `sink`, which writes back the ones that changed. Classifying whole
+    batches amortizes the trip to the worker processes; the event loop only
+    ever waits on the result.
+    """
+
+    def __init__(self, config: TaggingConfig, sink: TagSink):
+        self.config = config
+        self.classify = resolve_classifier(config.classifier, config.options)
+        self.sink = sink
+        self._pending: Deque[Any] = deque()
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self.stats: Dict[str, Any] = {"tagged": 0, "changed": 0, "batches": 0, "dropped": 0, "errors": 0,
+                                      "last_batch_ms": 0.0, "last_retag": None}
+
+    def enqueue(self, line: Any):
+        if len(self._pending) >= self.config.max_pending:
+            self.stats["dropped"] += 1
+            return
+        self._pending.append(line)
+
+    async def _classify(self, texts: List[str]) -> List[List[str]]:
+        if self.config.workers == 0:
+            return await asyncio.to_thread(self.classify, texts)
+        if self._pool is None:
+            # spawn: forking would copy the event loop's threads and locks into the workers
+            self._pool = ProcessPoolExecutor(max_workers=self.config.workers,
+                                             mp_context=multiprocessing.get_context("spawn"))
+        return await asyncio.get_running_loop().run_in_executor(self._pool, self.classify, texts)
+
+    async def _tag(self, records: Sequence[Any], sink: TagSink) -> int:
+        tags = await self._classify([record_text(record) for record in records])
+        if len(tags) != len(records):
+            raise ValueError(f"Classifier returned {len(tags)} tag lists for {len(records)} lines")
+        return await sink([(record, merge_tags(record_tags(record), found)) for record, found in zip(records, tags)])
+
+    async def drain(self) -> int:
+        """Tag every queued line; returns the number of lines whose tags changed"""
+        changed = 0
+        while self._pending:
+            batch = [self._pending.popleft() for _ in range(min(self.config.batch_size, len(self._pending)))]
+            started = time.perf_counter()
+            try:
+                changed += await self._tag(batch, self.sink)
+            except Exception as e:
+                self.stats["errors"] += 1
+                logger.error(f"Error tagging {len(batch)} lines: {e}")
+                continue
+            self.stats["tagged"] += len(batch)
+            self.stats["batches"] += 1
+            self.stats["last_batch_ms"] = round((time.perf_counter() - started) * 1000, 3)
+        self.stats["changed"] += changed
+        return changed
+
+    async def retag(self, records: Sequence[Any], sink: Optional[TagSink] = None,
+                    batch_size: Optional[int] = None) -> Dict[str, Any]:
+        """Classify `records` again in batches, one batch in flight per worker; reports throughput"""
+        size = max(1, batch_size or self.config.batch_size)
+        limit = asyncio.Semaphore(max(1, self.config.workers))
+        started = time.perf_counter()
+
+        async def one(start: int) -> int:
+            async with limit:
+                return await self._tag(records[start:start + size], sink or self.sink)
+
+        changed = sum(await asyncio.gather(*(one(start) for start in range(0, len(records), size))))
+        elapsed = time.perf_counter() - started
+        return {
+            "lines": len(records),
+            "changed": changed,
+            "batches": -(-len(records) // size),
+            "elapsed_ms": round(elapsed * 1000, 3),
+            "lines_per_s": round(len(records) / elapsed, 1) if elapsed else None
+        }
+
+    async def close(self):
+        pool, self._pool = self._pool, None
+        if pool is not None:
+            await asyncio.to_thread(pool.shutdown)
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "classifier": self.config.classifier,
+            "workers": self.config.workers,
+            "batch_size": self.config.batch_size,
+            "pending": len(self._pending),
+            **self.stats
+        }
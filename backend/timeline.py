@@ -0,0 +1,203 @@
+import bisect
+import math
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Dict, List, Any, Iterable, Optional, Union
+
+RESOLUTIONS = {"minute": 60, "hour": 3600, "day": 86400}
+DIMENSIONS = ("stage", "tag", "identity")
+# Buckets kept per resolution; None keeps everything
+DEFAULT_RETENTION = {"minute": 2 * 24 * 60, "hour": 90 * 24, "day": None}
+
+Timestamp = Union[datetime, str, float, int]
+
+
+def _epoch(value: Timestamp) -> float:
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+def _iso(epoch: int) -> str:
+    return datetime.fromtimestamp(epoch, tz=timezone.utc).isoformat()
+
+
+class _Bucket:
+    __slots__ = ("total", "stage", "tag", "identity")
+
+    def __init__(self):
+        self.total = 0
+        self.stage: Counter = Counter()
+        self.tag: Counter = Counter()
+        self.identity: Counter = Counter()
+
+    def add(self, stage: str, tags: Iterable[str], identity: str, count: int):
+        self.total += count
+        self.stage[stage] += count
+        self.identity[identity] += count
+        for tag in tags:
+            self.tag[tag] += count
+
+
+class TimelineRollup:
+    """Per-minute/hour/day activity counters maintained as lines are appended.
+
+    Each resolution keeps a dict of buckets plus a sorted list of bucket
+    starts, so a range query touches only the buckets it returns, however
+    long the history is.
+    """
+
+    def __init__(self, retention: Optional[Dict[str, Optional[int]]] = None):
+        self.retention = {**DEFAULT_RETENTION, **(retention or {})}
+        self.clear()
+
+    def clear(self):
+        self._buckets: Dict[str, Dict[int, _Bucket]] = {name: {} for name in RESOLUTIONS}
+        self._keys: Dict[str, List[int]] = {name: [] for name in RESOLUTIONS}
+        self.lines = 0
+
+    def _bucket(self, resolution: str, start: int) -> _Bucket:
+        buckets = self._buckets[resolution]
+        bucket = buckets.get(start)
+        if bucket is None:
+            bucket = buckets[start] = _Bucket()
+            keys = self._keys[resolution]
+            if not keys or start > keys[-1]:
+                keys.append(start)
+            else:
+                bisect.insort(keys, start)
+            self._prune(resolution)
+        return bucket
+
+    def _prune(self, resolution: str):
+        keep = self.retention.get(resolution)
+        keys = self._keys[resolution]
+        if keep is None or len(keys) <= keep:
+            return
+        cutoff = keys[-1] - keep * RESOLUTIONS[resolution]
+        drop = bisect.bisect_right(keys, cutoff)
+        for start in keys[:drop]:
+            del self._buckets[resolution][start]
+        del keys[:drop]
+
+    def add(self, timestamp: Timestamp, stage: str, tags: Iterable[str], identity: str, count: int = 1):
+        epoch = _epoch(timestamp)
+        tags = list(tags or [])
+        for resolution, width in RESOLUTIONS.items():
+            self._bucket(resolution, int(epoch // width) * width).add(stage, tags, identity, count)
+        self.lines += count
+
+    @staticmethod
+    def _spread(doc: Dict[str, Any]) -> List[float]:
+        """Epoch of each logical line of a serialized line; runs without per-line offsets are spread over their span"""
+        run_length = int(doc.get("run_length") or 1)
+        if doc.get("record_type") != "breath_run" or run_length <= 1:
+            return [_epoch(doc["timestamp"])]
+        first, last = _epoch(doc["timestamp"]), _epoch(doc.get("last_timestamp") or doc["timestamp"])
+        offsets = doc.get("line_offsets") or []
+        if len(offsets) == run_length:
+            return [first + offset / 1e6 for offset in offsets]
+        step = (last - first) / (run_length - 1)
+        return [first + step * offset for offset in range(run_length)]
+
+    def add_doc(self, doc: Dict[str, Any]):
+        """Count a serialized memory line"""
+        stage, tags, identity = doc.get("stage", ""), doc.get("semantic_tags") or [], doc.get("identity", "")
+        for epoch in self._spread(doc):
+            self.add(epoch, stage, tags, identity)
+
+    def add_line(self, line):
+        if getattr(line, "record_type", None):
+            self.add_doc(line.to_dict())
+        else:
+            self.add(line.timestamp, line.stage, line.semantic_tags, line.identity)
+
+    def retag_doc(self, doc: Dict[str, Any], old_tags: Iterable[str], new_tags: Iterable[str]):
+        """Move a counted line from its old tags to new ones; buckets already expired are left alone"""
+        old_tags, new_tags = list(old_tags or []), list(new_tags or [])
+        for epoch in self._spread(doc):
+            for resolution, width in RESOLUTIONS.items():
+                bucket = self._buckets[resolution].get(int(epoch // width) * width)
+                if bucket is None:
+                    continue
+                for tag in old_tags:
+                    bucket.tag[tag] -= 1
+                    if bucket.tag[tag] <= 0:
+                        del bucket.tag[tag]
+                for tag in new_tags:
+                    bucket.tag[tag] += 1
+
+    def retag_line(self, line, old_tags: Iterable[str]):
+        """Recount a line whose semantic_tags were just rewritten, given the tags it was counted under"""
+        doc = line.to_dict() if getattr(line, "record_type", None) else {"timestamp": line.timestamp}
+        self.retag_doc(doc, old_tags, line.semantic_tags)
+
+    def add_lines(self, lines: Iterable):
+        for line in lines:
+            self.add_line(line)
+
+    def _pick_resolution(self, start: Optional[float], end: Optional[float], max_points: int) -> str:
+        for resolution, width in RESOLUTIONS.items():
+            keys = self._keys[resolution]
+            if not keys:
+                continue
+            lo = start if start is not None else keys[0]
+            hi = end if end is not None else keys[-1] + width
+            # The resolution must still hold the start of the range and fit within max_points
+            covers = self.retention.get(resolution) is None or lo >= keys[0]
+            if covers and (hi - lo) / width <= max_points:
+                return resolution
+        return "day"
+
+    def series(self, dimension: str = "stage", resolution: str = "auto",
+               start: Optional[Timestamp] = None, end: Optional[Timestamp] = None,
+               max_points: int = 200) -> Dict[str, Any]:
+        """Buckets in [start, end), merged so at most max_points are returned (empty buckets omitted)"""
+        if dimension not in DIMENSIONS + ("total",):
+            raise ValueError(f"Unknown timeline dimension: {dimension}")
+        if resolution != "auto" and resolution not in RESOLUTIONS:
+            raise ValueError(f"Unknown timeline resolution: {resolution}")
+        max_points = max(1, max_points)
+        lo = _epoch(start) if start is not None else None
+        hi = _epoch(end) if end is not None else None
+        if resolution == "auto":
+            resolution = self._pick_resolution(lo, hi, max_points)
+        width = RESOLUTIONS[resolution]
+        keys = self._keys[resolution]
+        first = bisect.bisect_left(keys, int(lo // width) * width) if lo is not None else 0
+        last = bisect.bisect_left(keys, hi) if hi is not None else len(keys)
+        selected = keys[first:last]
+
+        factor = 1
+        if selected:
+            span_buckets = (selected[-1] - selected[0]) // width + 1
+            factor = max(1, math.ceil(span_buckets / max_points))
+        group_width = width * factor
+
+        points: List[Dict[str, Any]] = []
+        for key in selected:
+            bucket = self._buckets[resolution][key]
+            group = key // group_width * group_width
+            if not points or points[-1]["epoch"] != group:
+                points.append({"epoch": group, "total": 0, "counts": Counter()})
+            point = points[-1]
+            point["total"] += bucket.total
+            if dimension != "total":
+                point["counts"].update(getattr(bucket, dimension))
+        return {
+            "resolution": resolution,
+            "dimension": dimension,
+            "bucket_seconds": group_width,
+            "downsample_factor": factor,
+            "points": [
+                {"t": _iso(point["epoch"]), "total": point["total"], **({"counts": dict(point["counts"])} if dimension != "total" else {})}
+                for point in points
+            ]
+        }
+
+    def metrics(self) -> Dict[str, Any]:
+        return {"lines": self.lines, "buckets": {name: len(keys) for name, keys in self._keys.items()}}
@@ -0,0 +1,133 @@
+import time
+import asyncio
+import logging
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+logger = logging.getLogger("pandora.writer")
+
+Mutation = Callable[[], Any]
+
+
+class WriterOverloaded(Exception):
+    """Raised when the mutation queue is full; callers should back off and retry"""
+
+    def __init__(self, depth: int):
+        super().__init__(f"Engine writer queue full ({depth} pending mutations)")
+        self.depth = depth
+
+
+class EngineWriter:
+    """Single-writer actor: every engine mutation runs here, one batch at a time.
+
+    Mutations are plain synchronous callables, so a batch is applied without
+    yielding to the event loop. Side effects that need I/O (persistence, cache
+    write-through, view publication) run once per batch in `on_batch`.
+
+    Normal submissions go through a bounded queue and are rejected immediately
+    when it is full. Priority submissions (the breath loop, compaction, restore)
+    use a separate lane that is always admitted and always drained first, so
+    a burst of requests cannot starve the breath loop.
+    """
+
+    def __init__(self, on_batch: Callable[[], Awaitable[None]], max_depth: int = 256, batch_size: int = 64):
+        self.on_batch = on_batch
+        self.max_depth = max_depth
+        self.batch_size = batch_size
+        self._queue: Deque[Tuple[Mutation, asyncio.Future]] = deque()
+        self._priority: Deque[Tuple[Mutation, asyncio.Future]] = deque()
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self.stats = {"applied": 0, "rejected": 0, "batches": 0, "max_batch": 0, "last_batch_ms": 0.0}
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    @property
+    def depth(self) -> int:
+        return len(self._queue) + len(self._priority)
+
+    def start(self):
+        if not self.running:
+            # An event is bound to the loop it was first awaited on; a restart may be on another loop
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """Drain what is already queued, then stop the writer task"""
+        if not self.running:
+            return
+        task, self._task = self._task, None
+        self._wakeup.set()
+        await task
+
+    def ensure_capacity(self):
+        """Fail fast before doing expensive work whose result would be rejected anyway"""
+        if self.running and len(self._queue) >= self.max_depth:
+            self.stats["rejected"] += 1
+            raise WriterOverloaded(len(self._queue))
+
+    async def submit(self, mutation: Mutation, priority: bool = False) -> Any:
+        """Queue a mutation and wait for its result.
+
+        Without a running writer task the mutation is applied inline, which keeps
+        the engine usable from scripts and tools that never start the runtime.
+        """
+        if not self.running:
+            result = mutation()
+            await self.on_batch()
+            return result
+        if not priority:
+            self.ensure_capacity()
+        future = asyncio.get_running_loop().create_future()
+        (self._priority if priority else self._queue).append((mutation, future))
+        self._wakeup.set()
+        return await future
+
+    def _next_batch(self) -> List[Tuple[Mutation, asyncio.Future]]:
+        batch = []
+        while len(batch) < self.batch_size and (self._priority or self._queue):
+            batch.append((self._priority or self._queue).popleft())
+        return batch
+
+    async def _run(self):
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            while self._priority or self._queue:
+                batch = self._next_batch()
+                started = time.perf_counter()
+                results = []
+                for mutation, future in batch:
+                    try:
+                        results.append((future, mutation(), None))
+                    except Exception as e:
+                        logger.error(f"Engine mutation failed: {e}")
+                        results.append((future, None, e))
+                try:
+                    await self.on_batch()
+                except Exception as e:
+                    logger.error(f"Error flushing writer batch: {e}")
+                for future, result, error in results:
+                    if future.done():
+                        continue
+                    if error is not None:
+                        future.set_exception(error)
+                    else:
+                        future.set_result(result)
+                self.stats["applied"] += len(batch)
+                self.stats["batches"] += 1
+                self.stats["max_batch"] = max(self.stats["max_batch"], len(batch))
+                self.stats["last_batch_ms"] = round((time.perf_counter() - started) * 1000, 3)
+            if self._task is None:
+                return
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "running": self.running,
+            "depth": self.depth,
+            "max_depth": self.max_depth,
+            "batch_size": self.batch_size,
+            **self.stats
+        }
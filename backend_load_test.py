@@ -0,0 +1,283 @@
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List
+
+import httpx
+
+DEFAULT_MIX = "promise=1,query=1,memory=4,status=4"
+
+# Request templates for each endpoint in the mix
+REQUEST_SPECS = {
+    "promise": ("POST", "pandora/promise", lambda: {"data": {"load": "test", "ts": time.time()}, "chain_type": "promise_then_this"}),
+    "query": ("POST", "pandora/query", lambda: {"query": f"load_{random.randint(0, 999)}", "action": "introspect"}),
+    "memory": ("GET", "pandora/memory", None),
+    "status": ("GET", "pandora/status", None),
+}
+
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    """Parse a mix like 'promise=1,memory=4' into endpoint weights"""
+    mix = {}
+    for part in spec.split(","):
+        if not part.strip():
+            continue
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in REQUEST_SPECS:
+            raise ValueError(f"Unknown endpoint in mix: {name}")
+        mix[name] = float(weight) if weight else 1.0
+    if not mix or sum(mix.values()) <= 0:
+        raise ValueError("Request mix must have a positive total weight")
+    return mix
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile over an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = min(len(sorted_values) - 1, max(0, math.ceil(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+@dataclass
+class EndpointStats:
+    latencies: List[float] = field(default_factory=list)
+    errors: int = 0
+    shed: int = 0
+    status_codes: Dict[int, int] = field(default_factory=dict)
+
+    def summary(self, elapsed: float) -> Dict[str, float]:
+        values = sorted(self.latencies)
+        total = len(values)
+        attempted = total + self.shed
+        return {
+            "requests": total,
+            "shed": self.shed,
+            "throughput_rps": round(total / elapsed, 2) if elapsed > 0 else 0.0,
+            "error_rate": round((self.errors + self.shed) / attempted, 4) if attempted else 0.0,
+            "p50_ms": round(percentile(values, 50) * 1000, 2),
+            "p95_ms": round(percentile(values, 95) * 1000, 2),
+            "p99_ms": round(percentile(values, 99) * 1000, 2),
+            "max_ms": round(values[-1] * 1000, 2) if values else 0.0,
+            "status_codes": dict(sorted(self.status_codes.items())),
+        }
+
+
+class PandoraLoadTester:
+    def __init__(self, base_url: str, mix: Dict[str, float], timeout: float = 10.0):
+        self.base_url = base_url.rstrip("/")
+        self.names = list(mix)
+        self.weights = [mix[name] for name in self.names]
+        self.timeout = timeout
+        self.stats: Dict[str, EndpointStats] = {name: EndpointStats() for name in self.names}
+        self.breath_samples: List[Dict[str, float]] = []
+        self.in_flight = 0
+
+    async def _issue(self, client: httpx.AsyncClient, name: str):
+        """Send one request and record its latency and outcome"""
+        method, endpoint, body = REQUEST_SPECS[name]
+        stats = self.stats[name]
+        self.in_flight += 1
+        start = time.perf_counter()
+        try:
+            response = await client.request(method, f"{self.base_url}/api/{endpoint}", json=body() if body else None)
+            stats.status_codes[response.status_code] = stats.status_codes.get(response.status_code, 0) + 1
+            if response.status_code >= 400:
+                stats.errors += 1
+        except httpx.HTTPError:
+            stats.status_codes[0] = stats.status_codes.get(0, 0) + 1
+            stats.errors += 1
+        finally:
+            stats.latencies.append(time.perf_counter() - start)
+            self.in_flight -= 1
+
+    def _pick(self) -> str:
+        return random.choices(self.names, weights=self.weights)[0]
+
+    async def _closed_loop(self, client: httpx.AsyncClient, deadline: float, concurrency: int):
+        """Each worker sends its next request as soon as the previous one completes"""
+        async def worker():
+            while time.perf_counter() < deadline:
+                await self._issue(client, self._pick())
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+    async def _open_loop(self, client: httpx.AsyncClient, deadline: float, rate: float, max_in_flight: int):
+        """Send requests on a fixed arrival schedule regardless of response times"""
+        pending = set()
+        interval = 1.0 / rate
+        next_at = time.perf_counter()
+        while next_at < deadline:
+            delay = next_at - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            name = self._pick()
+            if self.in_flight >= max_in_flight:
+                # Shed arrivals count against the error rate so a saturated server is visible
+                self.stats[name].shed += 1
+            else:
+                task = asyncio.create_task(self._issue(client, name))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+            next_at += interval
+        if pending:
+            await asyncio.gather(*pending)
+
+    async def _sample_breath(self, client: httpx.AsyncClient, stop: asyncio.Event, interval: float):
+        """Poll runtime status on a side connection to observe breath-loop lag"""
+        while not stop.is_set():
+            try:
+                response = await client.get(f"{self.base_url}/api/pandora/status")
+                status = response.json()
+                lag = status.get("breath_lag", {})
+                self.breath_samples.append({
+                    "at": time.perf_counter(),
+                    "breath_cycle": status.get("breath_cycle", 0),
+                    "last_ms": lag.get("last_ms", 0.0),
+                    "max_ms": lag.get("max_ms", 0.0),
+                })
+            except (httpx.HTTPError, ValueError):
+                pass
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def run(self, mode: str, duration: float, concurrency: int, rate: float, sample_interval: float) -> Dict:
+        limits = httpx.Limits(max_connections=max(concurrency, 1) * 2, max_keepalive_connections=max(concurrency, 1))
+        async with httpx.AsyncClient(timeout=self.timeout, limits=limits) as client, \
+                httpx.AsyncClient(timeout=self.timeout) as sampler_client:
+            stop = asyncio.Event()
+            sampler = asyncio.create_task(self._sample_breath(sampler_client, stop, sample_interval))
+            start = time.perf_counter()
+            deadline = start + duration
+            if mode == "open":
+                await self._open_loop(client, deadline, rate, concurrency)
+            else:
+                await self._closed_loop(client, deadline, concurrency)
+            elapsed = time.perf_counter() - start
+            stop.set()
+            await sampler
+        return self.report(mode, elapsed)
+
+    def report(self, mode: str, elapsed: float) -> Dict:
+        overall = EndpointStats()
+        for stats in self.stats.values():
+            overall.latencies.extend(stats.latencies)
+            overall.errors += stats.errors
+            overall.shed += stats.shed
+            for code, count in stats.status_codes.items():
+                overall.status_codes[code] = overall.status_codes.get(code, 0) + count
+
+        breath = {"samples": len(self.breath_samples)}
+        if self.breath_samples:
+            first, last = self.breath_samples[0], self.breath_samples[-1]
+            breath.update({
+                "cycles_advanced": last["breath_cycle"] - first["breath_cycle"],
+                "observed_window_s": round(last["at"] - first["at"], 2),
+                "max_last_lag_ms": max(sample["last_ms"] for sample in self.breath_samples),
+                "server_max_lag_ms": last["max_ms"],
+            })
+        return {
+            "mode": mode,
+            "elapsed_s": round(elapsed, 2),
+            "overall": overall.summary(elapsed),
+            "endpoints": {name: stats.summary(elapsed) for name, stats in self.stats.items()},
+            "breath_loop": breath,
+        }
+
+
+def print_report(report: Dict):
+    print("\n" + "=" * 60)
+    print(f"📊 PANDORA 5o LOAD TEST ({report['mode']}-loop, {report['elapsed_s']}s)")
+    print("=" * 60)
+    header = f"{'endpoint':<10}{'reqs':>8}{'rps':>9}{'err%':>8}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}"
+    print(header)
+    rows = list(report["endpoints"].items()) + [("overall", report["overall"])]
+    for name, s in rows:
+        print(f"{name:<10}{s['requests']:>8}{s['throughput_rps']:>9}{s['error_rate'] * 100:>7.2f}%"
+              f"{s['p50_ms']:>9}{s['p95_ms']:>9}{s['p99_ms']:>9}{s['max_ms']:>9}")
+    print("-" * 60)
+    breath = report["breath_loop"]
+    if breath["samples"]:
+        print(f"Breath loop: {breath['cycles_advanced']} cycles in {breath['observed_window_s']}s, "
+              f"max observed lag {breath['max_last_lag_ms']}ms (server max {breath['server_max_lag_ms']}ms)")
+    else:
+        print("Breath loop: no status samples collected")
+    print("=" * 60)
+
+
+async def wait_until_ready(base_url: str, timeout: float = 30.0):
+    """Poll the API root until a spawned server responds"""
+    deadline = time.perf_counter() + timeout
+    async with httpx.AsyncClient(timeout=2.0) as client:
+        while time.perf_counter() < deadline:
+            try:
+                response = await client.get(f"{base_url}/api/")
+                if response.status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.25)
+    raise RuntimeError(f"Server at {base_url} did not become ready within {timeout}s")
+
+
+def spawn_server(port: int) -> subprocess.Popen:
+    """Start a local uvicorn instance serving backend.server:app"""
+    root = os.path.dirname(os.path.abspath(__file__))
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "backend.server:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=root,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent load generator for the Pandora 5o API")
+    parser.add_argument("--base-url", default=None, help="Target server (default: spawn a local uvicorn)")
+    parser.add_argument("--port", type=int, default=8011, help="Port for the spawned uvicorn instance")
+    parser.add_argument("--mode", choices=["closed", "open"], default="closed")
+    parser.add_argument("--duration", type=float, default=30.0, help="Run length in seconds")
+    parser.add_argument("--concurrency", type=int, default=16, help="Closed-loop workers / open-loop in-flight cap")
+    parser.add_argument("--rate", type=float, default=50.0, help="Open-loop arrival rate (requests per second)")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"Weighted request mix (default: {DEFAULT_MIX})")
+    parser.add_argument("--sample-interval", type=float, default=1.0, help="Seconds between breath-lag samples")
+    parser.add_argument("--timeout", type=float, default=10.0, help="Per-request timeout in seconds")
+    parser.add_argument("--json", dest="json_path", default=None, help="Also write the report to this JSON file")
+    args = parser.parse_args()
+
+    mix = parse_mix(args.mix)
+    server = None
+    base_url = args.base_url
+    if base_url is None:
+        base_url = f"http://127.0.0.1:{args.port}"
+        server = spawn_server(args.port)
+
+    try:
+        if server is not None:
+            asyncio.run(wait_until_ready(base_url))
+        tester = PandoraLoadTester(base_url, mix, timeout=args.timeout)
+        report = asyncio.run(tester.run(args.mode, args.duration, args.concurrency, args.rate, args.sample_interval))
+    finally:
+        if server is not None:
+            server.terminate()
+            try:
+                server.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                server.kill()
+
+    print_report(report)
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(report, f, indent=2)
+    return 0 if report["overall"]["error_rate"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
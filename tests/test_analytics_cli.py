@@ -0,0 +1,64 @@
+import io
+import json
+
+import pandas as pd
+from typer.testing import CliRunner
+
+from backend.analytics_cli import _scan_file, app
+
+
+def _line(timestamp, stage="breath", tags=("ancestral",)):
+    return {"id": f"{stage}-{timestamp}", "timestamp": f"2026-01-01T{timestamp}+00:00", "stage": stage,
+            "semantic_tags": list(tags)}
+
+
+RUN = {"id": "run", "record_type": "breath_run", "stage": "breath", "semantic_tags": ["ancestral"],
+       "timestamp": "2026-01-01T11:00:00+00:00", "last_timestamp": "2026-01-01T11:00:20+00:00",
+       "run_length": 3, "line_offsets": [0, 10_000_000, 20_000_000]}
+
+
+def _shards(tmp_path):
+    first = [_line("10:00:00"), _line("10:00:05"), _line("10:30:00", "introspection", ["symbolic", "emotional"]), RUN]
+    second = [_line("11:15:00", "promise_chain", []), _line("12:00:00")]
+    paths = []
+    for name, lines in (("a.ndjson", first), ("b.ndjson", second)):
+        path = tmp_path / name
+        path.write_text("".join(json.dumps(line) + "\n" for line in lines))
+        paths.append(str(path))
+    return paths
+
+
+def _invoke(*args):
+    result = CliRunner().invoke(app, [*args, "--workers", "1"])
+    assert result.exit_code == 0, result.output
+    return result
+
+
+def test_stage_counts_per_hour(tmp_path):
+    output = tmp_path / "stages.json"
+    _invoke("stage-counts", *_shards(tmp_path), "--freq", "h", "-o", str(output))
+    rows = [(row["bucket"][11:16], row["stage"], row["count"]) for row in json.loads(output.read_text())]
+    assert rows == [("10:00", "breath", 2), ("10:00", "introspection", 1),
+                    ("11:00", "breath", 3), ("11:00", "promise_chain", 1), ("12:00", "breath", 1)]
+
+
+def test_tag_distribution_counts_every_line_of_a_run(tmp_path):
+    output = tmp_path / "tags.csv"
+    _invoke("tag-distribution", *_shards(tmp_path), "-o", str(output))
+    frame = pd.read_csv(output)
+    assert dict(zip(frame["tag"], frame["count"])) == {"ancestral": 6, "emotional": 1, "symbolic": 1}
+    assert frame["bucket"].str.startswith("2026-01-01").all()
+
+
+def test_breath_gaps_include_run_offsets(tmp_path):
+    result = _invoke("breath-gaps", *_shards(tmp_path), "--min-gap", "10")
+    frame = pd.read_csv(io.StringIO(result.stdout))
+    assert list(frame["gap_seconds"]) == [3595.0, 3580.0]
+    assert list(frame["gap_end"].str[11:19]) == ["11:00:00", "12:00:00"]
+
+
+def test_chunked_scan_matches_a_single_chunk(tmp_path):
+    path = _shards(tmp_path)[0]
+    whole = _scan_file(path, "stages", "h")
+    chunked = _scan_file(path, "stages", "h", chunk_size=1)
+    assert chunked.to_dict() == whole.to_dict() and whole.sum() == 6
@@ -0,0 +1,70 @@
+import asyncio
+
+import fakeredis
+import fakeredis.aioredis
+
+from backend.cache import RedisHotCache
+
+
+def _cache(server=None, **kwargs) -> RedisHotCache:
+    return RedisHotCache(fakeredis.aioredis.FakeRedis(server=server, decode_responses=True), **kwargs)
+
+
+def test_push_and_read_recent_lines_oldest_first():
+    async def run():
+        cache = _cache(max_lines=3)
+        await cache.push_lines([{"id": "a"}, {"id": "b"}], total_lines=2)
+        await cache.push_lines([{"id": "c"}, {"id": "d"}], total_lines=4)
+        recent = await cache.get_recent_lines(10)
+        await cache.close()
+        return recent
+
+    recent = asyncio.run(run())
+    assert recent["total_memory_lines"] == 4
+    assert [line["id"] for line in recent["memory_lines"]] == ["b", "c", "d"]
+
+
+def test_invalidate_hides_previous_entries():
+    async def run():
+        cache = _cache()
+        await cache.push_lines([{"id": "a"}], total_lines=1)
+        await cache.set_status({"breath_cycle": 1})
+        await cache.invalidate()
+        missed = await cache.get_recent_lines(10), await cache.get_status()
+        await cache.push_lines([{"id": "b"}], total_lines=1)
+        recent = await cache.get_recent_lines(10)
+        await cache.close()
+        return missed, recent
+
+    missed, recent = asyncio.run(run())
+    assert missed == (None, None)
+    assert [line["id"] for line in recent["memory_lines"]] == ["b"]
+
+
+def test_write_racing_invalidate_lands_in_new_version():
+    server = fakeredis.FakeServer()
+    cache = _cache(server=server)
+    other = fakeredis.FakeRedis(server=server, decode_responses=True)
+    keys = cache._keys
+    calls = []
+
+    def racing_keys(version):
+        # Another replica invalidates between the version read and the writes
+        if not calls:
+            other.incr(cache.version_key)
+        calls.append(version)
+        return keys(version)
+
+    cache._keys = racing_keys
+
+    async def run():
+        await cache.push_lines([{"id": "a"}], total_lines=1)
+        cache._keys = keys
+        recent = await cache.get_recent_lines(10)
+        await cache.close()
+        return recent
+
+    recent = asyncio.run(run())
+    assert calls == [0, 1]
+    assert [line["id"] for line in recent["memory_lines"]] == ["a"]
+    assert not other.exists("pandora:v0:lines")
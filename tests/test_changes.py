@@ -0,0 +1,81 @@
+import asyncio
+import time
+
+from backend.clock import SimulatedClock, SimulatedScheduler
+from backend.pandora_engine import PandoraMemoryEngine
+from backend.storage import InMemoryStorage
+
+
+def _engine(tmp_path) -> PandoraMemoryEngine:
+    engine = PandoraMemoryEngine(storage=InMemoryStorage(), data_dir=tmp_path,
+                                 scheduler=SimulatedScheduler(SimulatedClock()))
+    engine.snapshot_mirror = None
+    return engine
+
+
+def _seqs(delta):
+    return [row[0] for row in delta["lines"]["rows"]] + [seq for seq, _ in delta["items"]]
+
+
+def test_cursor_pages_through_every_change_once(tmp_path):
+    async def run():
+        engine = _engine(tmp_path)
+        await engine.start_runtime()
+        await engine.fast_forward(30 * engine.breath_interval)
+        await engine.compact_memory()
+        everything = engine.changes_since(0, limit=10000)
+        pages, since = [], 0
+        while True:
+            delta = engine.changes_since(since, limit=7)
+            pages.append(_seqs(delta))
+            since = delta["next_since"]
+            if not delta["has_more"]:
+                break
+        await engine.stop_runtime()
+        return everything, pages, since, engine.seq
+
+    everything, pages, since, head = asyncio.run(run())
+    assert all(len(page) <= 7 for page in pages) and len(pages) > 1
+    seqs = [seq for page in pages for seq in page]
+    assert seqs == sorted(set(seqs))
+    assert seqs == sorted(_seqs(everything)) and since == head == everything["head_seq"]
+
+
+def test_long_poll_returns_when_a_line_is_written(tmp_path):
+    async def run():
+        engine = _engine(tmp_path)
+        await engine.start_runtime()
+        await engine.fast_forward(engine.breath_interval)
+        since = engine.seq
+        waiter = asyncio.create_task(engine.wait_for_changes(since, timeout=10.0))
+        await asyncio.sleep(0)
+        started = time.monotonic()
+        await engine.fast_forward(engine.breath_interval)
+        await asyncio.wait_for(waiter, timeout=2.0)
+        elapsed = time.monotonic() - started
+        delta = engine.changes_since(since)
+        await engine.stop_runtime()
+        return elapsed, delta, since
+
+    elapsed, delta, since = asyncio.run(run())
+    assert elapsed < 2.0
+    assert delta["lines"]["rows"] and all(seq > since for seq in _seqs(delta))
+
+
+def test_long_poll_times_out_without_changes(tmp_path):
+    async def run():
+        engine = _engine(tmp_path)
+        await engine.start_runtime()
+        await engine.fast_forward(engine.breath_interval)
+        since = engine.seq
+        started = time.monotonic()
+        await engine.wait_for_changes(since, timeout=0.1)
+        elapsed = time.monotonic() - started
+        delta = engine.changes_since(since)
+        await engine.stop_runtime()
+        return elapsed, delta, since
+
+    elapsed, delta, since = asyncio.run(run())
+    assert 0.09 <= elapsed < 2.0
+    assert delta["lines"]["rows"] == [] and delta["items"] == []
+    assert delta["next_since"] == since and not delta["has_more"]
@@ -0,0 +1,81 @@
+import asyncio
+
+import pytest
+
+from backend.clock import SimulatedClock, SimulatedScheduler
+from backend.pandora_engine import PandoraMemoryEngine
+from backend.storage import InMemoryStorage
+
+
+def test_simulated_scheduler_is_manual_by_default():
+    async def run():
+        scheduler = SimulatedScheduler(SimulatedClock())
+        runs = []
+
+        async def tick():
+            runs.append(scheduler.clock.monotonic())
+
+        scheduler.every("tick", 2.0, tick, first_delay=1.0)
+        scheduler.start()
+        await asyncio.sleep(0.01)
+        idle = list(runs)
+        ran = await scheduler.advance(6.0)
+        await scheduler.stop()
+        return idle, ran, runs, scheduler.clock.monotonic()
+
+    idle, ran, runs, elapsed = asyncio.run(run())
+    assert idle == []
+    assert ran == 3 and runs == [1.0, 3.0, 5.0]
+    assert elapsed == 6.0
+
+
+def test_concurrent_advances_take_turns():
+    async def run():
+        scheduler = SimulatedScheduler(SimulatedClock())
+        runs = []
+
+        async def tick():
+            runs.append(scheduler.clock.monotonic())
+            await asyncio.sleep(0)
+
+        scheduler.every("tick", 1.0, tick)
+        scheduler.start()
+        await asyncio.gather(scheduler.advance(3.5), scheduler.advance(3.5))
+        await scheduler.stop()
+        return runs
+
+    assert asyncio.run(run()) == [0.0, 1.0, 2.0, 3.0, 4.0, 5.0, 6.0, 7.0]
+
+
+def test_autorun_free_runs_and_refuses_manual_advance():
+    async def run():
+        scheduler = SimulatedScheduler(SimulatedClock(), autorun=True)
+
+        async def tick():
+            pass
+
+        scheduler.every("tick", 1.0, tick)
+        scheduler.start()
+        await asyncio.sleep(0.01)
+        with pytest.raises(RuntimeError):
+            await scheduler.advance(1.0)
+        await scheduler.stop()
+        return scheduler.jobs["tick"].runs
+
+    assert asyncio.run(run()) > 0
+
+
+def test_engine_on_a_simulated_clock_breathes_only_when_advanced(tmp_path):
+    async def run():
+        engine = PandoraMemoryEngine(storage=InMemoryStorage(), data_dir=tmp_path, clock=SimulatedClock())
+        engine.snapshot_mirror = None
+        await engine.start_runtime()
+        await asyncio.sleep(0.01)
+        idle = engine.breath_cycle_count
+        await engine.fast_forward(10 * engine.breath_interval)
+        await engine.stop_runtime()
+        return idle, engine.breath_cycle_count
+
+    idle, cycles = asyncio.run(run())
+    assert idle == 0
+    assert cycles == 11  # breaths at 0, 3, ..., 30 seconds
@@ -0,0 +1,67 @@
+from datetime import datetime, timedelta, timezone
+
+from backend.compaction import BREATH_TAIL, compact_breath_runs, expand_line, expand_lines
+from backend.integrity import GENESIS_HASH, line_digest
+from backend.memory_line import BreathRunLine, QInfinityMemoryLine, memory_line_from_dict
+
+START = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+def _breaths(cycles, interval=3.0, jitter=0.0123, seq=1, prev_hash=GENESIS_HASH):
+    lines = []
+    for index, cycle in enumerate(cycles):
+        line = QInfinityMemoryLine(
+            timestamp=START + timedelta(seconds=(cycle - 1) * interval + (index % 3) * jitter),
+            stage="breath", state="active_cycle", identity="Pandora Q Breath",
+            memory=[f"Cycle {cycle}"] + BREATH_TAIL, semantic_tags=["ancestral"],
+            breath_cycle=cycle, seq=seq + index,
+        )
+        line.hash_value = prev_hash = line_digest(prev_hash, line.to_dict())
+        lines.append(line)
+    return lines
+
+
+def test_expanded_run_gives_back_the_original_lines():
+    lines = _breaths(range(1, 8))
+    result = compact_breath_runs(lines, max_gap=4.5)
+    assert len(result.lines) == 1 and result.collapsed == 7
+    run = result.lines[0]
+    assert [line.to_dict() for line in expand_line(run)] == [line.to_dict() for line in lines]
+    # ...also after a round trip through the stored form
+    stored = memory_line_from_dict(run.to_dict())
+    assert [line.to_dict() for line in expand_line(stored, start=2, limit=3)] == [line.to_dict() for line in lines[2:5]]
+
+
+def test_gap_longer_than_max_gap_ends_the_run():
+    lines = _breaths(range(1, 5)) + _breaths(range(5, 9), seq=5)
+    for line in lines[4:]:
+        line.timestamp += timedelta(seconds=60)  # four breaths missed around cycle 5
+    result = compact_breath_runs(lines, max_gap=4.5)
+    assert [(line.first_cycle, line.last_cycle) for line in result.lines] == [(1, 4), (5, 8)]
+    assert compact_breath_runs(lines).lines[0].run_length == 8  # no max_gap: only cycle/seq breaks runs
+
+
+def test_extending_a_run_keeps_every_line():
+    lines = _breaths(range(1, 11))
+    first = compact_breath_runs(lines[:6], max_gap=4.5)
+    second = compact_breath_runs(first.lines + lines[6:], max_gap=4.5)
+    assert second.removed_ids[0] == first.lines[0].id
+    (run,) = second.lines
+    assert run.run_length == 10 and run.exact
+    assert [line.to_dict() for line in expand_lines([run])] == [line.to_dict() for line in lines]
+
+
+def test_legacy_run_without_line_records_is_interpolated_and_not_extended():
+    lines = _breaths(range(1, 5))
+    legacy = BreathRunLine(timestamp=lines[0].timestamp, stage="breath", state="active_cycle",
+                           identity="Pandora Q Breath", memory=["Cycles 1-3"] + BREATH_TAIL,
+                           semantic_tags=["ancestral"], hash_value=lines[2].hash_value, breath_cycle=3,
+                           seq=1, first_cycle=1, last_cycle=3, last_timestamp=lines[2].timestamp, run_length=3)
+    legacy = memory_line_from_dict({key: value for key, value in legacy.to_dict().items()
+                                    if not key.startswith("line_")})
+    assert not legacy.exact
+    expanded = expand_line(legacy)
+    assert [line.breath_cycle for line in expanded] == [1, 2, 3]
+    assert expanded[0].timestamp == lines[0].timestamp and expanded[-1].timestamp == lines[2].timestamp
+    result = compact_breath_runs([legacy, lines[3]], max_gap=4.5)
+    assert result.lines == [legacy, lines[3]]
@@ -0,0 +1,43 @@
+from backend.content_store import ContentStore, Ref, canonical
+
+ITEM = {"then": [{"stage": "validate", "detail": "x" * 80}], "final": {"status": "fulfilled", "note": "y" * 70}}
+
+
+def test_round_trip_and_logical_size():
+    store = ContentStore()
+    entry = store.put(ITEM)
+    assert isinstance(entry, Ref)
+    assert store.expand(entry) == ITEM
+    assert store.metrics()["logical_bytes"] == len(canonical(ITEM))
+
+
+def test_dedup_ratio_counts_only_unique_data():
+    store = ContentStore()
+    store.put(ITEM)
+    single = store.metrics()
+    # Nothing shared yet: references cost bytes but the ratio does not drop below 1
+    assert single["dedup_ratio"] == 1.0
+    assert single["reference_bytes"] > 0
+    assert single["saved_bytes"] == -single["reference_bytes"]
+    store.put(dict(ITEM))
+    double = store.metrics()
+    assert double["dedup_ratio"] == 2.0
+    assert double["stored_bytes"] == single["stored_bytes"]
+
+
+def test_small_items_are_kept_inline():
+    store = ContentStore()
+    entry = store.put({"a": 1})
+    assert entry == {"a": 1}
+    assert store.metrics()["dedup_ratio"] == 1.0
+
+
+def test_release_frees_unshared_nodes():
+    store = ContentStore()
+    first, second = store.put(ITEM), store.put({"final": ITEM["final"]})
+    store.release(first)
+    assert store.expand(second) == {"final": ITEM["final"]}
+    store.release(second)
+    assert len(store) == 0
+    assert store.metrics() == {"items": 0, "unique_subtrees": 0, "logical_bytes": 0, "stored_bytes": 0,
+                               "reference_bytes": 0, "saved_bytes": 0, "dedup_ratio": 1.0}
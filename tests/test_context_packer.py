@@ -0,0 +1,100 @@
+import random
+from datetime import datetime, timezone
+
+from backend.context_packer import ContextPacker, PackPolicy
+from backend.memory_line import QInfinityMemoryLine
+
+T0 = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+def _line(seq, tags=(), stage="breath", words=1):
+    return QInfinityMemoryLine(id=f"line-{seq:04d}", timestamp=T0, stage=stage, state="s", identity="flo",
+                               memory=["word " * words], semantic_tags=list(tags), seq=seq)
+
+
+def _rank(packer, line_id):
+    entry = packer._entries[line_id]
+    return entry.priority, entry.seq
+
+
+def _check(packer):
+    selected = [entry for entry in packer._entries.values() if entry.selected]
+    assert packer.used_tokens == sum(entry.tokens for entry in selected) <= packer.budget
+    # Lines that fit the budget on their own are packed as a prefix in priority order,
+    # cut where the next one no longer fits
+    ranked = sorted(packer._entries, key=lambda line_id: _rank(packer, line_id), reverse=True)
+    ranked = [line_id for line_id in ranked if packer._entries[line_id].tokens <= packer.budget]
+    flags = [packer._entries[line_id].selected for line_id in ranked]
+    cut = flags.index(False) if False in flags else len(flags)
+    assert not any(flags[cut:])
+    if cut < len(ranked):
+        assert packer._entries[ranked[cut]].tokens > packer.budget - packer.used_tokens
+
+
+def test_budget_and_priority_order_hold_through_every_change():
+    rng = random.Random(7)
+    packer = ContextPacker(budget=400)
+    lines = []
+    for seq in range(1, 400):
+        operation = rng.random()
+        if operation < 0.7 or not lines:
+            line = _line(seq, rng.sample(["ancestral", "emotional", "symbolic"], rng.randint(0, 3)),
+                         words=rng.randint(1, 40))
+            lines.append(line)
+            packer.add(line)
+        elif operation < 0.85:
+            packer.remove([lines.pop(rng.randrange(len(lines))).id])
+        elif operation < 0.9:
+            packer.rescore(rng.sample(lines, min(3, len(lines))))
+        else:
+            packer.set_budget(rng.randint(20, 800))
+        _check(packer)
+    assert packer.packed()["selected_lines"] > 0
+
+
+def test_highest_priority_lines_fill_the_budget_first():
+    # Stages and tags of equal length, so every line renders to the same number of tokens
+    policy = PackPolicy(tag_weights={"plain": 0.0, "vivid": 1.5}, checkpoints=("awaken",))
+    lines = [_line(seq, ["vivid" if seq % 4 == 0 else "plain"], stage="awaken" if seq == 1 else "breath")
+             for seq in range(1, 41)]
+    sizing = ContextPacker(10 ** 6, policy)
+    sizing.add_many(lines)
+    per_line = sizing.used_tokens // len(lines)
+    assert sizing.used_tokens == per_line * len(lines)
+
+    packer = ContextPacker(budget=10 * per_line, policy=policy)
+    packer.add_many(lines)
+    ranked = [line.id for line in sorted(lines, key=lambda line: (policy.priority(line), line.seq), reverse=True)]
+    assert ranked[0] == "line-0001"  # the checkpoint outranks every newer line
+    assert [line.id for line in packer.window()] == sorted(ranked[:10])
+    packer.set_budget(4 * per_line)
+    assert {line.id for line in packer.window()} == set(ranked[:4])
+    packer.remove([ranked[0]])
+    assert {line.id for line in packer.window()} == set(ranked[1:5])
+    packer.set_budget(10 * per_line)
+    assert {line.id for line in packer.window()} == set(ranked[1:11])
+    _check(packer)
+
+
+def test_a_line_that_does_not_fit_holds_back_lower_priority_lines():
+    packer = ContextPacker(budget=62, policy=PackPolicy(tag_weights={"vivid": 1.5}))
+    packer.add(_line(1, ["vivid"], words=5))  # 23 tokens
+    packer.add(_line(2, ["vivid"], words=20))  # 42 tokens, displaces line 1
+    packer.add(_line(3, words=1))  # 16 tokens: would fit, but ranks below line 1
+    assert [line.id for line in packer.window()] == ["line-0002"]
+    _check(packer)
+    packer.remove(["line-0002"])
+    assert [line.id for line in packer.window()] == ["line-0001", "line-0003"]
+    _check(packer)
+
+
+def test_lines_larger_than_the_budget_are_set_aside():
+    packer = ContextPacker(budget=62, policy=PackPolicy(tag_weights={"vivid": 1.5}))
+    packer.add(_line(1, words=5))
+    packer.add(_line(2, ["vivid"], words=60))  # 92 tokens: more than the whole budget
+    packer.add(_line(3, words=1))
+    assert [line.id for line in packer.window()] == ["line-0001", "line-0003"]
+    packer.set_budget(200)
+    assert [line.id for line in packer.window()] == ["line-0001", "line-0002", "line-0003"]
+    packer.set_budget(62)
+    assert [line.id for line in packer.window()] == ["line-0001", "line-0003"]
@@ -0,0 +1,30 @@
+import pytest
+
+from backend.export_formats import ARROW, JSON, MSGPACK, negotiate, pick_encoding
+
+
+@pytest.mark.parametrize("header, expected", [
+    (None, None),
+    ("identity", None),
+    ("gzip", "gzip"),
+    ("gzip;q=0", None),
+    ("gzip;q=0.0, deflate", None),
+    ("gzip;q=0.000", None),
+    ("gzip;q=0.5, zstd;q=0.1", "gzip"),
+    ("zstd, gzip", "zstd"),
+    ("*", "zstd"),
+    ("*;q=0.5, zstd;q=0", "gzip"),
+    ("identity, gzip;q=oops", None),
+])
+def test_pick_encoding_weighs_q_values(header, expected):
+    pytest.importorskip("zstandard")
+    assert pick_encoding(header) == expected
+
+
+def test_negotiate_ranks_accept_entries():
+    assert negotiate("application/msgpack;q=0.5, application/vnd.apache.arrow.stream") == ARROW
+    assert negotiate("application/x-msgpack") == MSGPACK
+    assert negotiate("text/html") == JSON
+    assert negotiate(None, "msgpack") == MSGPACK
+    with pytest.raises(ValueError):
+        negotiate(None, "xml")
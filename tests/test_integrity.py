@@ -0,0 +1,105 @@
+import asyncio
+import hashlib
+
+import pytest
+
+from backend.clock import SimulatedClock, SimulatedScheduler
+from backend.integrity import MerkleIndex, _merkle_root, verify_records
+from backend.pandora_engine import PandoraMemoryEngine
+from backend.retention import RetentionConfig, RetentionPolicy
+from backend.storage import InMemoryStorage
+
+
+def _engine(tmp_path) -> PandoraMemoryEngine:
+    engine = PandoraMemoryEngine(storage=InMemoryStorage(), data_dir=tmp_path,
+                                 scheduler=SimulatedScheduler(SimulatedClock(), autorun=False))
+    engine.snapshot_mirror = None
+    return engine
+
+
+async def _compacted(engine: PandoraMemoryEngine, cycles: int = 40):
+    await engine.start_runtime()
+    await engine.fast_forward(cycles * engine.breath_interval)
+    await engine.compact_memory()
+
+
+def test_compacted_runs_are_verified_line_by_line(tmp_path):
+    async def run():
+        engine = _engine(tmp_path)
+        await _compacted(engine)
+        assert any(getattr(line, "record_type", None) for line in engine.memory_lines)
+        clean = await engine.verify_integrity(workers=1)
+        run_line = next(line for line in engine.memory_lines if getattr(line, "record_type", None))
+        run_line.line_hashes[1] = "0" * 64
+        tampered = await engine.verify_integrity(workers=1)
+        await engine.stop_runtime()
+        return clean, tampered, engine.memory_lines.index(run_line)
+
+    clean, tampered, index = asyncio.run(run())
+    assert clean["valid"] and clean["unverified_runs"] == 0
+    assert not tampered["valid"] and tampered["invalid_indices"] == [index]
+
+
+def test_proofs_for_lines_inside_runs(tmp_path):
+    async def run():
+        engine = _engine(tmp_path)
+        await _compacted(engine)
+        expanded = engine.lines_since(0, 1000)
+        proofs = [engine.inclusion_proof(line.id) for line in expanded]
+        await engine.stop_runtime()
+        return expanded, proofs
+
+    expanded, proofs = asyncio.run(run())
+    assert len(expanded) == 41 and all(proof is not None for proof in proofs)
+    assert all(MerkleIndex.verify_proof(proof) for proof in proofs)
+    inside = next(proof for proof in proofs if "run" in proof)
+    inside["run"]["line_hash"] = "f" * 64
+    assert not MerkleIndex.verify_proof(inside)
+
+
+def test_parallel_verification_uses_worker_processes(tmp_path):
+    async def run():
+        engine = _engine(tmp_path)
+        await _compacted(engine, cycles=30)
+        docs = [line.to_dict() for line in engine.memory_lines]
+        await engine.stop_runtime()
+        return docs
+
+    docs = asyncio.run(run())
+    # Run from a worker thread, as verify_integrity does
+    result = asyncio.run(asyncio.to_thread(verify_records, docs, workers=2, segment_size=4))
+    assert result["valid"] and result["records"] == len(docs) and result["unverified_runs"] == 0
+
+
+@pytest.mark.parametrize("block_size", [1, 3, 4])
+def test_cached_block_tree_matches_a_full_rebuild(block_size):
+    leaves = [hashlib.sha256(str(i).encode()).hexdigest() for i in range(37)]
+    index = MerkleIndex(block_size)
+    for count, leaf in enumerate(leaves, start=1):
+        index.append(leaf)
+        expected = _merkle_root([bytes.fromhex(root) for root in index.block_roots()]).hex()
+        assert index.root() == expected
+        proof = index.proof(count // 2)
+        assert proof["root"] == expected and MerkleIndex.verify_proof(proof)
+    index.truncate(10)
+    index.extend(leaves[:5])
+    assert index.root() == MerkleIndex.from_hashes(leaves[:10] + leaves[:5], block_size).root()
+
+
+def test_proofs_follow_lines_through_pruning(tmp_path):
+    async def run():
+        engine = _engine(tmp_path)
+        await _compacted(engine)
+        expanded = engine.lines_since(0, 1000)
+        # Deeper than the uncompacted tail, so the oldest run is trimmed rather than dropped
+        engine.retention = RetentionConfig(policies=[RetentionPolicy(stage="breath", max_count=20)])
+        await engine.prune_memory()
+        kept = {line.id for line in engine.lines_since(0, 1000)}
+        proofs = {line.id: engine.inclusion_proof(line.id) for line in expanded}
+        await engine.stop_runtime()
+        return kept, proofs
+
+    kept, proofs = asyncio.run(run())
+    assert all(proofs[line_id] is not None and MerkleIndex.verify_proof(proofs[line_id]) for line_id in kept)
+    assert all(proof is None for line_id, proof in proofs.items() if line_id not in kept)
+    assert any(proof is not None and "run" in proof for proof in proofs.values())
@@ -0,0 +1,63 @@
+import asyncio
+
+from backend.clock import SimulatedClock, SimulatedScheduler
+from backend.memo import VersionedLRU
+from backend.pandora_engine import FloJsonOutputCollector, PandoraMemoryEngine
+from backend.storage import InMemoryStorage
+
+
+def test_lru_hits_misses_and_evicts_least_recent():
+    cache = VersionedLRU(max_entries=2)
+    assert cache.lookup("a") == (False, None)
+    cache.store("a", 1)
+    cache.store("b", 2)
+    assert cache.lookup("a") == (True, 1)
+    cache.store("c", 3)  # "b" is now the least recently used
+    assert cache.lookup("b") == (False, None) and cache.lookup("a") == (True, 1)
+    cache.invalidate()
+    assert cache.lookup("a") == (False, None) and len(cache) == 0
+    assert cache.metrics()["version"] == 1
+    assert cache.stats == {"hits": 2, "misses": 3, "evictions": 1, "invalidations": 1}
+
+
+def test_collector_reads_are_reused_until_the_buffer_changes():
+    collector = FloJsonOutputCollector()
+    collector.collect({"n": 1})
+    collector.collect({"n": 2})
+    first = collector.fetch(2)
+    assert collector.fetch(2) == first and collector.cache.stats["hits"] == 1
+    collector.collect({"n": 3})
+    assert collector.fetch(2) == [{"n": 2}, {"n": 3}]
+    assert collector.cache.stats["misses"] == 2
+    collector.pop()
+    assert collector.iter_q(hybrid_mode=False) == [{"n": 2}, {"n": 1}]
+    # Callbacks may have side effects, so they run on every call
+    seen = []
+    collector.rewind(seen.append)
+    collector.rewind(seen.append)
+    assert len(seen) == 4
+
+
+def test_traversal_is_cached_per_normalized_query_and_invalidated_by_writes(tmp_path):
+    async def run():
+        engine = PandoraMemoryEngine(storage=InMemoryStorage(), data_dir=tmp_path,
+                                     scheduler=SimulatedScheduler(SimulatedClock()))
+        engine.snapshot_mirror = None
+        await engine.start_runtime()
+        await engine.run_promise_chain({"query": "seed"})
+        stats = engine.collector.cache.stats
+        first = await engine.introspective_traversal("Deep  Query")
+        misses, hits = stats["misses"], stats["hits"]
+        again = await engine.introspective_traversal("deep query")
+        hits = stats["hits"] - hits
+        await engine.run_promise_chain({"query": "write"})
+        after = await engine.introspective_traversal("deep query")
+        result = (first, again, after, misses, hits, dict(stats))
+        await engine.stop_runtime()
+        return result
+
+    first, again, after, misses, hits, stats = asyncio.run(run())
+    assert again["results"] == first["results"] and hits == 1
+    assert again["memory_line_id"] != first["memory_line_id"]  # a traversal line is braided every time
+    assert stats["misses"] > misses
+    assert after["traversal_items"] == first["traversal_items"] + 1
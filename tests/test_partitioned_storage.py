@@ -0,0 +1,125 @@
+import asyncio
+
+from backend.partitioned_storage import PartitionedStorage
+from backend.storage import InMemoryStorage
+
+
+def _doc(line_id, timestamp, **fields):
+    return {"id": line_id, "timestamp": timestamp, "stage": "breath", "semantic_tags": [], **fields}
+
+
+def _run_doc(line_id, timestamp, last_timestamp):
+    return _doc(line_id, timestamp, record_type="breath_run", last_timestamp=last_timestamp, run_length=2)
+
+
+def _storage(granularity="day", names=()) -> PartitionedStorage:
+    async def lister():
+        return list(names)
+
+    return PartitionedStorage(lambda key: InMemoryStorage(), granularity, lister=lister)
+
+
+def test_only_partition_names_of_the_granularity_are_attached():
+    async def run():
+        storage = _storage(names=["2026_01_01", "2026_01", "checks", "2026_01_01_old"])
+        await storage.persist(_doc("a", "2026-01-02T00:00:00"))
+        return sorted(storage.partitions), await storage.drop_before("2026-01-03")
+
+    partitions, dropped = asyncio.run(run())
+    assert partitions == ["2026_01_01", "2026_01_02"]
+    assert dropped == ["2026_01_01", "2026_01_02"]
+
+
+def test_partition_holding_a_run_past_the_cutoff_is_not_dropped():
+    async def run():
+        storage = _storage()
+        await storage.persist_many([
+            _doc("old", "2025-12-31T10:00:00"),
+            _doc("plain", "2026-01-01T10:00:00"),
+            _run_doc("run", "2026-01-01T23:59:00", "2026-01-02T00:30:00"),
+        ])
+        dropped = await storage.drop_before("2026-01-02T00:10:00")
+        return dropped, [doc["id"] for doc in await storage.query()]
+
+    dropped, ids = asyncio.run(run())
+    assert dropped == ["2025_12_31"]
+    assert ids == ["plain", "run"]
+
+
+def test_prune_keeps_runs_that_end_after_the_cutoff():
+    async def run():
+        storage = _storage(granularity="month")
+        await storage.persist_many([
+            _doc("plain", "2026-01-20T10:00:00"),
+            _run_doc("run", "2026-01-31T23:00:00", "2026-02-01T01:00:00"),
+            _run_doc("ended", "2026-01-10T00:00:00", "2026-01-10T01:00:00"),
+        ])
+        removed = await storage.prune({}, before="2026-02-01T00:30:00")
+        return removed, [doc["id"] for doc in await storage.query()], sorted(storage.partitions)
+
+    removed, ids, partitions = asyncio.run(run())
+    assert removed == 2
+    assert ids == ["run"] and partitions == ["2026_01"]
+
+
+def test_stage_expiry_drops_partitions_holding_only_that_stage():
+    async def run():
+        storage = _storage()
+        await storage.persist_many([
+            _doc("a", "2026-01-01T10:00:00"),
+            _doc("b", "2026-01-02T10:00:00"),
+            _doc("c", "2026-01-02T11:00:00", stage="promise"),
+            _doc("d", "2026-01-05T10:00:00"),
+        ])
+        dropped = []
+        drop = storage.drop_partition
+
+        async def record(key):
+            dropped.append(key)
+            await drop(key)
+
+        storage.drop_partition = record
+        removed = await storage.prune({"stage": "breath"}, before="2026-01-03")
+        return removed, dropped, [doc["id"] for doc in await storage.query()]
+
+    removed, dropped, ids = asyncio.run(run())
+    assert removed == 2
+    assert dropped == ["2026_01_01"]
+    assert ids == ["c", "d"]
+
+
+def test_keep_is_spent_newest_partition_first():
+    async def run():
+        storage = _storage()
+        await storage.persist_many([_doc(f"{day}-{hour}", f"2026-01-0{day}T1{hour}:00:00")
+                                    for day in (1, 2, 3) for hour in range(3)])
+        await storage.persist(_doc("pinned", "2026-01-01T09:00:00", stage="genesis"))
+        pruned = []
+        for key, partition in storage.partitions.items():
+            prune = partition.prune
+
+            async def spy(filters, *args, _key=key, _prune=prune, **kwargs):
+                pruned.append(_key)
+                return await _prune(filters, *args, **kwargs)
+
+            partition.prune = spy
+        removed = await storage.prune({}, keep=4, exclude_stages=["genesis"])
+        return removed, pruned, sorted(doc["id"] for doc in await storage.query()), sorted(storage.partitions)
+
+    removed, pruned, ids, partitions = asyncio.run(run())
+    assert removed == 5
+    # The newest partition fits the budget whole and is never pruned
+    assert pruned == ["2026_01_02", "2026_01_01"]
+    assert ids == ["2-2", "3-0", "3-1", "3-2", "pinned"]
+    assert partitions == ["2026_01_01", "2026_01_02", "2026_01_03"]
+
+
+def test_partitioned_mongo_expires_through_prune_not_ttl():
+    from backend.partitioned_storage import create_partitioned_backend
+    from backend.storage import MongoMemoryStorage
+
+    storage = create_partitioned_backend("mongo", "day", db=object())
+    assert MongoMemoryStorage.capabilities.ttl_index
+    assert not storage.capabilities.ttl_index and storage.capabilities.bulk_insert
+    asyncio.run(storage.ensure_retention_indexes())
+    assert not storage._retention_indexed
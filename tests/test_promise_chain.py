@@ -0,0 +1,23 @@
+import asyncio
+
+from backend.clock import SimulatedClock, SimulatedScheduler
+from backend.pandora_engine import PandoraMemoryEngine
+from backend.storage import InMemoryStorage
+
+
+def test_collected_result_carries_the_line_hash(tmp_path):
+    async def run():
+        engine = PandoraMemoryEngine(storage=InMemoryStorage(), data_dir=tmp_path,
+                                     scheduler=SimulatedScheduler(SimulatedClock(), autorun=False))
+        engine.snapshot_mirror = None
+        await engine.start_runtime()
+        result = await engine.run_promise_chain({"query": "braid"})
+        collected = engine.collector.buffer[-1]
+        line = engine.memory_lines[-1]
+        await engine.stop_runtime()
+        return result, collected, line
+
+    result, collected, line = asyncio.run(run())
+    assert result["final"]["hash"] == line.hash_value
+    assert collected["final"]["hash"] == line.hash_value
+    assert collected["final"]["memory_line_id"] == line.id
@@ -0,0 +1,87 @@
+import asyncio
+
+import pytest
+
+from backend.qchain import DEFAULT_PROMISE, CompiledChain, ChainStage, compile_chain
+
+
+def _names(chain: CompiledChain):
+    return [[stage.name for stage in level] for level in chain.levels]
+
+
+def test_levels_follow_then_order_with_this_alongside():
+    chain = compile_chain(DEFAULT_PROMISE)
+    assert _names(chain) == [["then.0", "this.0", "this.1"], ["then.1"], ["then.2"], ["then.3"], ["final"]]
+    custom = compile_chain({"then": [{"name": "a"}, {"name": "b", "needs": []}, {"name": "c", "needs": ["a", "b"]}]})
+    assert _names(custom) == [["a", "b"], ["c"], ["final"]]
+
+
+def test_unknown_needs_and_cycles_are_rejected():
+    with pytest.raises(ValueError, match="unknown"):
+        CompiledChain([ChainStage("a", "then", {}, needs=("missing",))])
+    with pytest.raises(ValueError, match="cycle"):
+        CompiledChain([ChainStage("a", "then", {}, needs=("b",)), ChainStage("b", "then", {}, needs=("a",))])
+
+
+def test_stages_of_one_level_run_concurrently():
+    chain = compile_chain({"then": [], "this": [{"action": "meet"}, {"action": "meet"}], "final": {}})
+    started, both = [], asyncio.Event()
+
+    async def meet(stage, context):
+        # Each stage waits for the other, so running them one after the other would time out
+        started.append(stage.name)
+        if len(started) == 2:
+            both.set()
+        await both.wait()
+        return {"met": stage.name}
+
+    run = asyncio.run(chain.run({}, {"meet": meet}))
+    assert run.fulfilled and sorted(started) == ["this.0", "this.1"]
+    assert run.outputs["this.1"] == {"met": "this.1"}
+
+
+def test_timeout_fails_the_stage_and_skips_later_levels():
+    chain = compile_chain({"then": [{"action": "slow", "timeout": 0.05}, {"action": "after"}], "final": {}})
+
+    async def slow(stage, context):
+        await asyncio.sleep(1.0)
+
+    run = asyncio.run(chain.run({}, {"slow": slow}))
+    assert run.failed == ["then.0"]
+    assert run.timings["then.0"]["status"] == "timeout" and run.timings["then.0"]["attempts"] == 1
+    assert run.timings["then.1"]["status"] == "skipped" and run.timings["final"]["status"] == "skipped"
+
+
+def test_retries_until_the_stage_succeeds():
+    chain = compile_chain({"then": [{"action": "flaky", "retries": 2}], "final": {}})
+    calls = []
+
+    async def flaky(stage, context):
+        calls.append(1)
+        if len(calls) < 3:
+            raise RuntimeError("not yet")
+        return {"calls": len(calls)}
+
+    run = asyncio.run(chain.run({}, {"flaky": flaky}))
+    assert run.fulfilled and run.outputs["then.0"] == {"calls": 3}
+    assert run.timings["then.0"]["attempts"] == 3
+
+
+def test_stage_fails_once_retries_are_exhausted():
+    chain = compile_chain({"then": [{"action": "broken", "retries": 1}], "final": {}})
+
+    async def broken(stage, context):
+        raise RuntimeError("never")
+
+    run = asyncio.run(chain.run({}, {"broken": broken}))
+    assert run.failed == ["then.0"]
+    assert run.timings["then.0"]["attempts"] == 2
+    assert run.timings["then.0"]["status"] == "failed" and run.timings["then.0"]["error"] == "never"
+
+
+def test_identical_configs_reuse_the_compiled_chain():
+    promise = {"then": [{"action": "a"}, {"action": "b"}], "final": {"status": "fulfilled"}}
+    reordered = {"final": {"status": "fulfilled"}, "then": [{"action": "a"}, {"action": "b"}]}
+    assert compile_chain(promise) is compile_chain(reordered)
+    assert compile_chain(promise, timeout=1.0) is not compile_chain(promise)
+    assert compile_chain(None) is compile_chain(DEFAULT_PROMISE)
@@ -0,0 +1,180 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from backend.clock import SimulatedClock, SimulatedScheduler
+from backend.compaction import compact_breath_runs, expand_line
+from backend.integrity import MerkleIndex, record_leaf
+from backend.pandora_engine import PandoraMemoryEngine
+from backend.retention import PrunePlan, RetentionConfig, RetentionPolicy
+from backend.storage import InMemoryStorage, SQLiteMemoryStorage
+from tests.test_storage import _doc
+from tests.test_compaction import START, _breaths
+
+
+def _run(cycles=10):
+    (run,) = compact_breath_runs(_breaths(range(1, cycles + 1))).lines
+    return run
+
+
+def _plan(now, **policy) -> PrunePlan:
+    return PrunePlan(RetentionConfig(policies=[RetentionPolicy(stage="breath", **policy)]), now=now)
+
+
+def test_run_is_cut_at_the_count_limit():
+    run = _run()
+    plan = _plan(START, max_count=4)
+    plan.consider(run)
+    assert plan.trims == {run.id: 6} and not plan.victims
+    older = _run()
+    plan.consider(older)  # the limit is used up by the newer run
+    assert older.id in plan.victims
+
+
+def test_run_is_cut_at_the_age_limit():
+    run = _run()  # breaths 3s apart from START
+    plan = _plan(START + timedelta(seconds=40), max_age=20)
+    plan.consider(run)
+    assert plan.trims == {run.id: 7}  # breaths at 0..18s are older than 20s
+    plan = _plan(START + timedelta(seconds=60), max_age=20)
+    plan.consider(run)
+    assert plan.victims == {run.id}
+
+
+def test_prune_trims_compacted_runs_in_the_engine(tmp_path):
+    async def run():
+        engine = PandoraMemoryEngine(storage=InMemoryStorage(), data_dir=tmp_path,
+                                     scheduler=SimulatedScheduler(SimulatedClock(), autorun=False))
+        engine.snapshot_mirror = None
+        await engine.start_runtime()
+        await engine.fast_forward(40 * engine.breath_interval)
+        await engine.compact_memory()
+        before = [line for line in engine.memory_lines if line.stage == "breath"]
+        engine.retention = RetentionConfig(policies=[RetentionPolicy(stage="breath", max_count=5)])
+        await engine.prune_memory()
+        breaths = [line for line in engine.memory_lines if line.stage == "breath"]
+        integrity = await engine.verify_integrity(workers=1)
+        stored = [doc for doc in await engine.storage.query() if doc["stage"] == "breath"]
+        await engine.stop_runtime()
+        return before, breaths, integrity, stored, engine
+
+    before, breaths, integrity, stored, engine = asyncio.run(run())
+    assert sum(line.count for line in before) > 5
+    assert sum(line.count for line in breaths) == 5
+    expanded = [line for record in before for line in expand_line(record)][-5:]
+    assert [line.to_dict() for record in breaths for line in expand_line(record)] == [line.to_dict() for line in expanded]
+    assert integrity["valid"]
+    assert sum(doc.get("run_length", 1) for doc in stored) == 5
+    assert engine.tag_counts["ancestral"] >= 5
+    assert engine.retention_stats["trimmed_lines"] + engine.retention_stats["pruned_lines"] > 0
+
+
+def test_braid_is_pruned_in_batch_size_slices(tmp_path):
+    async def run():
+        engine = PandoraMemoryEngine(storage=InMemoryStorage(), data_dir=tmp_path,
+                                     scheduler=SimulatedScheduler(SimulatedClock(), autorun=False))
+        engine.snapshot_mirror = None
+        await engine.start_runtime()
+        await engine.fast_forward(30 * engine.breath_interval)
+        engine.retention = RetentionConfig(policies=[RetentionPolicy(stage="breath", max_count=5)], batch_size=4)
+        expected = [line.id for line in engine.memory_lines if line.stage == "breath"][-5:]
+        slices = []
+        prune_slice = engine._prune_in_memory
+
+        def spy(ids, victims, trims):
+            slices.append(len(ids))
+            return prune_slice(ids, victims, trims)
+
+        engine._prune_in_memory = spy
+        removed = await engine.prune_memory()
+        breaths = [line.id for line in engine.memory_lines if line.stage == "breath"]
+        rebuilt = MerkleIndex(block_size=engine.merkle.block_size)
+        rebuilt.extend([record_leaf(line) for line in engine.memory_lines])
+        summary = engine.integrity_summary()
+        integrity = await engine.verify_integrity(workers=1)
+        await engine.stop_runtime()
+        return removed, slices, breaths, expected, rebuilt, summary, integrity
+
+    removed, slices, breaths, expected, rebuilt, summary, integrity = asyncio.run(run())
+    assert removed > 4 and sum(slices) == removed
+    assert max(slices) == 4 and len(slices) == -(-removed // 4)
+    assert breaths == expected
+    assert summary["merkle_root"] == rebuilt.root() and summary["records"] == len(rebuilt)
+    assert integrity["valid"]
+
+
+def test_store_policies_follow_the_first_match(tmp_path):
+    async def run():
+        storage = SQLiteMemoryStorage(str(tmp_path / "memory.db"))
+        engine = PandoraMemoryEngine(storage=storage, data_dir=tmp_path,
+                                     scheduler=SimulatedScheduler(SimulatedClock(), autorun=False))
+        await storage.persist_many(
+            [_doc(f"i{n}", f"2026-01-01T0{n}", stage="introspection", tags=["symbolic"]) for n in range(3)]
+            + [_doc(f"b{n}", f"2026-01-02T0{n}", tags=["symbolic"]) for n in range(3)]
+            + [_doc("plain", "2026-01-03", tags=["ancestral"])])
+        engine.retention = RetentionConfig(policies=[
+            RetentionPolicy(stage="introspection", max_count=3),
+            RetentionPolicy(tag="symbolic", max_count=2),
+            RetentionPolicy(max_count=1),
+            RetentionPolicy(stage="breath", max_count=0),
+        ])
+        pruned = await engine._prune_store(START, [])
+        ids = [doc["id"] for doc in await storage.query()]
+        await storage.close()
+        return pruned, ids
+
+    pruned, ids = asyncio.run(run())
+    # Introspection lines belong to the first policy only; the catch-all ends the list
+    assert pruned == 1
+    assert ids == ["i0", "i1", "i2", "b1", "b2", "plain"]
+
+
+def test_query_ignores_storage_only_fields(tmp_path):
+    async def run():
+        engine = PandoraMemoryEngine(storage=InMemoryStorage(), data_dir=tmp_path,
+                                     scheduler=SimulatedScheduler(SimulatedClock(), autorun=False))
+        engine.snapshot_mirror = None
+        await engine.start_runtime()
+        await engine.fast_forward(3 * engine.breath_interval)
+        stamped = [doc["id"] for doc in await engine.storage.query()]
+        # What a TTL-indexed Mongo collection hands back
+        expires_at = datetime(2026, 1, 2, tzinfo=timezone.utc)
+        await engine.storage.update_many({line_id: {"expires_at": expires_at, "_id": line_id} for line_id in stamped})
+        lines = await engine.query_memory()
+        await engine.stop_runtime()
+        return stamped, lines
+
+    stamped, lines = asyncio.run(run())
+    assert stamped and [line.id for line in lines] == stamped
+    assert all("expires_at" not in line.to_dict() for line in lines)
+
+
+def test_line_count_is_kept_through_compaction_pruning_and_restore(tmp_path):
+    async def run():
+        engine = PandoraMemoryEngine(storage=InMemoryStorage(), data_dir=tmp_path,
+                                     scheduler=SimulatedScheduler(SimulatedClock(), autorun=False))
+        engine.snapshot_mirror = None
+        await engine.start_runtime()
+        counts = []
+
+        def check():
+            counts.append((engine.total_memory_lines(), sum(line.count for line in engine.memory_lines)))
+
+        await engine.fast_forward(40 * engine.breath_interval)
+        check()
+        await engine.compact_memory()
+        check()
+        engine.retention = RetentionConfig(policies=[RetentionPolicy(stage="breath", max_count=15)])
+        await engine.prune_memory()
+        check()
+        await engine.commit_memory_snapshot()
+        await engine.restore_snapshot_file(tmp_path / "qinfinity_memory.json")
+        check()
+        status = engine.get_runtime_status()
+        await engine.stop_runtime()
+        return counts, engine.retention_stats, status
+
+    counts, stats, status = asyncio.run(run())
+    assert all(running == actual for running, actual in counts)
+    assert stats["trimmed_lines"] > 0
+    assert counts[1] == counts[0] and counts[2][0] < counts[1][0]
+    assert status["memory_lines"] == counts[-1][0]
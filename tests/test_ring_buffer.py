@@ -0,0 +1,58 @@
+from backend.ring_buffer import MappedRingBuffer
+
+
+def _item(n):
+    return {"n": n, "pad": "x" * (n % 7)}
+
+
+def test_wrapped_ring_reopens_with_the_same_items(tmp_path):
+    path = tmp_path / "collector.ring"
+    ring = MappedRingBuffer(path, capacity=256)
+    for n in range(1, 41):
+        ring.append(_item(n), seq=n)
+    survivors, seqs = list(ring), list(ring.seqs)
+    metrics = ring.metrics()
+    ring.close()
+
+    # The ring wrapped several times: only the newest items are left, still in order
+    assert 0 < len(survivors) < 40 and survivors[-1] == _item(40)
+    assert seqs == list(range(41 - len(seqs), 41)) and survivors == [_item(n) for n in seqs]
+    assert metrics["used_bytes"] <= 256
+
+    reopened = MappedRingBuffer(path)
+    assert reopened.capacity == 256 and reopened.last_seq == 40
+    assert list(reopened) == survivors and list(reopened.seqs) == seqs
+    reopened.append(_item(41), seq=41)
+    assert reopened[-1] == _item(41) and reopened.seqs[-1] == 41
+    reopened.close()
+
+
+class _Crash(list):
+    """Index whose next append fails, as if the process died right after a record's payload was written"""
+
+    def append(self, entry):
+        raise SystemExit("crash")
+
+
+def test_crash_after_an_evicting_write_recovers_a_consistent_ring(tmp_path):
+    path = tmp_path / "collector.ring"
+    ring = MappedRingBuffer(path, capacity=256)
+    for n in range(1, 25):
+        ring.append(_item(n), seq=n)
+    before = list(ring)
+    ring._index = _Crash(ring._index)
+    try:
+        ring.append(_item(25), seq=25)
+    except SystemExit:
+        pass
+    ring._map.close()
+    ring._file.close()
+
+    recovered = MappedRingBuffer(path)
+    items = list(recovered)
+    # The records the lost append evicted are gone; the rest are intact and in order
+    assert 0 < len(items) < len(before) and items == before[len(before) - len(items):]
+    assert recovered.last_seq == 24 and list(recovered.seqs) == [item["n"] for item in items]
+    recovered.append(_item(25), seq=25)
+    assert list(recovered)[-1] == _item(25)
+    recovered.close()
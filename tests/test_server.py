@@ -0,0 +1,111 @@
+import importlib
+import os
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+
+@pytest.fixture(scope="module")
+def server(tmp_path_factory):
+    data_dir = tmp_path_factory.mktemp("data")
+    # Set before import: .env does not override variables that are already set
+    os.environ.update(MONGO_URL="", PANDORA_STORAGE="memory", PANDORA_DATA_DIR=str(data_dir))
+    module = importlib.import_module("backend.server")
+    module.pandora_engine.snapshot_mirror = data_dir / "mirror"
+    return module
+
+
+def _wait_ready(client, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        response = client.get("/api/health/ready")
+        if response.status_code == 200:
+            return response.json()
+        time.sleep(0.05)
+    raise AssertionError(f"not ready after {timeout}s: {response.json()}")
+
+
+def test_probes_and_lazy_start(server):
+    # Without the lifespan nothing has started the runtime yet
+    cold = TestClient(server.app)
+    assert cold.get("/api/health/live").json() == {"status": "alive"}
+    response = cold.get("/api/health/ready")
+    assert response.status_code == 503 and response.json()["status"] == "starting"
+    assert response.headers["Retry-After"] == "1"
+    assert not server.pandora_engine.is_ready
+
+    with TestClient(server.app) as client:
+        ready = _wait_ready(client)
+        assert ready["status"] == "ready" and ready["phase"] == "ready"
+        assert server.pandora_engine.is_ready
+        assert client.get("/api/health/live").status_code == 200
+
+
+def test_snapshot_reports_locations_written(server):
+    engine = server.pandora_engine
+    with TestClient(server.app) as client:
+        _wait_ready(client)
+        body = client.post("/api/pandora/snapshot").json()
+        assert body["locations"] == [str(engine.data_dir / "qinfinity_memory.json"),
+                                     str(engine.snapshot_mirror / "qinfinity_memory.json")]
+        mirror, engine.snapshot_mirror = engine.snapshot_mirror, None
+        try:
+            body = client.post("/api/pandora/snapshot").json()
+        finally:
+            engine.snapshot_mirror = mirror
+        assert body["locations"] == [str(engine.data_dir / "qinfinity_memory.json")]
+
+
+def test_only_binary_formats_are_compressed(server):
+    with TestClient(server.app) as client:
+        _wait_ready(client)
+        for _ in range(10):
+            client.post("/api/pandora/promise", json={"data": {"query": "x" * 200}})
+        plain = client.get("/api/pandora/memory", headers={"Accept-Encoding": "gzip"})
+        packed = client.get("/api/pandora/memory?format=msgpack", headers={"Accept-Encoding": "gzip"})
+        identity = client.get("/api/pandora/memory?format=msgpack", headers={"Accept-Encoding": "identity"})
+    assert plain.status_code == 200 and "content-encoding" not in plain.headers
+    assert plain.json()["returned_lines"] > 0
+    assert packed.headers["content-encoding"] == "gzip"
+    assert "content-encoding" not in identity.headers
+
+
+def test_clock_advance_needs_a_simulated_clock(server):
+    with TestClient(server.app) as client:
+        _wait_ready(client)
+        response = client.post("/api/pandora/clock/advance?seconds=30")
+    assert response.status_code == 409
+
+
+def test_retag_endpoint(server):
+    from backend.tagging import TaggingConfig, TaggingPipeline
+
+    engine = server.pandora_engine
+    with TestClient(server.app) as client:
+        _wait_ready(client)
+        assert client.post("/api/pandora/tags/retag").status_code == 503
+        engine.tagging = TaggingPipeline(TaggingConfig(enabled=True, workers=0), engine._write_tags)
+        try:
+            response = client.post("/api/pandora/tags/retag?batch_size=4")
+        finally:
+            engine.tagging = None
+    assert response.status_code == 200
+    body = response.json()
+    assert body["braid"]["lines"] > 0 and body["braid"]["batches"] == -(-body["braid"]["lines"] // 4)
+    assert "semantic_distribution" in body
+
+
+def test_full_writer_queue_returns_503(server):
+    with TestClient(server.app) as client:
+        _wait_ready(client)
+        writer = server.pandora_engine.writer
+        max_depth, writer.max_depth = writer.max_depth, 0
+        try:
+            response = client.post("/api/pandora/promise", json={"data": {"query": "busy"}})
+        finally:
+            writer.max_depth = max_depth
+        accepted = client.post("/api/pandora/promise", json={"data": {"query": "calm"}})
+    assert response.status_code == 503 and response.headers["Retry-After"] == "1"
+    assert "queue full" in response.json()["detail"]
+    assert accepted.status_code == 200
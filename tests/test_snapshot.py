@@ -0,0 +1,106 @@
+import asyncio
+import json
+
+import pytest
+
+from backend.clock import SimulatedClock, SimulatedScheduler
+from backend.pandora_engine import PandoraMemoryEngine
+from backend.retention import RetentionConfig, RetentionPolicy
+from backend.snapshot_stream import CHUNK_SIZE, iter_snapshot, write_snapshot
+from backend.storage import InMemoryStorage
+
+
+def _engine(data_dir) -> PandoraMemoryEngine:
+    engine = PandoraMemoryEngine(storage=InMemoryStorage(), data_dir=data_dir,
+                                 scheduler=SimulatedScheduler(SimulatedClock()))
+    engine.snapshot_mirror = None
+    return engine
+
+
+async def _pruned_engine(data_dir, snapshot_format) -> PandoraMemoryEngine:
+    engine = _engine(data_dir)
+    engine.snapshot_format = snapshot_format
+    await engine.start_runtime()
+    for _ in range(3):
+        await engine.fast_forward(2 * engine.breath_interval)
+        await engine.run_promise_chain({"query": "snapshot"})
+    engine.retention = RetentionConfig(policies=[RetentionPolicy(stage="breath", max_count=2)])
+    await engine.prune_memory()
+    assert engine.chain_anchors
+    return engine
+
+
+def _round_trip(tmp_path, snapshot_format, rewrite=None):
+    async def run():
+        source = await _pruned_engine(tmp_path / "source", snapshot_format)
+        assert await source.commit_memory_snapshot()
+        path = source.data_dir / f"qinfinity_memory.{snapshot_format}"
+        if rewrite is not None:
+            rewrite(path)
+        expected = ([line.to_dict() for line in source.memory_lines], list(source.collector.seqs),
+                    dict(source.chain_anchors))
+        await source.stop_runtime()
+        target = _engine(tmp_path / "target")
+        await target.start_runtime()
+        await target.restore_snapshot_file(path)
+        restored = ([line.to_dict() for line in target.memory_lines], list(target.collector.seqs),
+                    dict(target.chain_anchors))
+        integrity = await target.verify_integrity(workers=1)
+        await target.stop_runtime()
+        return expected, restored, integrity
+
+    return asyncio.run(run())
+
+
+def test_pruned_json_snapshot_round_trip_keeps_anchors_and_seqs(tmp_path):
+    expected, restored, integrity = _round_trip(tmp_path, "json")
+    assert restored == expected
+    assert integrity["valid"]
+
+
+def test_ndjson_snapshot_round_trip(tmp_path):
+    expected, restored, integrity = _round_trip(tmp_path, "ndjson")
+    assert restored == expected
+    assert integrity["valid"]
+
+
+def test_legacy_json_snapshot_with_keys_after_the_arrays(tmp_path):
+    def legacy_layout(path):
+        snapshot = json.loads(path.read_text())
+        arrays = {key: snapshot.pop(key) for key in ("memory_lines", "collector_buffer")}
+        path.write_text(json.dumps({**arrays, **snapshot}))
+
+    expected, restored, integrity = _round_trip(tmp_path, "json", legacy_layout)
+    assert restored == expected
+    assert integrity["valid"]
+
+
+LINES = [{"id": f"line-{index}", "memory": ["x" * (CHUNK_SIZE // 8)], "seq": index} for index in range(12)]
+ITEMS = [(20 + index, {"final": {"status": "fulfilled", "n": index}}) for index in range(3)]
+
+
+@pytest.mark.parametrize("use_mmap", [False, True])
+def test_ndjson_writer_and_reader(tmp_path, use_mmap):
+    path = tmp_path / "snapshot.ndjson"
+    write_snapshot(path, {"breath_cycle": 7}, LINES, ITEMS, config={"qchain": {}})
+    records = list(iter_snapshot(path, use_mmap=use_mmap))
+    assert records[0][0] == "header" and records[0][1]["breath_cycle"] == 7
+    assert records[1] == ("config", {"qchain": {}})
+    assert [payload for kind, payload in records if kind == "line"] == LINES
+    assert [(payload["seq"], payload["data"]) for kind, payload in records if kind == "item"] == ITEMS
+    assert records[-1] == ("footer", {"memory_lines": len(LINES), "collector_items": len(ITEMS)})
+    assert not (tmp_path / "snapshot.ndjson.tmp").exists()
+
+
+@pytest.mark.parametrize("indent", [None, 2])
+def test_legacy_json_reader_spans_chunks(tmp_path, indent):
+    path = tmp_path / "snapshot.json"
+    snapshot = {"breath_cycle": 3, "memory_lines": LINES, "collector_buffer": [item for _, item in ITEMS],
+                "semantic_state": {"ancestral": 12}, "config": {"qchain": {}}}
+    path.write_text(json.dumps(snapshot, indent=indent))
+    records = list(iter_snapshot(path))
+    assert records[0] == ("header", {"breath_cycle": 3})
+    assert [payload for kind, payload in records if kind == "line"] == LINES
+    assert [payload for kind, payload in records if kind == "item"] == [{"seq": None, "data": item} for _, item in ITEMS]
+    assert ("config", {"qchain": {}}) in records
+    assert records[-1] == ("footer", {"semantic_state": {"ancestral": 12}})
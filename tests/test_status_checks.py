@@ -0,0 +1,82 @@
+import asyncio
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+from backend.status_checks import page_status_checks, parse_fields, stream_status_checks
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+START = datetime(2026, 1, 1)
+
+
+def _check(n, seconds=None):
+    # Pairs of checks share a timestamp so the id breaks ties
+    return {"id": f"check-{n:03d}", "client_name": f"client-{n % 3}",
+            "timestamp": START + timedelta(seconds=n // 2 if seconds is None else seconds)}
+
+
+def _db(checks):
+    db = mongomock_motor.AsyncMongoMockClient()["pandora"]
+    asyncio.run(db.status_checks.insert_many([dict(check) for check in checks]))
+    return db
+
+
+async def _pages(db, limit, descending=False, between=None):
+    pages, cursor = [], None
+    while True:
+        docs, cursor = await page_status_checks(db, limit, cursor, descending=descending)
+        pages.append([doc["id"] for doc in docs])
+        if between is not None:
+            await between(len(pages))
+        if cursor is None:
+            return pages
+
+
+def test_pages_meet_without_duplicates_or_gaps():
+    db = _db([_check(n) for n in range(25)])
+    ascending = asyncio.run(_pages(db, 7))
+    descending = asyncio.run(_pages(db, 7, descending=True))
+    expected = [f"check-{n:03d}" for n in range(25)]
+    assert [len(page) for page in ascending] == [7, 7, 7, 4]
+    assert [doc for page in ascending for doc in page] == expected
+    assert [doc for page in descending for doc in page] == expected[::-1]
+    # An exact multiple of the page size ends without an empty page
+    assert asyncio.run(_pages(_db([_check(n) for n in range(14)]), 7))[-1] != []
+
+
+def test_cursor_is_stable_under_concurrent_appends():
+    db = _db([_check(n) for n in range(20)])
+
+    async def append(pages):
+        if pages == 1:
+            # One check lands behind the cursor, two ahead of everything paged so far
+            await db.status_checks.insert_many([_check(100, seconds=0), _check(101, seconds=60), _check(102, seconds=61)])
+
+    ids = [doc for page in asyncio.run(_pages(db, 6, between=append)) for doc in page]
+    assert len(ids) == len(set(ids))
+    assert ids == [f"check-{n:03d}" for n in range(20)] + ["check-101", "check-102"]
+
+
+def test_projection_keeps_the_keyset_fields():
+    db = _db([_check(n) for n in range(3)])
+    docs, _ = asyncio.run(page_status_checks(db, 10, fields=parse_fields("client_name")))
+    assert all(set(doc) == {"id", "client_name", "timestamp"} for doc in docs)
+    docs, cursor = asyncio.run(page_status_checks(db, 2, fields=parse_fields("timestamp")))
+    assert all(set(doc) == {"id", "timestamp"} for doc in docs) and cursor is not None
+    with pytest.raises(ValueError, match="secret"):
+        parse_fields("id,secret")
+
+
+def test_stream_matches_the_pages():
+    db = _db([_check(n) for n in range(12)])
+
+    async def collect():
+        return [chunk async for chunk in stream_status_checks(db, fields=parse_fields("id"), batch_size=5)]
+
+    chunks = asyncio.run(collect())
+    rows = [json.loads(line) for chunk in chunks for line in chunk.decode().splitlines()]
+    assert len(chunks) == 3
+    assert [row["id"] for row in rows] == [f"check-{n:03d}" for n in range(12)]
+    assert all(set(row) == {"id", "timestamp"} for row in rows)
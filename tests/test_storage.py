@@ -0,0 +1,51 @@
+import asyncio
+
+import pytest
+
+from backend.storage import InMemoryStorage, SQLiteMemoryStorage
+
+
+def _doc(line_id, timestamp, stage="breath", tags=("ancestral",)):
+    return {"id": line_id, "timestamp": timestamp, "stage": stage, "state": "", "identity": "",
+            "memory": [], "semantic_tags": list(tags), "hash_value": "", "breath_cycle": 0}
+
+
+def test_in_memory_bulk_insert_keeps_timestamp_order():
+    async def run():
+        storage = InMemoryStorage()
+        await storage.persist_many([_doc("b", "2026-01-02"), _doc("c", "2026-01-03")])
+        await storage.persist_many([_doc("a", "2026-01-01"), _doc("d", "2026-01-04")])
+        await storage.persist(_doc("b2", "2026-01-02"))
+        return [doc["id"] for doc in await storage.query()]
+
+    assert asyncio.run(run()) == ["a", "b", "b2", "c", "d"]
+
+
+def test_in_memory_update_many_is_keyed_and_survives_delete():
+    async def run():
+        storage = InMemoryStorage()
+        await storage.persist_many([_doc("a", "2026-01-01"), _doc("b", "2026-01-02")])
+        await storage.delete_many(["a"])
+        await storage.update_many({"a": {"semantic_tags": ["gone"]}, "b": {"semantic_tags": ["symbolic"]}})
+        return await storage.query()
+
+    docs = asyncio.run(run())
+    assert [(doc["id"], doc["semantic_tags"]) for doc in docs] == [("b", ["symbolic"])]
+
+
+@pytest.mark.parametrize("ids", [["a"], ["a", "b"]])
+def test_sqlite_update_many(tmp_path, ids):
+    async def run():
+        storage = SQLiteMemoryStorage(str(tmp_path / "memory.db"))
+        await storage.persist_many([_doc("a", "2026-01-01"), _doc("b", "2026-01-02", stage="promise_chain")])
+        await storage.update_many({line_id: {"semantic_tags": ["emotional"]} for line_id in ids})
+        docs = await storage.query()
+        by_stage = await storage.query(filters={"stage": "promise_chain"})
+        await storage.close()
+        return docs, by_stage
+
+    docs, by_stage = asyncio.run(run())
+    assert {doc["id"]: doc["semantic_tags"] for doc in docs} == {
+        "a": ["emotional"], "b": ["emotional"] if "b" in ids else ["ancestral"]}
+    # Indexed columns are rewritten along with the document
+    assert [doc["id"] for doc in by_stage] == ["b"]
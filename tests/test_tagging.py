@@ -0,0 +1,70 @@
+import asyncio
+
+from backend.clock import SimulatedClock, SimulatedScheduler
+from backend.pandora_engine import PandoraMemoryEngine
+from backend.storage import InMemoryStorage
+from backend.tagging import TaggingConfig, TaggingPipeline, keyword_classifier, merge_tags, record_text
+
+
+def _line(index, memory=("Cycle 1", "Introspective traversal", "Memory braid sync"), tags=("ancestral",)):
+    return {"id": str(index), "stage": "breath", "state": "active_cycle", "identity": "Pandora Q Breath",
+            "memory": list(memory), "semantic_tags": list(tags)}
+
+
+def _pipeline(**config):
+    batches = []
+
+    async def sink(results):
+        batches.append(results)
+        return sum(tags != record["semantic_tags"] for record, tags in results)
+
+    return TaggingPipeline(TaggingConfig(enabled=True, workers=0, **config), sink), batches
+
+
+def test_breath_boilerplate_matches_no_lexicon_tag():
+    assert keyword_classifier([record_text(_line(0))]) == [[]]
+    assert merge_tags(["ancestral"], ["symbolic", "ancestral", "symbolic"]) == ["ancestral", "symbolic"]
+
+
+def test_drain_classifies_in_batches_and_keeps_creation_tags():
+    pipeline, batches = _pipeline(batch_size=2)
+    for index in range(5):
+        pipeline.enqueue(_line(index, memory=["Promise chain resolved"] if index == 4 else ["Cycle 1"]))
+    changed = asyncio.run(pipeline.drain())
+    assert [len(batch) for batch in batches] == [2, 2, 1]
+    assert batches[-1][0][1] == ["ancestral", "symbolic"]
+    assert changed == 1
+    assert pipeline.metrics()["batches"] == 3 and pipeline.metrics()["tagged"] == 5
+
+
+def test_queue_beyond_max_pending_is_dropped():
+    pipeline, batches = _pipeline(max_pending=3)
+    for index in range(5):
+        pipeline.enqueue(_line(index))
+    assert pipeline.metrics()["pending"] == 3 and pipeline.stats["dropped"] == 2
+    asyncio.run(pipeline.drain())
+    assert [record["id"] for record, _ in batches[0]] == ["0", "1", "2"]
+
+
+def test_engine_tagging_leaves_breath_lines_alone(tmp_path):
+    (tmp_path / "this-then.yaml").write_text("tagging:\n  workers: 0\n  batch_size: 2\n")
+
+    async def run():
+        engine = PandoraMemoryEngine(storage=InMemoryStorage(), data_dir=tmp_path,
+                                     scheduler=SimulatedScheduler(SimulatedClock()))
+        engine.snapshot_mirror = None
+        await engine.start_runtime()
+        await engine.fast_forward(5 * engine.breath_interval)
+        await engine.run_promise_chain({"query": "a promise"})
+        await engine.fast_forward(engine.tagging.config.interval)
+        report = await engine.retag_history()
+        lines = list(engine.memory_lines)
+        await engine.stop_runtime()
+        return lines, report
+
+    lines, report = asyncio.run(run())
+    breaths = [line for line in lines if line.stage == "breath"]
+    assert breaths and all(line.semantic_tags == ["ancestral"] for line in breaths)
+    promise = next(line for line in lines if line.stage == "promise_chain")
+    assert "symbolic" in promise.semantic_tags
+    assert report["braid"]["lines"] == len(lines) and report["braid"]["changed"] == 0
@@ -0,0 +1,61 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from backend.timeline import TimelineRollup
+
+T0 = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+def _rollup(minutes=120, **kwargs) -> TimelineRollup:
+    """One line a minute, alternating breath/promise, every third one also tagged symbolic"""
+    timeline = TimelineRollup(**kwargs)
+    for minute in range(minutes):
+        tags = ["ancestral", "symbolic"] if minute % 3 == 0 else ["ancestral"]
+        timeline.add(T0 + timedelta(minutes=minute), "breath" if minute % 2 == 0 else "promise", tags, "flo")
+    return timeline
+
+
+def test_bucket_counts_per_resolution():
+    timeline = _rollup()
+    minutes = timeline.series(resolution="minute")
+    assert len(minutes["points"]) == 120 and {point["total"] for point in minutes["points"]} == {1}
+    assert minutes["points"][0] == {"t": T0.isoformat(), "total": 1, "counts": {"breath": 1}}
+    hours = timeline.series(dimension="tag", resolution="hour")
+    assert [point["total"] for point in hours["points"]] == [60, 60]
+    assert hours["points"][0]["counts"] == {"ancestral": 60, "symbolic": 20}
+    window = timeline.series(dimension="total", resolution="minute",
+                             start=T0 + timedelta(minutes=10), end=T0 + timedelta(minutes=20))
+    assert len(window["points"]) == 10 and "counts" not in window["points"][0]
+    assert timeline.metrics() == {"lines": 120, "buckets": {"minute": 120, "hour": 2, "day": 1}}
+
+
+def test_downsampling_merges_neighbouring_buckets():
+    series = _rollup().series(resolution="minute", max_points=50)
+    assert series["downsample_factor"] == 3 and series["bucket_seconds"] == 180
+    assert len(series["points"]) == 40
+    assert all(point["total"] == 3 for point in series["points"])
+    assert series["points"][0]["counts"] == {"breath": 2, "promise": 1}
+    assert series["points"][1]["counts"] == {"breath": 1, "promise": 2}
+
+
+def test_auto_resolution_picks_the_finest_that_fits():
+    timeline = _rollup()
+    end = T0 + timedelta(hours=2)
+    assert timeline.series(start=T0, end=end, max_points=200)["resolution"] == "minute"
+    assert timeline.series(start=T0, end=end, max_points=10)["resolution"] == "hour"
+    # Minute buckets that have aged out cannot cover an older start
+    short = _rollup(retention={"minute": 30})
+    assert short.series(resolution="minute")["points"][0]["t"] == (T0 + timedelta(minutes=90)).isoformat()
+    assert short.series(start=T0, end=end, max_points=200)["resolution"] == "hour"
+
+
+def test_runs_are_spread_over_their_span():
+    timeline = TimelineRollup()
+    timeline.add_doc({"record_type": "breath_run", "run_length": 4, "stage": "breath", "identity": "flo",
+                      "semantic_tags": ["ancestral"], "timestamp": T0.isoformat(),
+                      "last_timestamp": (T0 + timedelta(minutes=3)).isoformat()})
+    points = timeline.series(resolution="minute")["points"]
+    assert [point["total"] for point in points] == [1, 1, 1, 1]
+    with pytest.raises(ValueError):
+        timeline.series(dimension="colour")
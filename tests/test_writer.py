@@ -0,0 +1,48 @@
+import asyncio
+
+import pytest
+
+from backend.writer import EngineWriter, WriterOverloaded
+
+
+def test_full_queue_rejects_and_priority_lane_runs_first():
+    async def run():
+        gate = asyncio.Event()
+        order = []
+
+        async def on_batch():
+            await gate.wait()
+
+        writer = EngineWriter(on_batch, max_depth=2, batch_size=8)
+        writer.start()
+        # The first batch holds the writer in on_batch while the queue fills up
+        first = asyncio.create_task(writer.submit(lambda: order.append("first")))
+        await asyncio.sleep(0.01)
+        normal = [asyncio.create_task(writer.submit(lambda n=n: order.append(f"normal-{n}"))) for n in range(2)]
+        await asyncio.sleep(0)
+        with pytest.raises(WriterOverloaded) as overloaded:
+            await writer.submit(lambda: order.append("rejected"))
+        priority = asyncio.create_task(writer.submit(lambda: order.append("priority"), priority=True))
+        await asyncio.sleep(0)
+        depth = writer.depth
+        gate.set()
+        await asyncio.gather(first, priority, *normal)
+        await writer.stop()
+        return order, overloaded.value, depth, writer.stats
+
+    order, overloaded, depth, stats = asyncio.run(run())
+    assert overloaded.depth == 2 and stats["rejected"] == 1
+    assert depth == 3
+    assert order == ["first", "priority", "normal-0", "normal-1"]
+    assert stats["applied"] == 4
+
+
+def test_batch_drains_priority_before_normal_mutations():
+    async def run():
+        writer = EngineWriter(lambda: asyncio.sleep(0), batch_size=3)
+        writer._queue.extend((lambda n=n: f"normal-{n}", None) for n in range(2))
+        writer._priority.extend((lambda n=n: f"priority-{n}", None) for n in range(2))
+        return [mutation() for mutation, _ in writer._next_batch()], writer.depth
+
+    batch, depth = asyncio.run(run())
+    assert batch == ["priority-0", "priority-1", "normal-0"] and depth == 1